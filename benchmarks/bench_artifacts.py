@@ -0,0 +1,94 @@
+"""
+Pickled vs. native model sets: on-disk size, load time and peak RSS of a
+fresh process loading SalesPredictor (serving mode, compiled trees), with a
+check that both score the same. The native set is converted from the
+pickled one into a temporary directory.
+
+    python benchmarks/bench_artifacts.py
+    python benchmarks/bench_artifacts.py --model-dir model_artifacts --runs 5 --output artifacts.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from common import ROOT_DIR, peak_rss_mb, sample_inputs
+
+def run_child(model_dir):
+    baseline_mb = peak_rss_mb()
+    start = time.perf_counter()
+    from src.inference.predictor import SalesPredictor
+    imported = time.perf_counter()
+    predictor = SalesPredictor(model_dir=model_dir, compiled_trees=True)
+    loaded = time.perf_counter()
+    forecasts = predictor.predict_batch(sample_inputs(256))
+    print(json.dumps({
+        'import_s': imported - start,
+        'load_s': loaded - imported,
+        'peak_rss_mb': peak_rss_mb(),
+        'baseline_rss_mb': baseline_mb,
+        'predictions': [forecast['next_week_sales'] for forecast in forecasts]
+    }))
+
+def in_child(model_dir):
+    command = [sys.executable, '-W', 'ignore', __file__, '--child', model_dir]
+    result = subprocess.check_output(command, cwd=str(ROOT_DIR / "benchmarks")).decode()
+    return json.loads(result.strip().splitlines()[-1])
+
+def disk_bytes(model_dir):
+    from src.inference.registry import artifact_files
+
+    return {name: os.path.getsize(os.path.join(model_dir, name)) for name in artifact_files(model_dir)}
+
+def measure(model_dir, runs):
+    results = [in_child(model_dir) for _ in range(runs)]
+    files = disk_bytes(model_dir)
+    return {
+        'disk_bytes': sum(files.values()),
+        'files': files,
+        'import_s': statistics.median(r['import_s'] for r in results),
+        'load_s': statistics.median(r['load_s'] for r in results),
+        'peak_rss_mb': statistics.median(r['peak_rss_mb'] for r in results),
+        'predictions': results[-1]['predictions']
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model-dir", default=str(ROOT_DIR / "model_artifacts"), help="a pickled model set")
+    parser.add_argument("--runs", type=int, default=3, help="fresh processes per format")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--child", metavar="MODEL_DIR", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        sys.exit()
+
+    from src.inference.artifacts import MANIFEST_FILE, convert_pickles
+
+    if os.path.exists(os.path.join(args.model_dir, MANIFEST_FILE)):
+        sys.exit(f"{args.model_dir} is already a native model set; pass a pickled one")
+
+    with tempfile.TemporaryDirectory() as native_dir:
+        convert_pickles(args.model_dir, native_dir)
+        results = {'pickle': measure(args.model_dir, args.runs), 'native': measure(native_dir, args.runs)}
+
+    difference = np.abs(np.subtract(results['pickle'].pop('predictions'), results['native'].pop('predictions')))
+    results['max_abs_diff'] = float(difference.max())
+
+    print(f"\n{'format':>7} | {'disk KB':>8} | {'import s':>8} | {'load s':>6} | {'peak RSS MB':>11}")
+    for name in ['pickle', 'native']:
+        result = results[name]
+        print(f"{name:>7} | {result['disk_bytes'] / 1024:>8,.0f} | {result['import_s']:>8.2f} | "
+              f"{result['load_s']:>6.2f} | {result['peak_rss_mb']:>11.0f}")
+    print(f"Max abs prediction difference: {results['max_abs_diff']:.3g}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
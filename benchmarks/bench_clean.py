@@ -0,0 +1,88 @@
+"""
+Cleaning train.csv in memory vs. streamed in chunks joined against the
+indexed stores/features tables: seconds and peak RSS per scale (each run in
+its own process), with a check that both write the same dataset.
+
+    python benchmarks/bench_clean.py
+    python benchmarks/bench_clean.py --scale 1 10 --chunk-rows 500000 --output clean.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT_DIR, peak_rss_mb
+from synthetic import write_walmart_like
+
+def run_child(raw, output, chunk_rows):
+    from src.data_cleaning.cleaner import clean_data
+
+    baseline_mb = peak_rss_mb()
+    start = time.perf_counter()
+    clean_data(f"{raw}/train.csv", f"{raw}/stores.csv", f"{raw}/features.csv", output, chunk_rows=chunk_rows)
+    print(json.dumps({
+        'seconds': time.perf_counter() - start,
+        'peak_rss_mb': peak_rss_mb(),
+        'baseline_rss_mb': baseline_mb
+    }))
+
+def in_child(raw, output, chunk_rows):
+    command = [sys.executable, __file__, '--child', raw, output, '--chunk-rows', str(chunk_rows)]
+    result = subprocess.check_output(command, cwd=str(ROOT_DIR / "benchmarks")).decode()
+    return json.loads(result.strip().splitlines()[-1])
+
+def same_dataset(a, b):
+    from src.utils.datasets import read_dataset
+
+    keys = ['Store', 'Dept', 'Date']
+    a = read_dataset(a).sort_values(keys).reset_index(drop=True)
+    b = read_dataset(b).sort_values(keys).reset_index(drop=True)
+    return list(a.columns) == list(b.columns) and a.equals(b[a.columns])
+
+def run(scale, chunk_rows, check):
+    with tempfile.TemporaryDirectory() as workdir:
+        raw = os.path.join(workdir, "raw")
+        paths = write_walmart_like(raw, scale)
+        result = {
+            'scale': scale,
+            'rows': sum(1 for _ in open(paths['train'])) - 1,
+            'train_mb': os.path.getsize(paths['train']) / 2**20
+        }
+        in_memory = os.path.join(workdir, "in_memory.parquet")
+        streamed = os.path.join(workdir, "streamed.parquet")
+        result['in_memory'] = in_child(raw, in_memory, 0)
+        result['streamed'] = in_child(raw, streamed, chunk_rows)
+        if check:
+            result['same'] = same_dataset(in_memory, streamed)
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=float, nargs="+", default=[1, 5])
+    parser.add_argument("--chunk-rows", type=int, default=250000)
+    parser.add_argument("--no-check", action="store_true", help="skip comparing the two outputs")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--child", nargs=2, metavar=("RAW", "OUTPUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child, args.chunk_rows)
+        sys.exit()
+
+    results = []
+    print(f"{'scale':>5} | {'rows':>10} | {'csv MB':>6} | {'in-memory s':>11} | {'peak MB':>7} | "
+          f"{'streamed s':>10} | {'peak MB':>7} | same")
+    for scale in args.scale:
+        result = run(scale, args.chunk_rows, not args.no_check)
+        results.append(result)
+        in_memory, streamed = result['in_memory'], result['streamed']
+        print(f"{scale:>5g} | {result['rows']:>10,} | {result['train_mb']:>6.0f} | "
+              f"{in_memory['seconds']:>11.2f} | {in_memory['peak_rss_mb']:>7.0f} | "
+              f"{streamed['seconds']:>10.2f} | {streamed['peak_rss_mb']:>7.0f} | {result.get('same', '-')}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
@@ -0,0 +1,62 @@
+"""
+Latency of the LGBM/XGB ensemble members: model.predict on a DataFrame
+(the default path) against SalesPredictor's compiled_trees serving mode,
+plus the full predict_batch call, with p50/p99 per batch size. Also reports
+the largest difference between the two paths.
+
+    python benchmarks/bench_compiled_trees.py
+"""
+import numpy as np
+import pandas as pd
+
+from common import ROOT_DIR, sample_inputs, time_call
+
+from src.inference.predictor import SalesPredictor
+
+def percentiles_ms(timings):
+    return np.percentile(timings, 50) * 1e3, np.percentile(timings, 99) * 1e3
+
+def run(batch_sizes=(1, 32, 1024), min_calls=200):
+    model_dir = str(ROOT_DIR / "model_artifacts")
+    default = SalesPredictor(model_dir=model_dir)
+    compiled = SalesPredictor(model_dir=model_dir, compiled_trees=True)
+    print(f"Compiled forest: {compiled.compiled_trees.n_trees} trees, depth {compiled.compiled_trees.depth}")
+
+    print(f"{'rows':>5} | {'stage':<13} | {'default p50/p99 ms':>19} | {'compiled p50/p99 ms':>20} | {'p50 speedup':>11}")
+    results = []
+    for n_rows in batch_sizes:
+        rows = sample_inputs(n_rows)
+        df = pd.DataFrame(rows)
+        X = df[default.features]
+        X_array = X.to_numpy(dtype=np.float64)
+        calls = max(20, min_calls // max(1, n_rows // 32))
+
+        stages = {
+            "trees": (lambda: default._tree_predictions(X), lambda: compiled._tree_predictions(X_array)),
+            "predict_batch": (lambda: default.predict_batch(rows), lambda: compiled.predict_batch(rows))
+        }
+        for stage, (default_fn, compiled_fn) in stages.items():
+            default_p50, default_p99 = percentiles_ms(time_call(default_fn, repeat=calls))
+            compiled_p50, compiled_p99 = percentiles_ms(time_call(compiled_fn, repeat=calls))
+            print(
+                f"{n_rows:>5} | {stage:<13} | {default_p50:>8.3f} / {default_p99:>8.3f} | "
+                f"{compiled_p50:>9.3f} / {compiled_p99:>8.3f} | {default_p50 / compiled_p50:>10.1f}x"
+            )
+            results.append({
+                "rows": n_rows, "stage": stage,
+                "default_p50_ms": default_p50, "default_p99_ms": default_p99,
+                "compiled_p50_ms": compiled_p50, "compiled_p99_ms": compiled_p99
+            })
+
+    # Accuracy of the compiled arrays themselves, on a large sample
+    rows = sample_inputs(5000)
+    X = pd.DataFrame(rows)[default.features]
+    expected = np.column_stack(default._tree_predictions(X))
+    actual = compiled.compiled_trees.predict(X.to_numpy(dtype=np.float64))
+    for i, name in enumerate(compiled.compiled_trees.group_names):
+        diff = np.abs(actual[:, i] - expected[:, i])
+        print(f"{name}: max abs diff {diff.max():.2e}, max rel diff {(diff / np.abs(expected[:, i]).max()).max():.2e}")
+    return results
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,83 @@
+"""
+Demand statistics for inventory calculations: recomputing a series' demand
+std/mean/trend from the sales history on every request vs. building the
+DemandStats index once and looking series up in the memory-mapped arrays
+(single lookups and a whole-fleet batch), with a check that both agree.
+
+    python benchmarks/bench_demand_stats.py
+    python benchmarks/bench_demand_stats.py --scale 1 5 --output demand_stats.json
+"""
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from common import time_call, peak_rss_mb
+from synthetic import make_walmart_like
+from src.inventory.demand_stats import DemandStats, STATS_WEEKS, TREND_WEEKS, compute_demand_stats
+
+def recompute(sales, store, dept):
+    # What a handler without the index would do per request
+    series = sales[(sales['Store'] == store) & (sales['Dept'] == dept)].sort_values('Date')
+    window = series['Weekly_Sales'].to_numpy(dtype=np.float64)[-STATS_WEEKS:]
+    mean = window.mean()
+    return {
+        'mean': mean,
+        'std': window.std(ddof=1),
+        'trend': window[-TREND_WEEKS:].mean() / mean - 1
+    }
+
+def run(scale, lookups):
+    sales, _, _ = make_walmart_like(scale)
+    keys = sales[['Store', 'Dept']].drop_duplicates().to_numpy()
+    rng = np.random.default_rng(0)
+    sample = keys[rng.integers(0, len(keys), lookups)]
+
+    start = time.perf_counter()
+    stats = compute_demand_stats(sales)
+    build_s = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stats.save(f"{tmp}/demand_stats")
+        load_s = time_call(lambda: DemandStats.load(f"{tmp}/demand_stats")).min()
+        index = DemandStats.load(f"{tmp}/demand_stats")
+
+        recompute_s = time_call(lambda: [recompute(sales, s, d) for s, d in sample[:20]], repeat=3).min() / 20
+        lookup_s = time_call(lambda: [index.lookup(s, d) for s, d in sample.tolist()], repeat=3).min() / len(sample)
+        batch_s = time_call(lambda: index.lookup_batch(keys[:, 0], keys[:, 1]), repeat=5).min()
+
+        agree = all(
+            np.allclose([expected[name] for name in expected], [index.lookup(s, d)[name] for name in expected])
+            for (s, d), expected in ((key, recompute(sales, *key)) for key in sample[:20].tolist())
+        )
+
+    return {
+        'scale': scale, 'rows': len(sales), 'series': len(keys),
+        'build_s': build_s, 'load_s': float(load_s),
+        'recompute_ms': recompute_s * 1e3, 'lookup_us': lookup_s * 1e6,
+        'fleet_batch_ms': float(batch_s) * 1e3, 'agree': bool(agree),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=float, nargs="+", default=[1])
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'scale':>5} | {'series':>6} | {'build s':>7} | {'load ms':>7} | {'recompute ms':>12} | "
+          f"{'lookup us':>9} | {'fleet batch ms':>14} | agree")
+    for scale in args.scale:
+        result = run(scale, args.lookups)
+        results.append(result)
+        print(f"{scale:>5g} | {result['series']:>6} | {result['build_s']:>7.2f} | {result['load_s'] * 1e3:>7.2f} | "
+              f"{result['recompute_ms']:>12.2f} | {result['lookup_us']:>9.1f} | "
+              f"{result['fleet_batch_ms']:>14.2f} | {result['agree']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
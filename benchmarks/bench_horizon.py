@@ -0,0 +1,94 @@
+"""
+Recursive 13-week forecasting (SalesPredictor.predict_horizon): latency of
+each step and cumulative latency per horizon for the whole fleet, plus the
+memory the full chain allocates, against a per-series Python loop.
+
+    python benchmarks/bench_horizon.py --series 3330 33300
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from common import ROOT_DIR, peak_rss_mb, sample_inputs
+
+from src.feature_store.store import HISTORY_WEEKS
+from src.inference.predictor import HORIZON_WEEKS, SalesPredictor
+
+def fleet(n_series, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = sample_inputs(n_series, seed=seed)
+    level = rng.uniform(2000, 40000, (n_series, 1))
+    history = level * rng.uniform(0.8, 1.2, (n_series, HISTORY_WEEKS))
+    return rows, history
+
+def timed_chain(predictor, rows, history, weeks):
+    steps = []
+    last = [time.perf_counter()]
+
+    def on_step(week, predictions):
+        now = time.perf_counter()
+        steps.append(now - last[0])
+        last[0] = now
+
+    predictor.predict_horizon(rows, history, weeks=weeks, on_step=on_step)
+    return np.array(steps)
+
+def chain_memory_mb(predictor, rows, history, weeks):
+    # Python + NumPy allocations of the chain (native model buffers excluded)
+    tracemalloc.start()
+    predictor.predict_horizon(rows, history, weeks=weeks)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--series", type=int, nargs="+", default=[3330, 33300])
+    parser.add_argument("--weeks", type=int, default=HORIZON_WEEKS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--loop-sample", type=int, default=50,
+                        help="series timed one at a time for the per-series loop baseline")
+    parser.add_argument("--compiled-trees", type=int, default=1)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    predictor = SalesPredictor(model_dir=str(ROOT_DIR / "model_artifacts"), compiled_trees=bool(args.compiled_trees))
+    results = []
+    for n_series in args.series:
+        rows, history = fleet(n_series)
+        predictor.predict_horizon(rows[:8], history[:8], weeks=args.weeks)  # warm-up
+
+        steps = np.median([timed_chain(predictor, rows, history, args.weeks) for _ in range(args.repeat)], axis=0)
+        cumulative = np.cumsum(steps)
+        memory_mb = chain_memory_mb(predictor, rows, history, args.weeks)
+
+        sample = min(args.loop_sample, n_series)
+        start = time.perf_counter()
+        for i in range(sample):
+            predictor.predict_horizon(rows[i:i + 1], history[i:i + 1], weeks=args.weeks)
+        loop_s = (time.perf_counter() - start) / sample * n_series
+
+        print(f"\n{n_series} series, {args.weeks} weeks: chain {cumulative[-1]:.3f}s "
+              f"({n_series * args.weeks / cumulative[-1]:,.0f} series-weeks/s), "
+              f"per-series loop ~{loop_s:.1f}s, chain allocations {memory_mb:.1f} MB, peak RSS {peak_rss_mb():.0f} MB")
+        print(f"{'week':>4} | {'step ms':>8} | {'cumulative ms':>13}")
+        for week, (step, total) in enumerate(zip(steps, cumulative), start=1):
+            print(f"{week:>4} | {step * 1e3:>8.1f} | {total * 1e3:>13.1f}")
+
+        results.append({
+            "series": n_series,
+            "weeks": args.weeks,
+            "step_ms": (steps * 1e3).tolist(),
+            "cumulative_ms": (cumulative * 1e3).tolist(),
+            "chain_s": float(cumulative[-1]),
+            "per_series_loop_s": loop_s,
+            "chain_alloc_mb": memory_mb,
+            "peak_rss_mb": peak_rss_mb()
+        })
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
@@ -0,0 +1,111 @@
+"""
+Cleaning-to-training I/O: the previous CSV round-trips (default dtypes,
+full re-parse in every trainer) against typed, Store-partitioned parquet
+with column pruning. Every stage runs in its own process so its wall-clock
+time and peak RSS can be compared.
+
+    python benchmarks/bench_io.py [--scale 1]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import os
+
+import pandas as pd
+
+from common import ROOT_DIR, peak_rss_mb
+from synthetic import make_walmart_like
+
+from src.feature_engineering.features import add_lag_rolling_features
+from src.utils.datasets import optimize_dtypes, read_dataset, write_dataset
+
+MODEL_COLUMNS = json.load(open(ROOT_DIR / "model_artifacts/feature_list.json")) + ["Date", "Weekly_Sales"]
+STAGES = ['features', 'trainer_reads']
+
+def prepare(workdir, scale):
+    # Cleaned dataset in both formats, written the way clean_data writes them
+    train, stores, features = make_walmart_like(scale)
+    df = train.merge(stores, on='Store', how='left')
+    df = df.merge(features, on=['Store', 'Date', 'IsHoliday'], how='left')
+    df['Date'] = pd.to_datetime(df['Date'])
+    df.to_csv(os.path.join(workdir, "sales_cleaned.csv"), index=False)
+    write_dataset(optimize_dtypes(df), os.path.join(workdir, "sales_cleaned.parquet"), partition_cols=['Store'])
+
+def features_stage(fmt, workdir):
+    # create_features: load cleaned data, add features, write the feature dataset
+    cleaned = os.path.join(workdir, f"sales_cleaned.{fmt}")
+    featured = os.path.join(workdir, f"sales_features.{fmt}")
+    if fmt == 'csv':
+        df = pd.read_csv(cleaned)
+        df['Date'] = pd.to_datetime(df['Date'])
+    else:
+        df = read_dataset(cleaned)
+
+    df = df.sort_values(['Store', 'Dept', 'Date'])
+    df['Year'] = df['Date'].dt.year
+    df['Month'] = df['Date'].dt.month
+    df['Week'] = df['Date'].dt.isocalendar().week.astype(int)
+    df['Day'] = df['Date'].dt.day
+    df['DayOfWeek'] = df['Date'].dt.weekday
+    df = add_lag_rolling_features(df)
+
+    if fmt == 'csv':
+        df.to_csv(featured, index=False)
+    else:
+        write_dataset(optimize_dtypes(df), featured, partition_cols=['Store'])
+
+def trainer_reads_stage(fmt, workdir):
+    # train_lgbm, train_xgb and train_prophet each load the feature dataset
+    featured = os.path.join(workdir, f"sales_features.{fmt}")
+    for columns in [MODEL_COLUMNS, MODEL_COLUMNS, ["Date", "Weekly_Sales"]]:
+        if fmt == 'csv':
+            df = pd.read_csv(featured)
+        else:
+            df = read_dataset(featured, columns=columns)
+        del df
+
+def run_child(stage, fmt, workdir):
+    baseline_mb = peak_rss_mb()
+    start = time.perf_counter()
+    {'features': features_stage, 'trainer_reads': trainer_reads_stage}[stage](fmt, workdir)
+    print(json.dumps({
+        'seconds': time.perf_counter() - start,
+        'peak_rss_mb': peak_rss_mb(),
+        'baseline_rss_mb': baseline_mb
+    }))
+
+def run(scale=1):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare(workdir, scale)
+        for stage in STAGES:
+            for fmt in ['csv', 'parquet']:
+                output = subprocess.check_output(
+                    [sys.executable, __file__, '--child', stage, '--format', fmt, '--workdir', workdir],
+                    cwd=str(ROOT_DIR / "benchmarks")
+                ).decode()
+                results[(stage, fmt)] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'stage':>14} | {'csv s':>7} | {'parquet s':>9} | {'csv MB':>7} | {'parquet MB':>10}")
+    for stage in STAGES:
+        csv, parquet = results[(stage, 'csv')], results[(stage, 'parquet')]
+        print(f"{stage:>14} | {csv['seconds']:>7.2f} | {parquet['seconds']:>9.2f} | "
+              f"{csv['peak_rss_mb']:>7.0f} | {parquet['peak_rss_mb']:>10.0f}")
+    print(f"(process baseline before each stage: ~{results[('features', 'csv')]['baseline_rss_mb']:.0f} MB)")
+    return {f"{stage}/{fmt}": value for (stage, fmt), value in results.items()}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=float, default=1)
+    parser.add_argument('--child', choices=STAGES)
+    parser.add_argument('--format', choices=['csv', 'parquet'])
+    parser.add_argument('--workdir')
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.format, args.workdir)
+    else:
+        run(args.scale)
@@ -0,0 +1,70 @@
+"""
+Overhead of the /metrics instrumentation: cost of one histogram timer and
+observation, SalesPredictor.predict_batch latency with timers on and off
+(METRICS_ENABLED), and the cost of rendering the Prometheus text.
+
+    python benchmarks/bench_metrics.py
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from common import ROOT_DIR, sample_inputs, time_call
+
+from src.utils import metrics
+from src.inference.predictor import SalesPredictor
+
+def per_call_ns(fn, calls=200000):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e9
+
+def timed_block(series):
+    with series.time():
+        pass
+
+def predict_p50_ms(predictor, rows, calls):
+    predictor.predict_batch(rows)
+    return float(np.percentile(time_call(lambda: predictor.predict_batch(rows), repeat=calls), 50)) * 1e3
+
+def run(batch_sizes=(1, 32, 1024), calls=2000):
+    series = metrics.Histogram("bench_seconds", "benchmark", ["stage"]).labels(stage="x")
+    results = {
+        "observe_ns": per_call_ns(lambda: series.observe(0.001)),
+        "timer_ns": per_call_ns(lambda: timed_block(series)),
+        "render_ms": float(np.median(time_call(metrics.REGISTRY.render, repeat=50))) * 1e3,
+        "predict_batch": []
+    }
+    print(f"observe: {results['observe_ns']:.0f} ns, timed block: {results['timer_ns']:.0f} ns, "
+          f"render: {results['render_ms']:.2f} ms")
+
+    predictor = SalesPredictor(model_dir=str(ROOT_DIR / "model_artifacts"), compiled_trees=True)
+    print(f"{'rows':>5} | {'off p50 ms':>10} | {'on p50 ms':>9} | {'overhead':>8}")
+    for n_rows in batch_sizes:
+        rows = sample_inputs(n_rows)
+        repeat = max(20, calls // max(1, n_rows // 32))
+        # Interleaved so drift affects both sides alike
+        off, on = [], []
+        for _ in range(3):
+            metrics.METRICS_ENABLED = False
+            off.append(predict_p50_ms(predictor, rows, repeat))
+            metrics.METRICS_ENABLED = True
+            on.append(predict_p50_ms(predictor, rows, repeat))
+        off_ms, on_ms = min(off), min(on)
+        overhead = on_ms / off_ms - 1
+        print(f"{n_rows:>5} | {off_ms:>10.4f} | {on_ms:>9.4f} | {overhead:>7.1%}")
+        results["predict_batch"].append({"rows": n_rows, "off_p50_ms": off_ms, "on_p50_ms": on_ms})
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    results = run()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
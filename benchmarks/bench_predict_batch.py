@@ -0,0 +1,35 @@
+"""
+Throughput of SalesPredictor.predict_batch against calling predict row by row.
+
+    python benchmarks/bench_predict_batch.py
+"""
+from common import ROOT_DIR, sample_inputs, time_call
+
+from src.inference.predictor import SalesPredictor
+
+def run(batch_sizes=(1, 32, 256, 1024, 3300)):
+    predictor = SalesPredictor(model_dir=str(ROOT_DIR / "model_artifacts"))
+
+    print(f"{'rows':>6} | {'single-row rows/s':>18} | {'batch rows/s':>13} | {'speedup':>8}")
+    results = []
+    for n_rows in batch_sizes:
+        rows = sample_inputs(n_rows)
+
+        # Row-by-row is slow, so time it on a bounded sample and extrapolate
+        single_rows = rows[:min(n_rows, 64)]
+        single = time_call(lambda: [predictor.predict(row) for row in single_rows], repeat=3)
+        single_rps = len(single_rows) / single.min()
+
+        batch = time_call(lambda: predictor.predict_batch(rows), repeat=5)
+        batch_rps = n_rows / batch.min()
+
+        print(f"{n_rows:>6} | {single_rps:>18,.0f} | {batch_rps:>13,.0f} | {batch_rps / single_rps:>7.1f}x")
+        results.append({
+            "rows": n_rows,
+            "single_rows_per_sec": single_rps,
+            "batch_rows_per_sec": batch_rps
+        })
+    return results
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,58 @@
+"""
+Per-series Prophet training: wall-clock time of fitting the (Store, Dept)
+series against the number of worker processes, on the Walmart train set
+(if data/raw/train.csv is present, otherwise its synthetic stand-in).
+
+    python benchmarks/bench_prophet_training.py --series 400 --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import time
+
+import pandas as pd
+
+from common import ROOT_DIR
+from synthetic import make_walmart_like
+
+from src.training.train_prophet import build_series, fit_series
+
+def load_sales():
+    train_csv = ROOT_DIR / "data" / "raw" / "train.csv"
+    if train_csv.exists():
+        df = pd.read_csv(train_csv, usecols=["Store", "Dept", "Date", "Weekly_Sales"])
+    else:
+        df = make_walmart_like()[0][["Store", "Dept", "Date", "Weekly_Sales"]]
+    df["Date"] = pd.to_datetime(df["Date"])
+    return df
+
+if __name__ == "__main__":
+    cores = os.cpu_count() or 1
+    default_workers = sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1)))
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--series", type=int, default=400, help="(Store, Dept) series fitted per run")
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    tasks, skipped = build_series(load_sales(), "store_dept")
+    tasks = [task for task in tasks if task[0][1] != -1][:args.series]
+    print(f"{len(tasks)} series ({skipped} too short), {cores} core(s)")
+
+    results = []
+    print(f"{'workers':>7} | {'wall s':>7} | {'series/s':>8} | {'speedup':>7}")
+    for workers in args.workers:
+        start = time.perf_counter()
+        params, errors = fit_series(tasks, max_workers=workers)
+        wall = time.perf_counter() - start
+        baseline = results[0]["wall_s"] if results else wall
+        print(f"{workers:>7} | {wall:>7.1f} | {len(tasks) / wall:>8.1f} | {baseline / wall:>6.2f}x")
+        results.append({
+            "workers": workers, "cores": cores, "series": len(tasks),
+            "fitted": len(params), "errors": len(errors), "wall_s": wall
+        })
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
@@ -0,0 +1,68 @@
+"""
+Fleet reorder metrics: InventoryOptimizer.calculate_metrics called per item
+vs calculate_metrics_batch over whole columns, with a check that every
+output value is identical.
+
+    python benchmarks/bench_reorder_report.py --items 3331 100000 1000000
+"""
+import argparse
+import json
+
+import numpy as np
+
+from common import time_call
+from src.inventory.optimization import InventoryOptimizer
+
+def fleet(n_items, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        'current_stock': np.round(rng.uniform(-100, 60000, n_items), 2),
+        'predicted_sales': np.round(rng.uniform(0, 90000, n_items), 2),
+        'demand_std': rng.uniform(0, 8000, n_items),
+        'lead_time': rng.integers(1, 22, n_items).astype(np.float64)
+    }
+
+def scalar_report(items):
+    optimizers = {lead_time: InventoryOptimizer(lead_time=lead_time) for lead_time in np.unique(items['lead_time'])}
+    return [
+        optimizers[lead_time].calculate_metrics(stock, sales, std)
+        for stock, sales, std, lead_time in zip(
+            items['current_stock'].tolist(), items['predicted_sales'].tolist(),
+            items['demand_std'].tolist(), items['lead_time'].tolist()
+        )
+    ]
+
+def batch_report(items):
+    return InventoryOptimizer().calculate_metrics_batch(
+        items['current_stock'], items['predicted_sales'], items['demand_std'], items['lead_time']
+    )
+
+def identical(scalar, batch):
+    columns = {key: batch[key].tolist() for key in batch}
+    return all(
+        row[key] == columns[key][i]
+        for i, row in enumerate(scalar) for key in row
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, nargs="+", default=[3331, 100000, 1000000])
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'items':>9} | {'scalar s':>9} | {'batch s':>8} | {'speedup':>7} | identical")
+    for n_items in args.items:
+        items = fleet(n_items)
+        scalar, batch = scalar_report(items), batch_report(items)
+        scalar_s = float(np.median(time_call(lambda: scalar_report(items), repeat=1)))
+        batch_s = float(np.median(time_call(lambda: batch_report(items), repeat=3)))
+        same = identical(scalar, batch)
+        print(f"{n_items:>9} | {scalar_s:>9.3f} | {batch_s:>8.4f} | {scalar_s / batch_s:>6.0f}x | {same}")
+        results.append({
+            "items": n_items, "scalar_s": scalar_s, "batch_s": batch_s, "identical": same
+        })
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
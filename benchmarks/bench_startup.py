@@ -0,0 +1,110 @@
+"""
+API startup: an import-time profile of src.api.main and its model loading
+(python -X importtime, grouped by top-level package), then time-to-/health
+and time-to-/ready of a uvicorn server with lazy (background) and eager
+(API_LAZY_STARTUP=0) model loading.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+from common import ROOT_DIR
+
+MODES = {
+    "lazy": {"API_LAZY_STARTUP": "1"},
+    "eager": {"API_LAZY_STARTUP": "0"}
+}
+
+# Everything the API imports before it can score a request; LightGBM,
+# XGBoost and Prophet are imported by unpickling the models and show up in
+# the server's 'load_models' step instead
+PROFILE_TARGET = (
+    "import src.api.main; "
+    "import src.inference.predictor, src.feature_store.store, src.ai_advisor.advisor, "
+    "google.generativeai, plotly.graph_objs"
+)
+
+def import_profile(target):
+    """
+    Import seconds per top-level package (sum of the self times of its
+    modules), from -X importtime.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", target],
+        cwd=str(ROOT_DIR), capture_output=True, text=True
+    )
+    totals = defaultdict(float)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        totals[name.strip().split(".")[0]] += int(self_us) / 1e6
+    return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+def wait_for(url, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.02)
+    raise RuntimeError(f"{url} not ready")
+
+def time_startup(port, env_overrides, timeout=180):
+    env = {**os.environ, "AI_ADVISOR_BACKEND": "stub", **env_overrides}
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.api.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=str(ROOT_DIR), env=env, stdout=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = start + timeout
+        health = wait_for(f"{url}/health", deadline) - start
+        ready = wait_for(f"{url}/ready", deadline) - start
+        timings = httpx.get(f"{url}/ready").json()["timings"]
+    finally:
+        server.terminate()
+        server.wait()
+    return {"health_s": health, "ready_s": ready, "load_timings": timings}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="server starts per mode")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    results = {"import_profile": {}, "startup": []}
+    for name, target in [("src.api.main", "import src.api.main"), ("full", PROFILE_TARGET)]:
+        profile = import_profile(target)
+        results["import_profile"][name] = profile
+        print(f"\nImport time of {name}: {sum(profile.values()):.2f}s")
+        for package, seconds in list(profile.items())[:10]:
+            print(f"  {package:<24} {seconds:>6.2f}s")
+
+    print(f"\n{'mode':>6} | {'/health s':>9} | {'/ready s':>8}")
+    for name in args.modes:
+        runs = [time_startup(args.port, MODES[name]) for _ in range(args.runs)]
+        health = sorted(run["health_s"] for run in runs)[len(runs) // 2]
+        ready = sorted(run["ready_s"] for run in runs)[len(runs) // 2]
+        print(f"{name:>6} | {health:>9.2f} | {ready:>8.2f}")
+        results["startup"].append({
+            "mode": name, "median_health_s": health, "median_ready_s": ready, "runs": runs
+        })
+    print(f"\nModel loading steps (last run): {results['startup'][-1]['runs'][-1]['load_timings']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
@@ -0,0 +1,66 @@
+import resource
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Detect project root
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR))
+
+def sample_inputs(n_rows, seed=42):
+    """
+    Random predictor input rows shaped like the ones built in src/api/main.py.
+    """
+    rng = np.random.default_rng(seed)
+    dates = np.datetime64('2012-11-02') + 7 * rng.integers(0, 39, n_rows).astype('timedelta64[D]')
+    rows = []
+    for i in range(n_rows):
+        date = dates[i].astype(object)
+        level = float(rng.uniform(2000, 40000))
+        rows.append({
+            'Store': int(rng.integers(1, 46)),
+            'Dept': int(rng.integers(1, 100)),
+            'IsHoliday': int(rng.random() < 0.07),
+            'Temperature': float(rng.uniform(10, 95)),
+            'Fuel_Price': float(rng.uniform(2.5, 4.5)),
+            'MarkDown1': 0, 'MarkDown2': 0, 'MarkDown3': 0, 'MarkDown4': 0, 'MarkDown5': 0,
+            'CPI': float(rng.uniform(126, 228)),
+            'Unemployment': float(rng.uniform(4, 14)),
+            'Size': int(rng.integers(34000, 220000)),
+            'Year': date.year,
+            'Month': date.month,
+            'Week': date.isocalendar()[1],
+            'Day': date.day,
+            'DayOfWeek': date.weekday(),
+            **{f'Lag_{lag}': level * float(rng.uniform(0.8, 1.2)) for lag in [1, 2, 3, 4, 8, 12, 16, 20, 24]},
+            'RollingMean_4': level, 'RollingStd_4': level * 0.05,
+            'RollingMean_12': level, 'RollingStd_12': level * 0.08
+        })
+    return rows
+
+def time_call(fn, repeat=5):
+    """
+    Runs fn `repeat` times and returns the per-call wall-clock seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return np.array(timings)
+
+def peak_rss_mb():
+    """
+    Peak resident memory of this process in MB. Prefers VmHWM, which unlike
+    ru_maxrss is not inherited from the parent across fork/exec.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
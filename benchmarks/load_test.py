@@ -0,0 +1,143 @@
+"""
+Load test of POST /predict: throughput and latency percentiles for 50-500
+concurrent clients, with the micro-batching scheduler and without it
+(PREDICT_BATCH_MAX_SIZE=0). Each mode starts its own uvicorn server with
+the stub AI backend; request bodies vary so the response cache misses.
+
+    python benchmarks/load_test.py --concurrency 50 100 200 500 --duration 10
+    python benchmarks/load_test.py --server-env PREDICT_COMPILED_TREES=0   # sklearn model path
+    python benchmarks/load_test.py --url http://localhost:8000   # existing server
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+from common import ROOT_DIR
+
+MODES = {
+    "batched": {"PREDICT_BATCH_MAX_SIZE": "64", "PREDICT_BATCH_MAX_WAIT_MS": "2"},
+    "unbatched": {"PREDICT_BATCH_MAX_SIZE": "0"}
+}
+
+def start_server(port, env_overrides):
+    env = {**os.environ, "AI_ADVISOR_BACKEND": "stub", "AI_ADVISOR_STUB_LATENCY": "0", **env_overrides}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.api.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=str(ROOT_DIR), env=env
+    )
+    url = f"http://127.0.0.1:{port}"
+    # /health answers while the models still load in the background; /ready once they are warmed
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            response = httpx.get(f"{url}/ready", timeout=1)
+            if response.status_code == 200:
+                return server, url
+            if response.json().get("status") == "failed":
+                server.kill()
+                raise RuntimeError(f"Server failed to load: {response.json().get('error')}")
+        except httpx.TransportError:
+            pass
+        time.sleep(0.5)
+    server.kill()
+    raise RuntimeError("Server did not become ready")
+
+async def client(http, url, client_id, stop_at, latencies, errors):
+    rng = np.random.default_rng(client_id)
+    while time.perf_counter() < stop_at:
+        body = {
+            "store": int(rng.integers(1, 46)),
+            "dept": int(rng.integers(1, 100)),
+            "current_stock": float(rng.integers(0, 50000))
+        }
+        start = time.perf_counter()
+        try:
+            response = await http.post(f"{url}/predict", json=body)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+async def run_level(url, concurrency, duration):
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as http:
+        start = time.perf_counter()
+        stop_at = start + duration
+        await asyncio.gather(*[
+            client(http, url, i, stop_at, latencies, errors) for i in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1e3
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+        "p95_ms": float(np.percentile(latencies, 95)) if len(latencies) else None,
+        "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else None
+    }
+
+def run_mode(name, url, levels, duration):
+    print(f"\n[{name}]")
+    print(f"{'clients':>7} | {'requests':>8} | {'errors':>6} | {'req/s':>7} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8}")
+    results = []
+    for concurrency in levels:
+        result = asyncio.run(run_level(url, concurrency, duration))
+        # No percentiles when every request failed
+        percentiles = [
+            f"{result[name]:>8.1f}" if result[name] is not None else f"{'-':>8}"
+            for name in ["p50_ms", "p95_ms", "p99_ms"]
+        ]
+        print(
+            f"{concurrency:>7} | {result['requests']:>8} | {result['errors']:>6} | {result['throughput_rps']:>7.1f} | "
+            + " | ".join(percentiles)
+        )
+        results.append({"mode": name, **result})
+
+    try:
+        results.append({"mode": name, "batching": httpx.get(f"{url}/batching/stats").json()})
+    except httpx.HTTPError:
+        pass
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 100, 200, 500])
+    parser.add_argument("--duration", type=float, default=10, help="seconds per concurrency level")
+    parser.add_argument("--url", help="test this running server instead of starting one per mode")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--server-env", nargs="*", default=[], metavar="KEY=VALUE",
+                        help="extra environment for the started servers")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    if args.url:
+        results += run_mode("server", args.url, args.concurrency, args.duration)
+    else:
+        server_env = dict(item.split("=", 1) for item in args.server_env)
+        for name in args.modes:
+            server, url = start_server(args.port, {**MODES[name], **server_env})
+            try:
+                results += run_mode(name, url, args.concurrency, args.duration)
+            finally:
+                server.terminate()
+                server.wait()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
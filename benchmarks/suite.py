@@ -0,0 +1,268 @@
+"""
+Whole-stack benchmark suite on synthetic Walmart-shaped data (1x to 50x the
+train.csv row count): throughput and peak memory of every pipeline stage,
+single-row and batch inference latency (p50/p99), and API requests/s under
+concurrency. Each run writes one JSON file tagged with the commit, so runs
+can be compared across commits.
+
+    python benchmarks/suite.py                                   # 1x, all sections
+    python benchmarks/suite.py --scales 1 10 50 --sections pipeline
+    python benchmarks/suite.py --compare results/old.json results/new.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from importlib import metadata
+
+import httpx
+import numpy as np
+
+from common import ROOT_DIR, peak_rss_mb, sample_inputs, time_call
+from synthetic import write_walmart_like
+from load_test import run_level, start_server
+
+SECTIONS = ['pipeline', 'inference', 'api']
+PIPELINE_STAGES = ['clean', 'features', 'feature_store', 'demand_stats']
+BATCH_SIZES = [1, 32, 256, 1024, 3300]
+PACKAGES = ['numpy', 'pandas', 'pyarrow', 'scikit-learn', 'lightgbm', 'xgboost', 'prophet', 'fastapi']
+RESULTS_DIR = ROOT_DIR / "benchmarks" / "results"
+
+def run_stage(stage, workdir):
+    # Imported here so each child process only pays for its own stage
+    raw = os.path.join(workdir, "raw")
+    cleaned = os.path.join(workdir, "sales_cleaned.parquet")
+    if stage == 'clean':
+        from src.data_cleaning.cleaner import clean_data
+        clean_data(f"{raw}/train.csv", f"{raw}/stores.csv", f"{raw}/features.csv", cleaned)
+    elif stage == 'features':
+        from src.feature_engineering.features import create_features
+        create_features(cleaned, os.path.join(workdir, "sales_features.parquet"))
+    elif stage == 'feature_store':
+        from src.feature_store.store import build_feature_store
+        build_feature_store(cleaned, os.path.join(workdir, "feature_store.npz"))
+    elif stage == 'demand_stats':
+        from src.inventory.demand_stats import build_demand_stats
+        build_demand_stats(cleaned, os.path.join(workdir, "demand_stats"))
+
+def latency_ms(timings):
+    timings = np.asarray(timings) * 1e3
+    return {
+        'p50_ms': float(np.percentile(timings, 50)),
+        'p99_ms': float(np.percentile(timings, 99)),
+        'mean_ms': float(timings.mean())
+    }
+
+def run_inference(calls):
+    # Same predictor configuration as the API
+    from src.inference.predictor import SalesPredictor
+
+    start = time.perf_counter()
+    predictor = SalesPredictor(model_dir=str(ROOT_DIR / "model_artifacts"), compiled_trees=True)
+    results = {'load_s': time.perf_counter() - start}
+
+    rows = sample_inputs(max(BATCH_SIZES))
+    predictor.predict_batch(rows[:32])
+    single_rows = iter(rows * (calls // len(rows) + 1))
+    results['single_row'] = latency_ms(time_call(lambda: predictor.predict(next(single_rows)), repeat=calls))
+
+    results['batch'] = {}
+    for n_rows in BATCH_SIZES:
+        batch = rows[:n_rows]
+        timings = time_call(lambda: predictor.predict_batch(batch), repeat=max(10, calls // max(1, n_rows // 32)))
+        results['batch'][str(n_rows)] = {
+            **latency_ms(timings),
+            'rows_per_sec': n_rows / float(np.median(timings))
+        }
+    return results
+
+def run_child(task, workdir, calls):
+    baseline_mb = peak_rss_mb()
+    start = time.perf_counter()
+    result = run_inference(calls) if task == 'inference' else run_stage(task, workdir)
+    print(json.dumps({
+        **(result or {}),
+        'seconds': time.perf_counter() - start,
+        'peak_rss_mb': peak_rss_mb(),
+        'baseline_rss_mb': baseline_mb
+    }))
+
+def in_child(task, workdir=None, calls=None):
+    """
+    Runs one task in a fresh process, so its peak RSS is its own.
+    """
+    command = [sys.executable, __file__, '--child', task]
+    if workdir:
+        command += ['--workdir', workdir]
+    if calls:
+        command += ['--calls', str(calls)]
+    output = subprocess.check_output(command, cwd=str(ROOT_DIR / "benchmarks")).decode()
+    return json.loads(output.strip().splitlines()[-1])
+
+def run_pipeline(scales):
+    results = {}
+    print(f"{'scale':>5} | {'stage':<13} | {'rows':>11} | {'seconds':>8} | {'rows/s':>11} | {'peak MB':>8}")
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as workdir:
+            start = time.perf_counter()
+            paths = write_walmart_like(os.path.join(workdir, "raw"), scale)
+            n_rows = sum(1 for _ in open(paths['train'])) - 1
+            scale_results = {'rows': n_rows, 'generate_s': time.perf_counter() - start}
+
+            for stage in PIPELINE_STAGES:
+                result = in_child(stage, workdir)
+                result['rows_per_sec'] = n_rows / result['seconds']
+                scale_results[stage] = result
+                print(f"{scale:>5g} | {stage:<13} | {n_rows:>11,} | {result['seconds']:>8.2f} | "
+                      f"{result['rows_per_sec']:>11,.0f} | {result['peak_rss_mb']:>8.0f}")
+        results[f"x{scale:g}"] = scale_results
+    return results
+
+def run_inference_section(calls):
+    result = in_child('inference', calls=calls)
+    print(f"Predictor load: {result['load_s']:.2f}s, peak RSS {result['peak_rss_mb']:.0f} MB")
+    print(f"{'rows':>6} | {'p50 ms':>8} | {'p99 ms':>8} | {'rows/s':>10}")
+    single = result['single_row']
+    print(f"{'single':>6} | {single['p50_ms']:>8.3f} | {single['p99_ms']:>8.3f} | {1e3 / single['p50_ms']:>10,.0f}")
+    for n_rows, batch in result['batch'].items():
+        print(f"{n_rows:>6} | {batch['p50_ms']:>8.3f} | {batch['p99_ms']:>8.3f} | {batch['rows_per_sec']:>10,.0f}")
+    return result
+
+def server_peak_rss_mb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return None
+
+def run_api(levels, duration, port):
+    results = {}
+    server, url = start_server(port, {})
+    try:
+        # Models load in the background; the levels start once they are ready
+        start = time.perf_counter()
+        while time.perf_counter() - start < 180:
+            try:
+                if httpx.get(f"{url}/ready", timeout=5).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            time.sleep(0.1)
+        results['ready_after_health_s'] = time.perf_counter() - start
+
+        print(f"{'clients':>7} | {'req/s':>7} | {'p50 ms':>8} | {'p99 ms':>8} | {'errors':>6}")
+        for concurrency in levels:
+            result = asyncio.run(run_level(url, concurrency, duration))
+            results[f"c{concurrency}"] = result
+            print(f"{concurrency:>7} | {result['throughput_rps']:>7.1f} | {result['p50_ms']:>8.1f} | "
+                  f"{result['p99_ms']:>8.1f} | {result['errors']:>6}")
+        try:
+            results['server_peak_rss_mb'] = server_peak_rss_mb(server.pid)
+        except OSError:
+            results['server_peak_rss_mb'] = None
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+def git(*args):
+    try:
+        return subprocess.check_output(['git', *args], cwd=str(ROOT_DIR), stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment():
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'packages': versions
+    }
+
+def flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{path}/"))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+def compare(old_path, new_path):
+    """
+    Prints every metric present in both runs with its new/old ratio.
+    """
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"old: {old['environment']['commit']} ({old['environment']['timestamp']})")
+    print(f"new: {new['environment']['commit']} ({new['environment']['timestamp']})")
+
+    old_metrics, new_metrics = flatten(old['results']), flatten(new['results'])
+    print(f"{'metric':<48} | {'old':>12} | {'new':>12} | {'new/old':>7}")
+    for name in sorted(set(old_metrics) & set(new_metrics)):
+        if name.endswith('baseline_rss_mb'):
+            continue
+        before, after = old_metrics[name], new_metrics[name]
+        ratio = f"{after / before:>6.2f}x" if before else "    n/a"
+        print(f"{name:<48} | {before:>12.4g} | {after:>12.4g} | {ratio}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sections", nargs="+", default=SECTIONS, choices=SECTIONS)
+    parser.add_argument("--scales", type=float, nargs="+", default=[1], help="data size, 1 to 50x train.csv")
+    parser.add_argument("--calls", type=int, default=500, help="timed calls per inference measurement")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--duration", type=float, default=5, help="seconds per concurrency level")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two results files")
+    parser.add_argument("--child", choices=PIPELINE_STAGES + ['inference'], help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.workdir, args.calls)
+        sys.exit()
+    if args.compare:
+        compare(*args.compare)
+        sys.exit()
+    if any(not 1 <= scale <= 50 for scale in args.scales):
+        parser.error("--scales must be between 1 and 50")
+
+    env = environment()
+    results = {}
+    for section in args.sections:
+        print(f"\n[{section}]")
+        if section == 'pipeline':
+            results['pipeline'] = run_pipeline(args.scales)
+        elif section == 'inference':
+            results['inference'] = run_inference_section(args.calls)
+        else:
+            results['api'] = run_api(args.concurrency, args.duration, args.port)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = env['timestamp'].replace(':', '').replace('-', '')[:15]
+        output = str(RESULTS_DIR / f"{stamp}-{(env['commit'] or 'nogit')[:8]}.json")
+    with open(output, "w") as f:
+        json.dump({'environment': env, 'args': vars(args), 'results': results}, f, indent=4)
+    print(f"\nResults written to {output}")
@@ -0,0 +1,115 @@
+"""
+Synthetic data shaped like the raw Walmart files (train.csv, stores.csv,
+features.csv). scale=1 gives roughly the row count of the real train.csv
+(45 stores, ~3,300 series, ~420k rows); scale multiplies the store count.
+
+    python benchmarks/synthetic.py --scale 10 --out data/synthetic/x10
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+N_WEEKS = 143
+FIRST_WEEK = pd.Timestamp('2010-02-05')
+DEPTS_PER_STORE = 74
+N_FEATURE_WEEKS = N_WEEKS + 39 # features.csv also covers the test.csv weeks
+
+def make_stores(n_stores, rng):
+    types = rng.choice(['A', 'B', 'C'], size=n_stores, p=[0.5, 0.38, 0.12])
+    size = np.where(types == 'A', rng.integers(150000, 220000, n_stores),
+           np.where(types == 'B', rng.integers(35000, 140000, n_stores), rng.integers(34000, 43000, n_stores)))
+    return pd.DataFrame({'Store': np.arange(1, n_stores + 1), 'Type': types, 'Size': size})
+
+def make_features(n_stores, rng):
+    dates = FIRST_WEEK + pd.to_timedelta(7 * np.arange(N_FEATURE_WEEKS), unit='D')
+    store = np.repeat(np.arange(1, n_stores + 1), N_FEATURE_WEEKS)
+    date = np.tile(dates.values, n_stores)
+    n = len(store)
+
+    markdowns = {}
+    for i in range(1, 6):
+        values = rng.gamma(1.5, 3000, n)
+        # MarkDowns only exist from Nov 2011 on and are often missing
+        values[(date < np.datetime64('2011-11-11')) | (rng.random(n) < 0.3)] = np.nan
+        markdowns[f'MarkDown{i}'] = values
+
+    holidays = pd.to_datetime(['2010-02-12', '2010-09-10', '2010-11-26', '2010-12-31',
+                               '2011-02-11', '2011-09-09', '2011-11-25', '2011-12-30',
+                               '2012-02-10', '2012-09-07', '2012-11-23', '2012-12-28'])
+    return pd.DataFrame({
+        'Store': store,
+        'Date': pd.to_datetime(date).strftime('%Y-%m-%d'),
+        'Temperature': np.round(rng.uniform(10, 95, n), 2),
+        'Fuel_Price': np.round(rng.uniform(2.5, 4.5, n), 3),
+        **markdowns,
+        'CPI': np.repeat(rng.uniform(126, 228, n_stores), N_FEATURE_WEEKS),
+        'Unemployment': np.repeat(rng.uniform(4, 14, n_stores), N_FEATURE_WEEKS),
+        'IsHoliday': np.isin(date, holidays.values)
+    })
+
+def make_train(n_stores, rng):
+    depts = np.concatenate([
+        np.sort(rng.choice(np.arange(1, 100), DEPTS_PER_STORE, replace=False)) for _ in range(n_stores)
+    ])
+    stores = np.repeat(np.arange(1, n_stores + 1), DEPTS_PER_STORE)
+    n_series = len(depts)
+
+    # Most series span the whole history, some start late or end early
+    start = np.where(rng.random(n_series) < 0.85, 0, rng.integers(0, N_WEEKS - 1, n_series))
+    end = np.where(rng.random(n_series) < 0.9, N_WEEKS, rng.integers(start + 1, N_WEEKS + 1))
+    lengths = end - start
+
+    series = np.repeat(np.arange(n_series), lengths)
+    week = start[series] + (np.arange(len(series)) - np.repeat(np.cumsum(lengths) - lengths, lengths))
+
+    level = rng.lognormal(9, 1.1, n_series)
+    yearly = 1 + 0.15 * np.sin(2 * np.pi * week / 52.18) + 0.4 * ((week % 52) >= 42) * ((week % 52) <= 46)
+    sales = level[series] * yearly * rng.normal(1, 0.12, len(series))
+    sales[rng.random(len(series)) < 0.002] *= -0.01 # returns show up as small negative sales
+
+    return pd.DataFrame({
+        'Store': stores[series],
+        'Dept': depts[series],
+        'Date': (FIRST_WEEK + pd.to_timedelta(7 * week, unit='D')).strftime('%Y-%m-%d'),
+        'Weekly_Sales': np.round(sales, 2),
+        'IsHoliday': False
+    })
+
+def make_walmart_like(scale=1, seed=42):
+    """
+    Returns (train, stores, features) dataframes in the raw CSV layout.
+    """
+    rng = np.random.default_rng(seed)
+    n_stores = max(1, int(round(45 * scale)))
+    stores = make_stores(n_stores, rng)
+    features = make_features(n_stores, rng)
+    train = make_train(n_stores, rng)
+
+    holiday_dates = set(features.loc[features['IsHoliday'], 'Date'])
+    train['IsHoliday'] = train['Date'].isin(holiday_dates)
+    return train, stores, features
+
+def write_walmart_like(out_dir, scale=1, seed=42):
+    train, stores, features = make_walmart_like(scale, seed)
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {
+        'train': os.path.join(out_dir, 'train.csv'),
+        'stores': os.path.join(out_dir, 'stores.csv'),
+        'features': os.path.join(out_dir, 'features.csv')
+    }
+    train.to_csv(paths['train'], index=False)
+    stores.to_csv(paths['stores'], index=False)
+    features.to_csv(paths['features'], index=False)
+    return paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=float, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', required=True)
+    args = parser.parse_args()
+
+    paths = write_walmart_like(args.out, args.scale, args.seed)
+    print(f"Wrote {paths}")
@@ -1,109 +1,404 @@
-import subprocess
+import argparse
+import ast
+import hashlib
+import inspect
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import sys
 import json
 
 ROOT_DIR = Path(__file__).resolve().parent.parent
 
-def calculate_weights(rmse_dict):
+# Allow running as `python retraining/retrain_pipeline.py`
+sys.path.append(str(ROOT_DIR))
+
+from src.data_cleaning.cleaner import clean_dataset
+from src.feature_engineering.features import create_features, create_features_incremental
+from src.feature_store.store import build_feature_store
+from src.inventory.demand_stats import build_demand_stats
+from src.training.train_lgbm import train_lgbm
+from src.training.train_xgb import train_xgb
+from src.training.train_prophet import train_prophet
+from src.training.backtest import run_backtest
+from src.training.common import ensemble_weights, train_threads
+from src.inference.artifacts import NATIVE_FILES, package_artifacts
+from src.inference.registry import publish_version
+from src.utils.metrics import Registry
+
+RAW_DIR = ROOT_DIR / "data" / "raw"
+PROCESSED_DIR = ROOT_DIR / "data" / "processed"
+ARTIFACTS_DIR = ROOT_DIR / "model_artifacts"
+
+# Input hashes and results of the last successful run of each stage
+STATE_PATH = PROCESSED_DIR / ".pipeline_state.json"
+# Stage timings of the last run in Prometheus text format, served by the
+# API's GET /metrics
+METRICS_PATH = PROCESSED_DIR / "pipeline_metrics.prom"
+
+class Stage:
     """
-    weight = (1 / rmse) / sum(1 / rmse)
+    One pipeline step. `inputs` and `outputs` are file or directory paths;
+    a stage runs after the stages producing its inputs, and is skipped when
+    the content of its inputs and its code (the module of `func` and every
+    src/ module it imports, see code_files) is unchanged since the last run
+    and its outputs still exist. A dict returned by `func` (e.g. a trainer's
+    metrics) is kept so skipped stages still report it.
     """
-    inv = {k: 1/v for k, v in rmse_dict.items() if v > 0}
-    total = sum(inv.values())
 
-    weights = {k: inv[k] / total for k in inv}
-    return weights
+    def __init__(self, name, func, inputs, outputs, args=()):
+        self.name = name
+        self.func = func
+        self.inputs = [Path(p) for p in inputs]
+        self.outputs = [Path(p) for p in outputs]
+        self.args = args
+
+    def run(self):
+        return self.func(*self.args)
+
+def _run_stage(stage, threads=None):
+    # Top-level so worker processes can unpickle it
+    if threads:
+        # This process's share of the cores (see train_threads)
+        os.environ["TRAIN_THREADS"] = str(threads)
+    start = time.perf_counter()
+    result = stage.run()
+    # Only structured results travel back (not e.g. the features dataframe)
+    if not isinstance(result, dict):
+        result = None
+    return result, time.perf_counter() - start
+
+def _file_digest(path, digest_cache):
+    stat = path.stat()
+    key = str(path)
+    cached = digest_cache.get(key)
+    if cached and cached["size"] == stat.st_size and cached["mtime"] == stat.st_mtime_ns:
+        return cached["sha256"]
 
-def get_rmse_from_output(output):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    digest_cache[key] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "sha256": sha.hexdigest()}
+    return sha.hexdigest()
+
+def content_hash(paths, digest_cache):
     """
-    Extracts the last line of the output and converts it to float.
+    Hash of the content of files / directory trees. Files whose size and
+    mtime are unchanged reuse their digest from `digest_cache`.
     """
-    lines = output.strip().splitlines()
-    if not lines:
-        return 0.0
-    try:
-        return float(lines[-1])
-    except ValueError:
-        print(f"Error parsing RMSE from output: {lines[-1]}")
-        return 0.0
-
-def run_pipeline():
-    print("\n--- STARTING FULL TRAINING PIPELINE ---\n")
+    sha = hashlib.sha256()
+    for path in paths:
+        files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+        for file in files:
+            if not file.exists():
+                sha.update(f"{file}:missing".encode())
+                continue
+            sha.update(os.path.relpath(file, ROOT_DIR).encode())
+            sha.update(_file_digest(file, digest_cache).encode())
+    return sha.hexdigest()
 
-    python_exe = sys.executable
-    rmse_scores = {}
+def _imported_modules(path):
+    # Dotted names of the src modules a file imports, at any level (lazy imports too)
+    with open(path, "r") as f:
+        tree = ast.parse(f.read(), filename=str(path))
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module)
+            # `from src.pkg import module` imports a module too
+            names.update(f"{node.module}.{alias.name}" for alias in node.names)
+    return sorted(name for name in names if name == "src" or name.startswith("src."))
 
-    # 1. Data Cleaning
-    print("[1/5] Running Data Cleaning...")
-    subprocess.run(
-        [python_exe, str(ROOT_DIR / "src/data_cleaning/cleaner.py")],
-        check=True,
-        cwd=str(ROOT_DIR)
-    )
+def _module_file(name):
+    base = ROOT_DIR.joinpath(*name.split("."))
+    for candidate in (base.with_suffix(".py"), base / "__init__.py"):
+        if candidate.is_file():
+            return candidate
+    return None
+
+def code_files(func):
+    """
+    The file defining `func` and every src/ module it imports, directly or
+    through other src/ modules, so editing a helper invalidates the stage.
+    """
+    pending = [Path(inspect.getsourcefile(func)).resolve()]
+    files = []
+    while pending:
+        path = pending.pop()
+        if path in files:
+            continue
+        files.append(path)
+        for name in _imported_modules(path):
+            module = _module_file(name)
+            if module is not None:
+                pending.append(module.resolve())
+    return sorted(files)
+
+def stage_hash(stage, digest_cache):
+    sha = hashlib.sha256()
+    sha.update(content_hash(stage.inputs + code_files(stage.func), digest_cache).encode())
+    sha.update(repr(stage.args).encode())
+    return sha.hexdigest()
+
+def load_state():
+    if STATE_PATH.exists():
+        with open(STATE_PATH, "r") as f:
+            return json.load(f)
+    return {"stages": {}, "digests": {}}
+
+def save_state(state):
+    os.makedirs(STATE_PATH.parent, exist_ok=True)
+    tmp_path = STATE_PATH.with_name(STATE_PATH.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=4)
+    os.replace(tmp_path, STATE_PATH)
+
+def plan_waves(stages):
+    """
+    Groups stages into waves: each stage lands in the first wave after every
+    stage that produces one of its inputs. Stages in one wave are independent.
+    """
+    producers = {out: stage.name for stage in stages for out in stage.outputs}
+    level = {}
+    for stage in stages:
+        deps = [producers[p] for p in stage.inputs if p in producers and producers[p] != stage.name]
+        level[stage.name] = 1 + max((level[d] for d in deps), default=-1)
 
-    # 2. Feature Engineering
-    print("\n[2/5] Running Feature Engineering...")
-    subprocess.run(
-        [python_exe, str(ROOT_DIR / "src/feature_engineering/features.py")],
-        check=True,
-        cwd=str(ROOT_DIR)
+    waves = [[] for _ in range(max(level.values()) + 1)]
+    for stage in stages:
+        waves[level[stage.name]].append(stage)
+    return waves
+
+def run_stages(stages, force=False, max_workers=None, timings=None):
+    """
+    Runs the stage DAG wave by wave. Independent stages in a wave run
+    concurrently in a process pool. Returns {stage name: result}; `timings`,
+    if given, is filled with {stage name: (seconds, 'ran' or 'skipped')}.
+    """
+    timings = {} if timings is None else timings
+    state = load_state()
+    digests = state.setdefault("digests", {})
+    results = {}
+
+    for wave in plan_waves(stages):
+        pending = []
+        for stage in wave:
+            current = stage_hash(stage, digests)
+            previous = state["stages"].get(stage.name, {})
+            outputs_exist = all(p.exists() for p in stage.outputs)
+            if not force and previous.get("hash") == current and outputs_exist:
+                print(f"[{stage.name}] inputs unchanged, skipping")
+                results[stage.name] = previous.get("result")
+                timings[stage.name] = (0.0, "skipped")
+            else:
+                pending.append((stage, current))
+
+        workers = min(len(pending), max_workers or train_threads())
+        if workers == 1:
+            # A single stage or a single core: a pool would only add overhead
+            outcomes = []
+            for stage, _ in pending:
+                print(f"[{stage.name}] running...")
+                outcomes.append(_run_stage(stage))
+        elif pending:
+            # Stages of a wave split the cores instead of each using all of them
+            threads = max(1, train_threads() // workers)
+            names = ", ".join(stage.name for stage, _ in pending)
+            print(f"[{names}] running in parallel ({threads} thread(s) each)...")
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_run_stage, stage, threads) for stage, _ in pending]
+                outcomes = [future.result() for future in futures]
+        else:
+            outcomes = []
+
+        for (stage, current), (result, seconds) in zip(pending, outcomes):
+            print(f"[{stage.name}] done in {seconds:.1f}s")
+            results[stage.name] = result
+            timings[stage.name] = (seconds, "ran")
+            state["stages"][stage.name] = {"hash": current, "result": result}
+        save_state(state)
+
+    return results
+
+def build_stages(backtest=False, force=False):
+    train_csv = RAW_DIR / "train.csv"
+    stores_csv = RAW_DIR / "stores.csv"
+    features_csv = RAW_DIR / "features.csv"
+    cleaned = PROCESSED_DIR / "sales_cleaned.parquet"
+    featured = PROCESSED_DIR / "sales_features.parquet"
+    feature_store = PROCESSED_DIR / "feature_store.npz"
+    demand_stats = PROCESSED_DIR / "demand_stats"
+    # Optional per-(Store, Dept) Lead_Time / Service_Level overrides
+    inventory_params = RAW_DIR / "inventory_params.csv"
+
+    stages = [
+        Stage("clean", clean_dataset,
+              inputs=[train_csv, stores_csv, features_csv], outputs=[cleaned],
+              args=(str(train_csv), str(stores_csv), str(features_csv), str(cleaned))),
+        # Incremental runs only append new weeks; a forced run rebuilds every
+        # row, so revised history from a new clean reaches the trainers
+        Stage("features", create_features if force else create_features_incremental,
+              inputs=[cleaned], outputs=[featured],
+              args=(str(cleaned), str(featured))),
+        Stage("feature_store", build_feature_store,
+              inputs=[cleaned], outputs=[feature_store],
+              args=(str(cleaned), str(feature_store))),
+        Stage("demand_stats", build_demand_stats,
+              inputs=[cleaned, inventory_params], outputs=[demand_stats],
+              args=(str(cleaned), str(demand_stats), str(inventory_params))),
+        Stage("lgbm", train_lgbm,
+              inputs=[featured], outputs=[ARTIFACTS_DIR / "lgbm_model.txt", ARTIFACTS_DIR / "feature_list.json"],
+              args=(str(featured), str(ARTIFACTS_DIR / "lgbm_model.txt"), None)),
+        Stage("xgb", train_xgb,
+              inputs=[featured], outputs=[ARTIFACTS_DIR / "xgb_model.ubj"],
+              args=(str(featured), str(ARTIFACTS_DIR / "xgb_model.ubj"))),
+        Stage("prophet", train_prophet,
+              inputs=[featured], outputs=[ARTIFACTS_DIR / "prophet_bundle.npz"],
+              args=(str(featured), str(ARTIFACTS_DIR / "prophet_bundle.npz"))),
+    ]
+    if backtest:
+        # Rolling-origin folds; their mean RMSEs then set the ensemble weights
+        stages.append(Stage("backtest", run_backtest,
+                            inputs=[featured], outputs=[PROCESSED_DIR / "backtest"],
+                            args=(str(featured), str(PROCESSED_DIR / "backtest"))))
+    return stages
+
+MODEL_ARTIFACTS = {model: NATIVE_FILES[model] for model in ["lgbm", "xgb", "prophet"]}
+
+def build_model_report(results):
+    """
+    RMSE, training seconds, best boosting round (tree models) and artifact
+    size per model, from the trainers' results.
+    """
+    report = {}
+    for model, artifact in MODEL_ARTIFACTS.items():
+        metrics = results.get(model) or {}
+        path = ARTIFACTS_DIR / artifact
+        report[model] = {
+            "rmse": metrics.get("rmse"),
+            "train_seconds": metrics.get("train_seconds", 0.0),
+            "best_iteration": metrics.get("best_iteration"),
+            "size_bytes": os.path.getsize(path) if path.exists() else 0
+        }
+        if not path.exists():
+            print(f" - {artifact}: NOT FOUND")
+    return report
+
+def write_pipeline_metrics(timings, rmse_scores, version, total_seconds, path=METRICS_PATH, model_report=None):
+    """
+    Writes the run's stage timings, model RMSEs, training times, model sizes
+    and version as a Prometheus text file (written aside and renamed, so a
+    scrape never reads half of it).
+    """
+    registry = Registry()
+    stage_seconds = registry.gauge(
+        "smartstock_pipeline_stage_seconds", "Seconds per stage of the last pipeline run (0 when skipped)",
+        ["stage", "status"]
+    )
+    for name, (seconds, status) in timings.items():
+        stage_seconds.set(round(seconds, 3), stage=name, status=status)
+    rmse = registry.gauge("smartstock_pipeline_model_rmse", "Validation RMSE per model of the last run", ["model"])
+    for model, score in rmse_scores.items():
+        rmse.set(score, model=model)
+    train_seconds = registry.gauge(
+        "smartstock_pipeline_model_train_seconds", "Training seconds per model of the last trained version", ["model"]
+    )
+    size = registry.gauge("smartstock_pipeline_model_size_bytes", "Model artifact size in bytes", ["model"])
+    for model, report in (model_report or {}).items():
+        train_seconds.set(report["train_seconds"], model=model)
+        size.set(report["size_bytes"], model=model)
+    registry.gauge("smartstock_pipeline_duration_seconds", "Duration of the last pipeline run").set(
+        round(total_seconds, 3)
     )
+    registry.gauge("smartstock_pipeline_last_success_timestamp_seconds", "End of the last successful run").set(
+        round(time.time(), 3)
+    )
+    registry.gauge("smartstock_pipeline_model_info", "Model version published by the last run", ["version"]).set(
+        1, version=version
+    )
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", "w") as f:
+        f.write(registry.render())
+    os.replace(f"{path}.tmp", path)
+
+def run_pipeline(force=False, backtest=False):
+    print("\n--- STARTING FULL TRAINING PIPELINE ---\n")
+    start = time.perf_counter()
+    timings = {}
+
+    # 1. Cleaning, features, feature store and demand stats, then the three trainers in parallel
+    print("[1/3] Running pipeline stages...")
+    results = run_stages(build_stages(backtest, force), force=force, timings=timings)
 
-    # 3. Train Models & Capture RMSE
-    print("\n[3/5] Training Models...")
-
-    print("Training LightGBM...")
-    output_lgbm = subprocess.check_output(
-        [python_exe, str(ROOT_DIR / "src/training/train_lgbm.py")],
-        cwd=str(ROOT_DIR)
-    ).decode()
-    rmse_scores["lgbm"] = get_rmse_from_output(output_lgbm)
-
-    print("Training XGBoost...")
-    output_xgb = subprocess.check_output(
-        [python_exe, str(ROOT_DIR / "src/training/train_xgb.py")],
-        cwd=str(ROOT_DIR)
-    ).decode()
-    rmse_scores["xgb"] = get_rmse_from_output(output_xgb)
-
-    print("Training Prophet...")
-    output_prophet = subprocess.check_output(
-        [python_exe, str(ROOT_DIR / "src/training/train_prophet.py")],
-        cwd=str(ROOT_DIR)
-    ).decode()
-    rmse_scores["prophet"] = get_rmse_from_output(output_prophet)
-
-    # 4. Calculate weights
-    print("\n[4/5] Calculating Ensemble Weights...")
-    weights = calculate_weights(rmse_scores)
-
-    ensemble_config = {
-        "rmse": rmse_scores,
-        "weights": weights
-    }
-
-    config_path = ROOT_DIR / "model_artifacts" / "ensemble_config.json"
+    rmse_scores = {}
+    for model in ["lgbm", "xgb", "prophet"]:
+        metrics = results.get(model)
+        if not metrics or not metrics.get("rmse"):
+            raise RuntimeError(f"No RMSE reported by the {model} trainer: {metrics}")
+        rmse_scores[model] = metrics["rmse"]
+
+    # 2. Calculate weights
+    print("\n[2/3] Calculating Ensemble Weights...")
+    step_start = time.perf_counter()
+    ensemble_config = {"rmse": rmse_scores}
+    if backtest:
+        # Mean over the backtest folds instead of the single 80/20 split
+        summary = results["backtest"]
+        weight_rmse = {model: summary["rmse"][model] for model in rmse_scores}
+        ensemble_config["backtest"] = {
+            "folds": summary["folds"],
+            "rmse": weight_rmse,
+            "rmse_std": {model: summary["rmse_std"][model] for model in rmse_scores}
+        }
+    else:
+        weight_rmse = rmse_scores
+    weights = ensemble_weights(weight_rmse)
+    ensemble_config["weights"] = weights
+
+    config_path = ARTIFACTS_DIR / "ensemble_config.json"
     os.makedirs(os.path.dirname(config_path), exist_ok=True)
     with open(config_path, "w") as f:
         json.dump(ensemble_config, f, indent=4)
 
     print("✅ Ensemble Weights Updated")
     print(json.dumps(ensemble_config, indent=4))
+    timings["ensemble_weights"] = (time.perf_counter() - step_start, "ran")
 
-    # 5. Model size check
-    print("\n[5/5] Checking model sizes (< 80MB):")
+    # 3. Native model set: compiled trees, size check, manifest.json
+    print("\n[3/3] Packaging model artifacts...")
+    step_start = time.perf_counter()
+    package_artifacts(str(ARTIFACTS_DIR))
+    timings["package"] = (time.perf_counter() - step_start, "ran")
 
-    for art in ["lgbm_model.pkl", "xgb_model.pkl", "prophet_model.pkl"]:
-        path = ROOT_DIR / "model_artifacts" / art
-        if path.exists():
-            size = os.path.getsize(path) / (1024 * 1024)
-            print(f" - {art}: {size:.2f} MB")
-        else:
-            print(f" - {art}: NOT FOUND")
+    print("\nModel report:")
+    model_report = build_model_report(results)
+    print(f" {'model':<8} | {'RMSE':>10} | {'train s':>8} | {'rounds':>6} | {'size MB':>8}")
+    for model, report in model_report.items():
+        rounds = report.get("best_iteration") or "-"
+        print(f" {model:<8} | {report['rmse']:>10,.2f} | {report['train_seconds']:>8.1f} | {rounds:>6} | "
+              f"{report['size_bytes'] / (1024 * 1024):>8.2f}")
+
+    # Versioned copy for running servers to hot-reload
+    step_start = time.perf_counter()
+    version = publish_version(str(ARTIFACTS_DIR))
+    timings["publish"] = (time.perf_counter() - step_start, "ran")
+    print(f"\nModel version: {version}")
 
-    print("\n--- PIPELINE COMPLETE ---\n")
+    total_seconds = time.perf_counter() - start
+    write_pipeline_metrics(timings, rmse_scores, version, total_seconds, model_report=model_report)
+    print(f"\n--- PIPELINE COMPLETE in {total_seconds:.1f}s ---\n")
+    return ensemble_config
 
 if __name__ == "__main__":
-    run_pipeline()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--force", action="store_true", help="rerun every stage, ignoring cached hashes")
+    parser.add_argument("--backtest", action="store_true",
+                        help="set the ensemble weights from a rolling-origin backtest")
+    args = parser.parse_args()
+
+    run_pipeline(force=args.force, backtest=args.backtest)
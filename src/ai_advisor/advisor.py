@@ -1,41 +1,198 @@
-import google.generativeai as genai
+import asyncio
+import bisect
+import functools
+import hashlib
 import os
+import time
 from dotenv import load_dotenv
 
+from src.utils.cache import PredictionCache
+from src.utils.metrics import AI_ADVISOR_SECONDS, ERRORS
+
 load_dotenv()
 
+# Suggestions are cached per (stock status, order-qty band, trend) bucket
+ORDER_QTY_BANDS = [500, 1000, 2500, 5000, 10000, 25000, 50000, 100000]
+TREND_TOLERANCE = 0.05
+# Weeks summed into next_3_month_sales (HORIZON_WEEKS in src/inference/predictor.py)
+QUARTER_WEEKS = 13
+
+class GeminiBackend:
+    def __init__(self, api_key, model_name="gemini-1.5-flash"):
+        # Imported here: the client and its grpc stack take ~0.4s to import
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    async def generate(self, prompt):
+        response = await self.model.generate_content_async(prompt)
+        return response.text.strip()
+
+class StubBackend:
+    """
+    Offline stand-in for Gemini: deterministic text after a fixed latency,
+    for load-testing the suggestion path without network calls.
+    """
+
+    def __init__(self, latency_seconds=0.05):
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+
+    async def generate(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.latency_seconds)
+        digest = hashlib.sha256(prompt.encode()).hexdigest()[:8]
+        return f"Stub suggestion {digest}: keep stock between safety stock and the reorder point."
+
+def backend_from_env():
+    """
+    AI_ADVISOR_BACKEND=stub selects the offline stub (latency from
+    AI_ADVISOR_STUB_LATENCY); otherwise Gemini when GEMINI_API_KEY is set.
+    """
+    if os.getenv("AI_ADVISOR_BACKEND", "gemini") == "stub":
+        return StubBackend(float(os.getenv("AI_ADVISOR_STUB_LATENCY", "0.05")))
+    api_key = os.getenv("GEMINI_API_KEY")
+    return GeminiBackend(api_key) if api_key else None
+
+def order_qty_band(qty):
+    # (low, high) units; high is None for the top band
+    i = bisect.bisect_left(ORDER_QTY_BANDS, qty) if qty > 0 else -1
+    if i < 0:
+        return (0, 0)
+    low = ORDER_QTY_BANDS[i - 1] if i > 0 else 0
+    high = ORDER_QTY_BANDS[i] if i < len(ORDER_QTY_BANDS) else None
+    return (low, high)
+
+def demand_trend(forecast_data):
+    # Average weekly demand of the 13-week recursive forecast against next week
+    weekly = forecast_data['next_week_sales']
+    ahead = forecast_data['next_3_month_sales'] / QUARTER_WEEKS
+    if weekly <= 0:
+        return 'flat'
+    if ahead > weekly * (1 + TREND_TOLERANCE):
+        return 'up'
+    if ahead < weekly * (1 - TREND_TOLERANCE):
+        return 'down'
+    return 'flat'
+
+def rule_based_suggestion(forecast_data, inventory_data):
+    """
+    Deterministic suggestion used when the LLM is slow or failing.
+    """
+    status = inventory_data['stock_status']
+    qty = inventory_data['recommended_order_qty']
+    trend = demand_trend(forecast_data)
+
+    if status == "OUT OF STOCK":
+        advice = f"Stock is out: place an expedited order of about {qty:,.0f} units now."
+    elif status == "UNDERSTOCK":
+        advice = f"Stock is below safety stock: order about {qty:,.0f} units now to avoid stockouts."
+    elif status == "REORDER RECOMMENDED":
+        advice = f"Stock is below the reorder point: order about {qty:,.0f} units within the lead time."
+    else:
+        advice = "Stock covers expected demand: no order is needed this week."
+
+    if trend == 'up':
+        advice += " Demand is trending up, so review stock levels again before the next cycle."
+    elif trend == 'down':
+        advice += " Demand is trending down, so avoid ordering above the recommendation."
+    return advice
+
 class AIAdvisor:
-    def __init__(self):
-        self.api_key = os.getenv("GEMINI_API_KEY")
-        if self.api_key:
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel("gemini-1.5-flash")
+    def __init__(self, backend=None, max_concurrency=8, timeout_seconds=2.0,
+                 call_timeout_seconds=15.0, cache_size=256, cache_ttl_seconds=900):
+        """
+        timeout_seconds: latency budget of a request; past it the rule-based
+            suggestion is returned while the call finishes in the background
+        call_timeout_seconds: hard limit of one backend call
+        """
+        self.backend = backend if backend is not None else backend_from_env()
+        self.timeout_seconds = timeout_seconds
+        self.call_timeout_seconds = call_timeout_seconds
+        self.max_concurrency = max_concurrency
+        # (loop, semaphore): created in the loop that uses it, since before
+        # Python 3.10 a Semaphore binds to the loop current at creation and
+        # the advisor is built on the API's loader thread
+        self._semaphore = (None, None)
+        self.cache = PredictionCache(max_entries=cache_size, ttl_seconds=cache_ttl_seconds)
+        self.counters = {'timeouts': 0, 'errors': 0}
+
+    def bucket(self, forecast_data, inventory_data):
+        return (
+            inventory_data['stock_status'],
+            order_qty_band(inventory_data['recommended_order_qty']),
+            demand_trend(forecast_data)
+        )
+
+    def build_prompt(self, bucket):
+        # Built from the bucket only, so a cached answer fits every request in it
+        status, (low, high), trend = bucket
+        if high is None:
+            qty = f"more than {low:,} units"
+        elif high == 0:
+            qty = "none"
         else:
-            self.model = None
+            qty = f"between {low:,} and {high:,} units"
 
-    def get_suggestion(self, forecast_data, inventory_data):
-        if not self.model:
-            return "Gemini API key not configured. Please add GEMINI_API_KEY to your .env file."
+        return f"""
+        Analyze the following inventory situation for a Walmart store department:
+
+        - Stock Status: {status}
+        - Recommended Order Qty: {qty}
+        - Demand Trend (next 3 months vs next week): {trend}
 
-        prompt = f"""
-        Analyze the following sales forecast and inventory data for a Walmart store department:
-        
-        Forecast:
-        - Next Week: {forecast_data['next_week_sales']}
-        - Next Month: {forecast_data['next_month_sales']}
-        - Next 3 Months: {forecast_data['next_3_month_sales']}
-        
-        Inventory:
-        - Status: {inventory_data['stock_status']}
-        - Reorder Point: {inventory_data['reorder_point']}
-        - Safety Stock: {inventory_data['safety_stock']}
-        - Recommended Order Qty: {inventory_data['recommended_order_qty']}
-        
         Provide a concise, actionable business recommendation (2-3 sentences).
         """
-        
+
+    @property
+    def semaphore(self):
+        loop = asyncio.get_running_loop()
+        if self._semaphore[0] is not loop:
+            self._semaphore = (loop, asyncio.Semaphore(self.max_concurrency))
+        return self._semaphore[1]
+
+    async def _generate(self, prompt):
+        async with self.semaphore:
+            # The backend call itself (cache misses only), past the semaphore
+            start = time.perf_counter()
+            outcome = 'error'
+            try:
+                result = await asyncio.wait_for(self.backend.generate(prompt), self.call_timeout_seconds)
+                outcome = 'ok'
+                return result
+            except asyncio.TimeoutError:
+                outcome = 'timeout'
+                raise
+            finally:
+                AI_ADVISOR_SECONDS.observe(time.perf_counter() - start, call='backend', outcome=outcome)
+
+    async def get_suggestion_async(self, forecast_data, inventory_data):
+        if not self.backend:
+            return "Gemini API key not configured. Please add GEMINI_API_KEY to your .env file."
+
+        bucket = self.bucket(forecast_data, inventory_data)
+        prompt = self.build_prompt(bucket)
+        # What a request waits for: cache hit, shared or own backend call, or the budget
+        start = time.perf_counter()
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            suggestion = await asyncio.wait_for(
+                self.cache.get_or_compute(repr(bucket), functools.partial(self._generate, prompt)), self.timeout_seconds
+            )
+            AI_ADVISOR_SECONDS.observe(time.perf_counter() - start, call='suggestion', outcome='ok')
+            return suggestion
+        except asyncio.TimeoutError:
+            self.counters['timeouts'] += 1
+            AI_ADVISOR_SECONDS.observe(time.perf_counter() - start, call='suggestion', outcome='timeout')
         except Exception as e:
-            return f"Error generating suggestion: {str(e)}"
+            print(f"AI suggestion failed: {e}")
+            self.counters['errors'] += 1
+            AI_ADVISOR_SECONDS.observe(time.perf_counter() - start, call='suggestion', outcome='error')
+            ERRORS.inc(where='ai_advisor', type=type(e).__name__)
+        return rule_based_suggestion(forecast_data, inventory_data)
+
+    def get_suggestion(self, forecast_data, inventory_data):
+        # Blocking variant for scripts; not for use inside a running event loop
+        return asyncio.run(self.get_suggestion_async(forecast_data, inventory_data))
+
+    def stats(self):
+        return {**self.cache.stats(), **self.counters}
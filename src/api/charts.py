@@ -0,0 +1,81 @@
+import functools
+import hashlib
+import json
+
+SALES_LABELS = ['Next Week', 'Next Month', 'Next 3 Months']
+
+def _layout(fig):
+    fig.update_layout(
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font_color='#e6f0fb',
+        margin=dict(l=20, r=20, t=20, b=20),
+        height=300
+    )
+
+@functools.lru_cache(maxsize=1)
+def chart_specs():
+    """
+    Plotly specs of the results page charts, built (and validated by Plotly)
+    once per process with placeholder values; results.html fills in the
+    values of `chart_data`. The layout template both figures share is kept
+    once, under 'template'.
+    """
+    import plotly
+    import plotly.graph_objs as go
+
+    # 1. Sales Trend Plot
+    sales_fig = go.Figure()
+    sales_fig.add_trace(go.Bar(
+        x=SALES_LABELS,
+        y=[0, 0, 0],
+        marker_color='#58A6FF'
+    ))
+    _layout(sales_fig)
+
+    # 2. Stock Plot
+    stock_fig = go.Figure()
+    stock_fig.add_trace(go.Indicator(
+        mode = "gauge+number",
+        value = 0,
+        domain = {'x': [0, 1], 'y': [0, 1]},
+        title = {'text': "Current Stock Level"},
+        gauge = {
+            'axis': {'range': [None, 1]},
+            'steps': [
+                {'range': [0, 0], 'color': "red"},
+                {'range': [0, 1], 'color': "yellow"}
+            ],
+            'threshold': {
+                'line': {'color': "white", 'width': 4},
+                'thickness': 0.75,
+                'value': 1
+            }
+        }
+    ))
+    _layout(stock_fig)
+
+    sales = json.loads(json.dumps(sales_fig, cls=plotly.utils.PlotlyJSONEncoder))
+    stock = json.loads(json.dumps(stock_fig, cls=plotly.utils.PlotlyJSONEncoder))
+    template = sales['layout'].pop('template')
+    stock['layout'].pop('template')
+    return {'template': template, 'sales': sales, 'stock': stock}
+
+@functools.lru_cache(maxsize=1)
+def chart_specs_json():
+    # (body, etag) served by GET /charts/spec
+    body = json.dumps(chart_specs(), separators=(',', ':'))
+    return body, hashlib.sha256(body.encode()).hexdigest()[:16]
+
+def chart_data(forecast, inventory, current_stock):
+    """
+    The only per-request values of the charts.
+    """
+    return {
+        'sales': [forecast['next_week_sales'], forecast['next_month_sales'], forecast['next_3_month_sales']],
+        'stock': {
+            'value': current_stock,
+            'safety_stock': inventory['safety_stock'],
+            'reorder_point': inventory['reorder_point']
+        }
+    }
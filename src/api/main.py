@@ -1,3 +1,4 @@
+import asyncio
 import sys
 from pathlib import Path
 
@@ -5,30 +6,311 @@ from pathlib import Path
 root_path = Path(__file__).resolve().parent.parent.parent
 sys.path.append(str(root_path))
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request, Form
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from src.inference.predictor import SalesPredictor
+from typing import List, Optional
+from src.inference.batching import MicroBatcher
 from src.inventory.optimization import InventoryOptimizer
-from src.ai_advisor.advisor import AIAdvisor
-import pandas as pd
+from src.utils.cache import PredictionCache, cache_key
+from src.api.charts import chart_data, chart_specs_json
+from src.inventory.reorder_report import reorder_report, report_records, report_summary
+from src.utils.metrics import REGISTRY, CHART_SECONDS, ERRORS, HTTP_REQUEST_SECONDS
+import datetime
+import hmac
+import threading
+import time
+import numpy as np
 import os
 import json
-import plotly
-import plotly.graph_objs as go
 
-app = FastAPI(title="Walmart Sales Forecasting API")
+# Models, feature store and the AI advisor (and their heavy imports: pandas,
+# LightGBM/sklearn, XGBoost, Prophet, google.generativeai) load in a
+# background thread, so /health answers as soon as uvicorn is up and /ready
+# flips once they are warmed. API_LAZY_STARTUP=0 loads them before serving.
+LAZY_STARTUP = os.getenv("API_LAZY_STARTUP", "1") != "0"
+READY_TIMEOUT_SECONDS = float(os.getenv("API_READY_TIMEOUT", "120"))
+
+@asynccontextmanager
+async def lifespan(app):
+    start_loading(background=LAZY_STARTUP)
+    yield
+
+class RequestMetricsMiddleware:
+    """
+    Latency of every request by route template and status, as a plain ASGI
+    middleware (BaseHTTPMiddleware would add far more than it measures).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the shared scope
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"], route=route.path if route else "unmatched", status=status[0]
+            )
+
+app = FastAPI(title="Walmart Sales Forecasting API", lifespan=lifespan)
+app.add_middleware(GZipMiddleware, minimum_size=500)
+app.add_middleware(RequestMetricsMiddleware)
 
 # Setup templates with absolute path
 templates = Jinja2Templates(directory=str(root_path / "frontend" / "templates"))
 
 # Initialize components with absolute model path if needed
 # (Assuming SalesPredictor handles its own relative path, but let's be safe)
-predictor = SalesPredictor(model_dir=str(root_path / "model_artifacts"))
+MODEL_DIR = root_path / "model_artifacts"
+# Active model version (see src/inference/registry.py); new versions are
+# picked up every MODEL_WATCH_INTERVAL seconds (0 disables) or through
+# POST /admin/models/reload
+model_registry = None
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "30"))
+# The /admin endpoints require it in the X-Admin-Token header and are
+# disabled when it is not set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 inventory_optimizer = InventoryOptimizer()
-ai_advisor = AIAdvisor()
+ai_advisor = None
+
+# Concurrent single predictions are grouped into one predict_batch call;
+# PREDICT_BATCH_MAX_SIZE=0 scores every request on its own
+PREDICT_BATCH_MAX_SIZE = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "64"))
+PREDICT_BATCH_MAX_WAIT_MS = float(os.getenv("PREDICT_BATCH_MAX_WAIT_MS", "2"))
+prediction_batcher = None
+
+def predict_rows(rows):
+    # One predictor per call, so the reported version is the one that scored
+    version, predictor = model_registry.active
+    # Month and 3-month totals sum a recursive weekly forecast from the feature store history
+    history, _ = feature_store.get_recent_array([(row['Store'], row['Dept']) for row in rows])
+    forecasts = predictor.predict_periods(rows, history, defaults=horizon_defaults())
+    return [{**forecast, 'model_version': version} for forecast in forecasts]
+
+def predict_next_week(rows):
+    # next_week_sales only: one model call instead of the 13-week recursion;
+    # rows carry their lag/rolling features (history_features_batch)
+    version, predictor = model_registry.active
+    return [{**forecast, 'model_version': version} for forecast in predictor.predict_next_week(rows)]
+
+async def forecast_one(input_data):
+    if prediction_batcher is None:
+        return (await run_in_threadpool(predict_rows, [input_data]))[0]
+    return await prediction_batcher.submit(input_data)
+
+# Repeated dashboard requests reuse forecast + inventory (AI suggestions have
+# their own cache in AIAdvisor); dropped whenever the model version changes
+PREDICTION_CACHE_SIZE = 1024
+PREDICTION_CACHE_TTL_SECONDS = 60
+prediction_cache = PredictionCache(
+    max_entries=PREDICTION_CACHE_SIZE,
+    ttl_seconds=PREDICTION_CACHE_TTL_SECONDS,
+    fingerprint=lambda: model_registry.version if model_registry else None
+)
+
+# Online lag/rolling history per (Store, Dept)
+FEATURE_STORE_PATH = root_path / "data" / "processed" / "feature_store.npz"
+SALES_HISTORY_PATH = root_path / "data" / "processed" / "sales_cleaned.parquet"
+feature_store = None
+
+# Demand std, lead time and service level per (Store, Dept), built by the
+# pipeline (src/inventory/demand_stats.py) and memory-mapped
+DEMAND_STATS_PATH = root_path / "data" / "processed" / "demand_stats"
+demand_stats = None
+
+# Written by retraining/retrain_pipeline.py, appended to GET /metrics
+PIPELINE_METRICS_PATH = root_path / "data" / "processed" / "pipeline_metrics.prom"
+
+# Loading state, shared with the loader thread
+startup = {
+    "started": False,
+    "ready": threading.Event(),
+    "error": None,
+    "timings": {}
+}
+_startup_lock = threading.Lock()
+
+def load_components():
+    global model_registry, ai_advisor, feature_store, demand_stats, prediction_batcher
+    timings = startup["timings"]
+    process_start = time.perf_counter()
+
+    def lap(name, since):
+        timings[name] = round(time.perf_counter() - since, 3)
+        return time.perf_counter()
+
+    try:
+        t = time.perf_counter()
+        from src.inference.predictor import SalesPredictor
+        from src.inference.registry import ModelRegistry
+        from src.feature_store.store import FeatureStore
+        t = lap("import_models", t)
+
+        if FEATURE_STORE_PATH.exists():
+            feature_store = FeatureStore.load(str(FEATURE_STORE_PATH))
+        elif SALES_HISTORY_PATH.exists():
+            feature_store = FeatureStore.from_file(str(SALES_HISTORY_PATH))
+        else:
+            feature_store = FeatureStore()
+        t = lap("load_feature_store", t)
+
+        from src.inventory.demand_stats import DemandStats
+        if DEMAND_STATS_PATH.exists():
+            demand_stats = DemandStats.load(str(DEMAND_STATS_PATH))
+        else:
+            print(f"No demand statistics at {DEMAND_STATS_PATH}; using default demand std and lead time")
+            demand_stats = DemandStats.empty()
+        t = lap("load_demand_stats", t)
+
+        from src.ai_advisor.advisor import AIAdvisor
+        ai_advisor = AIAdvisor()
+        t = lap("load_ai_advisor", t)
+
+        # Every model version (this one included) is scored on a smoke batch
+        # before taking traffic, which also warms it up
+        compiled_trees = os.getenv("PREDICT_COMPILED_TREES", "1") != "0"
+        registry = ModelRegistry(
+            MODEL_DIR,
+            load_predictor=lambda directory: SalesPredictor(model_dir=directory, compiled_trees=compiled_trees),
+            smoke_rows=smoke_rows()
+        )
+        registry.activate()
+        if MODEL_WATCH_INTERVAL > 0:
+            registry.watch(MODEL_WATCH_INTERVAL)
+        t = lap("load_models", t)
+
+        if PREDICT_BATCH_MAX_SIZE > 0:
+            prediction_batcher = MicroBatcher(
+                predict_rows,
+                max_batch_size=PREDICT_BATCH_MAX_SIZE,
+                max_wait_ms=PREDICT_BATCH_MAX_WAIT_MS
+            )
+        model_registry = registry
+        timings["total"] = round(time.perf_counter() - process_start, 3)
+        print(f"Models ready in {timings['total']:.1f}s: {timings}")
+    except Exception as e:
+        startup["error"] = f"{type(e).__name__}: {e}"
+        print(f"Model loading failed: {startup['error']}")
+    finally:
+        startup["ready"].set()
+
+def start_loading(background=True):
+    with _startup_lock:
+        if startup["started"]:
+            return
+        startup["started"] = True
+    if background:
+        threading.Thread(target=load_components, name="load-components", daemon=True).start()
+    else:
+        load_components()
+
+# Scrape-time views of the serving state for GET /metrics
+REGISTRY.gauge(
+    "smartstock_model_info", "Active model version (always 1)", ["version"],
+    read=lambda: {(model_registry.version,): 1} if model_registry and model_registry.version else {}
+)
+REGISTRY.gauge(
+    "smartstock_ready", "1 once models are loaded and serving",
+    read=lambda: int(startup["ready"].is_set() and not startup["error"])
+)
+REGISTRY.gauge(
+    "smartstock_startup_step_seconds", "Seconds per model loading step at startup", ["step"],
+    read=lambda: {(step,): seconds for step, seconds in startup["timings"].items()}
+)
+REGISTRY.counter(
+    "smartstock_prediction_cache_total", "Prediction cache lookups by result", ["result"],
+    read=lambda: {(name,): prediction_cache.counters[name] for name in ('hits', 'misses', 'coalesced')}
+)
+REGISTRY.counter(
+    "smartstock_batcher_total", "Micro-batched single predictions: requests, batches and rows", ["event"],
+    read=lambda: {(name,): prediction_batcher.counters[name] for name in ('requests', 'batches', 'rows')}
+    if prediction_batcher else {}
+)
+
+def log_error(where, e):
+    # Counted in GET /metrics by handler and exception type
+    ERRORS.inc(where=where, type=type(e).__name__)
+    print(f"Error in {where}: {type(e).__name__}: {e}")
+
+def server_error(where, e):
+    log_error(where, e)
+    return HTTPException(status_code=500, detail=str(e))
+
+async def ensure_ready():
+    # Requests arriving during startup wait for the models (or start loading
+    # them when the app runs without its lifespan, e.g. in a TestClient)
+    start_loading()
+    if not startup["ready"].is_set():
+        await run_in_threadpool(startup["ready"].wait, READY_TIMEOUT_SECONDS)
+    if startup["error"]:
+        raise HTTPException(status_code=503, detail=f"Models failed to load: {startup['error']}")
+    if not startup["ready"].is_set():
+        raise HTTPException(status_code=503, detail="Models are still loading")
+
+def history_features_batch(keys):
+    # Series (or lags) with no recorded history get DEFAULT_HISTORY_FEATURES
+    from src.feature_store.store import DEFAULT_HISTORY_FEATURES
+    columns, values, _ = feature_store.get_features_array(keys)
+    defaults = np.array([DEFAULT_HISTORY_FEATURES[c] for c in columns], dtype=np.float64)
+    values = np.where(np.isnan(values), defaults, values)
+    return [dict(zip(columns, row)) for row in values.tolist()]
+
+def history_features(store, dept):
+    return history_features_batch([(store, dept)])[0]
+
+def horizon_defaults():
+    # FEATURE_COLUMNS values for series the feature store has no history for
+    from src.feature_store.store import DEFAULT_FEATURE_VALUES
+    return DEFAULT_FEATURE_VALUES
+
+def inventory_inputs(keys, lead_times=None):
+    """
+    (demand_std, lead_time, z) arrays for many (Store, Dept) keys from the
+    demand statistics index; given lead times (None = the item's own from
+    the index) take precedence.
+    """
+    stores = [store for store, _ in keys]
+    depts = [dept for _, dept in keys]
+    if lead_times is not None:
+        lead_times = np.array(lead_times, dtype=np.float64)
+    return demand_stats.inventory_inputs(stores, depts, lead_times)
+
+def inventory_metrics(store, dept, current_stock, predicted_sales, lead_time=None):
+    demand_std, lead_times, z = inventory_inputs([(store, dept)], [lead_time])
+    return inventory_optimizer.calculate_metrics(
+        current_stock,
+        predicted_sales,
+        historical_std=float(demand_std[0]),
+        lead_time=float(lead_times[0]),
+        service_level=float(z[0])
+    )
+
+def smoke_rows():
+    now = datetime.datetime.now()
+    keys = [(store, dept) for store in (1, 20, 45) for dept in (1, 38, 92)]
+    return [
+        build_api_input(PredictionRequest(store=store, dept=dept, current_stock=0), now, history)
+        for (store, dept), history in zip(keys, history_features_batch(keys))
+    ]
 
 class PredictionRequest(BaseModel):
     store: int
@@ -46,6 +328,63 @@ class PredictionRequest(BaseModel):
     unemployment: float = 8.1
     size: int = 151315
     type: str = 'A'
+    # Days; the series' lead time from the demand statistics when omitted
+    lead_time: Optional[float] = None
+
+class BatchPredictionRequest(BaseModel):
+    items: List[PredictionRequest]
+    include_ai_suggestion: bool = False
+
+class HorizonRequest(BaseModel):
+    items: List[PredictionRequest]
+    # Weeks ahead, up to HORIZON_WEEKS (src/inference/predictor.py)
+    weeks: int = 13
+
+class WeeklyActual(BaseModel):
+    store: int
+    dept: int
+    date: str
+    weekly_sales: float
+
+class ActualsRequest(BaseModel):
+    items: List[WeeklyActual]
+
+class ReorderItem(BaseModel):
+    store: int
+    dept: int
+    current_stock: float
+    # Days; the series' lead time from the demand statistics when omitted
+    lead_time: Optional[float] = None
+
+class ReorderReportRequest(BaseModel):
+    items: List[ReorderItem]
+
+class ModelReloadRequest(BaseModel):
+    # Published version id; the latest when omitted
+    version: Optional[str] = None
+
+def build_api_input(request, now, history):
+    return {
+        'Store': request.store,
+        'Dept': request.dept,
+        'IsHoliday': int(request.is_holiday),
+        'Temperature': request.temperature,
+        'Fuel_Price': request.fuel_price,
+        'MarkDown1': request.markdown1,
+        'MarkDown2': request.markdown2,
+        'MarkDown3': request.markdown3,
+        'MarkDown4': request.markdown4,
+        'MarkDown5': request.markdown5,
+        'CPI': request.cpi,
+        'Unemployment': request.unemployment,
+        'Size': request.size,
+        'Year': now.year,
+        'Month': now.month,
+        'Week': now.isocalendar()[1],
+        'Day': now.day,
+        'DayOfWeek': now.weekday(),
+        **history
+    }
 
 @app.get("/", response_class=HTMLResponse)
 async def get_index(request: Request):
@@ -62,9 +401,10 @@ async def post_predict(
     current_stock: float = Form(...),
     lead_time: int = Form(...)
 ):
+    await ensure_ready()
     try:
         # Construct input for predictor
-        now = pd.Timestamp.now()
+        now = datetime.datetime.now()
         input_data = {
             'Store': store,
             'Dept': dept,
@@ -80,31 +420,30 @@ async def post_predict(
             'Week': now.isocalendar()[1],
             'Day': now.day,
             'DayOfWeek': now.weekday(),
-            'Lag_1': 20000, 'Lag_2': 20000, 'Lag_3': 20000, 'Lag_4': 20000, 
-            'Lag_8': 20000, 'Lag_12': 20000, 'Lag_16': 20000, 'Lag_20': 20000, 'Lag_24': 20000,
-            'RollingMean_4': 20000, 'RollingStd_4': 1000, 
-            'RollingMean_12': 20000, 'RollingStd_12': 1500
+            **history_features(store, dept)
         }
 
-        # 1. Forecast Sales
-        forecast = predictor.predict(input_data)
-        
-        # Determine prediction value based on period
-        target_sales = forecast['next_week_sales']
-        if period == 'month':
-            target_sales = forecast['next_month_sales']
-        elif period == '3months':
-            target_sales = forecast['next_3_month_sales']
-
-        # 2. Inventory Optimization
-        inventory = inventory_optimizer.calculate_metrics(
-            current_stock, 
-            target_sales, 
-            historical_std=2000
-        )
-        
+        async def compute():
+            # 1. Forecast Sales
+            forecast = await forecast_one(input_data)
+
+            # Determine prediction value based on period
+            target_sales = forecast['next_week_sales']
+            if period == 'month':
+                target_sales = forecast['next_month_sales']
+            elif period == '3months':
+                target_sales = forecast['next_3_month_sales']
+
+            # 2. Inventory Optimization (demand std and service level of this series)
+            inventory = inventory_metrics(store, dept, current_stock, target_sales, lead_time)
+            return forecast, target_sales, inventory
+
+        # Model input (incl. feature store history), stock and period fully determine the result
+        key = cache_key("form", input_data, current_stock, period, lead_time)
+        forecast, target_sales, inventory = await prediction_cache.get_or_compute(key, compute)
+
         # 3. AI Suggestions
-        ai_suggestion = ai_advisor.get_suggestion(forecast, inventory)
+        ai_suggestion = await ai_advisor.get_suggestion_async(forecast, inventory)
 
         # Prepare results for template
         predictions = [{
@@ -115,51 +454,9 @@ async def post_predict(
             'Reorder_Point': f"{inventory['reorder_point']:.0f} units"
         }]
 
-        # Create Plotly Charts
-        # 1. Sales Trend Plot
-        sales_fig = go.Figure()
-        sales_fig.add_trace(go.Bar(
-            x=['Next Week', 'Next Month', 'Next 3 Months'],
-            y=[forecast['next_week_sales'], forecast['next_month_sales'], forecast['next_3_month_sales']],
-            marker_color='#58A6FF'
-        ))
-        sales_fig.update_layout(
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            font_color='#e6f0fb',
-            margin=dict(l=20, r=20, t=20, b=20),
-            height=300
-        )
-        graphJSON_sales = json.dumps(sales_fig, cls=plotly.utils.PlotlyJSONEncoder)
-
-        # 2. Stock Plot
-        stock_fig = go.Figure()
-        stock_fig.add_trace(go.Indicator(
-            mode = "gauge+number",
-            value = current_stock,
-            domain = {'x': [0, 1], 'y': [0, 1]},
-            title = {'text': "Current Stock Level"},
-            gauge = {
-                'axis': {'range': [None, inventory['reorder_point'] * 1.5]},
-                'steps': [
-                    {'range': [0, inventory['safety_stock']], 'color': "red"},
-                    {'range': [inventory['safety_stock'], inventory['reorder_point']], 'color': "yellow"}
-                ],
-                'threshold': {
-                    'line': {'color': "white", 'width': 4},
-                    'thickness': 0.75,
-                    'value': inventory['reorder_point']
-                }
-            }
-        ))
-        stock_fig.update_layout(
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            font_color='#e6f0fb',
-            margin=dict(l=20, r=20, t=20, b=20),
-            height=300
-        )
-        graphJSON_stock = json.dumps(stock_fig, cls=plotly.utils.PlotlyJSONEncoder)
+        # Chart values only; the specs come once from /charts/spec
+        with CHART_SECONDS.time(chart="results_page"):
+            chart_data_json = json.dumps(chart_data(forecast, inventory, current_stock))
 
         # Prepare Gemini Summary Lines
         summary_lines = [
@@ -178,54 +475,38 @@ async def post_predict(
         return templates.TemplateResponse("results.html", {
             "request": request,
             "predictions": predictions,
-            "graphJSON_sales": graphJSON_sales,
-            "graphJSON_stock": graphJSON_stock,
+            "chart_data_json": chart_data_json,
             "summary_lines": summary_lines
         })
 
     except Exception as e:
-        print(f"Error in post_predict: {str(e)}")
+        log_error("post_predict", e)
         # Fallback error response
         return HTMLResponse(content=f"<h3>Error processing prediction: {str(e)}</h3>", status_code=500)
 
+async def forecast_and_inventory(request):
+    await ensure_ready()
+    now = datetime.datetime.now()
+    input_data = build_api_input(request, now, history_features(request.store, request.dept))
+
+    async def compute():
+        forecast = await forecast_one(input_data)
+        inventory = inventory_metrics(
+            request.store, request.dept, request.current_stock, forecast['next_week_sales'], request.lead_time
+        )
+        return forecast, inventory
+
+    key = cache_key("predict", input_data, request.current_stock, request.lead_time)
+    return await prediction_cache.get_or_compute(key, compute)
+
 @app.post("/predict")
 async def predict_api(request: PredictionRequest):
+    await ensure_ready()
     try:
         # API version of prediction
-        now = pd.Timestamp.now()
-        input_data = {
-            'Store': request.store,
-            'Dept': request.dept,
-            'IsHoliday': int(request.is_holiday),
-            'Temperature': request.temperature,
-            'Fuel_Price': request.fuel_price,
-            'MarkDown1': request.markdown1,
-            'MarkDown2': request.markdown2,
-            'MarkDown3': request.markdown3,
-            'MarkDown4': request.markdown4,
-            'MarkDown5': request.markdown5,
-            'CPI': request.cpi,
-            'Unemployment': request.unemployment,
-            'Size': request.size,
-            'Year': now.year,
-            'Month': now.month,
-            'Week': now.isocalendar()[1],
-            'Day': now.day,
-            'DayOfWeek': now.weekday(),
-            'Lag_1': 20000, 'Lag_2': 20000, 'Lag_3': 20000, 'Lag_4': 20000, 
-            'Lag_8': 20000, 'Lag_12': 20000, 'Lag_16': 20000, 'Lag_20': 20000, 'Lag_24': 20000,
-            'RollingMean_4': 20000, 'RollingStd_4': 1000, 
-            'RollingMean_12': 20000, 'RollingStd_12': 1500
-        }
-        
-        forecast = predictor.predict(input_data)
-        inventory = inventory_optimizer.calculate_metrics(
-            request.current_stock, 
-            forecast['next_week_sales'], 
-            historical_std=2000
-        )
-        ai_suggestion = ai_advisor.get_suggestion(forecast, inventory)
-        
+        forecast, inventory = await forecast_and_inventory(request)
+        ai_suggestion = await ai_advisor.get_suggestion_async(forecast, inventory)
+
         return {
             **forecast,
             **inventory,
@@ -233,12 +514,245 @@ async def predict_api(request: PredictionRequest):
         }
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        raise server_error("predict", e)
+
+@app.post("/predict/chart-data")
+async def predict_chart_data(request: PredictionRequest):
+    # Compact chart values, in the format results.html renders
+    await ensure_ready()
+    try:
+        forecast, inventory = await forecast_and_inventory(request)
+        with CHART_SECONDS.time(chart="chart_data"):
+            return chart_data(forecast, inventory, request.current_stock)
+    except Exception as e:
+        raise server_error("predict_chart_data", e)
+
+@app.get("/charts/spec")
+async def charts_spec(request: Request):
+    with CHART_SECONDS.time(chart="specs"):
+        body, etag = chart_specs_json()
+    headers = {"ETag": f'"{etag}"', "Cache-Control": "public, max-age=86400"}
+    if request.headers.get("if-none-match") == f'"{etag}"':
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.post("/predict/batch")
+async def predict_batch_api(request: BatchPredictionRequest):
+    await ensure_ready()
+    try:
+        # One model call per batch instead of one per (Store, Dept)
+        now = datetime.datetime.now()
+        histories = history_features_batch([(item.store, item.dept) for item in request.items])
+        input_rows = [
+            build_api_input(item, now, history)
+            for item, history in zip(request.items, histories)
+        ]
+        # Same forecast keys as /predict, whether or not suggestions are asked for
+        forecasts = await run_in_threadpool(predict_rows, input_rows)
+
+        # One vectorized inventory pass over the whole batch
+        demand_std, lead_times, z = inventory_inputs(
+            [(item.store, item.dept) for item in request.items], [item.lead_time for item in request.items]
+        )
+        metrics = inventory_optimizer.calculate_metrics_batch(
+            [item.current_stock for item in request.items],
+            [forecast['next_week_sales'] for forecast in forecasts],
+            demand_std, lead_times, z
+        )
+        columns = {name: values.tolist() for name, values in metrics.items()}
+        inventories = [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+        # Suggestions run concurrently, bounded by the advisor
+        suggestions = [None] * len(forecasts)
+        if request.include_ai_suggestion:
+            suggestions = await asyncio.gather(*[
+                ai_advisor.get_suggestion_async(forecast, inventory)
+                for forecast, inventory in zip(forecasts, inventories)
+            ])
+
+        results = [
+            {
+                **forecast,
+                **inventory,
+                "ai_suggestion": ai_suggestion
+            }
+            for forecast, inventory, ai_suggestion in zip(forecasts, inventories, suggestions)
+        ]
+
+        return {"predictions": results, "model_version": forecasts[0]['model_version'] if forecasts else model_registry.version}
+
+    except Exception as e:
+        raise server_error("predict_batch", e)
+
+def forecast_horizon(items, weeks):
+    # One predictor for the whole chain, so every week comes from the same version
+    version, predictor = model_registry.active
+    now = datetime.datetime.now()
+    keys = [(item.store, item.dept) for item in items]
+    history, _ = feature_store.get_recent_array(keys)
+    rows = [build_api_input(item, now, {}) for item in items]
+    return version, predictor.predict_horizon(rows, history, weeks=weeks, defaults=horizon_defaults())
+
+@app.post("/predict/horizon")
+async def predict_horizon_api(request: HorizonRequest):
+    # Recursive weekly forecasts: each week is a model evaluation fed by the previous ones
+    await ensure_ready()
+    from src.inference.predictor import HORIZON_WEEKS, period_forecasts
+    if not 1 <= request.weeks <= HORIZON_WEEKS:
+        raise HTTPException(status_code=400, detail=f"weeks must be between 1 and {HORIZON_WEEKS}")
+    try:
+        version, weekly = await run_in_threadpool(forecast_horizon, request.items, request.weeks)
+        results = [
+            {"weekly_sales": np.round(sales, 2).tolist(), **totals}
+            for sales, totals in zip(weekly, period_forecasts(weekly))
+        ]
+        return {"predictions": results, "model_version": version}
+    except Exception as e:
+        raise server_error("predict_horizon", e)
+
+@app.post("/actuals")
+async def post_actuals(request: ActualsRequest):
+    # New weekly actuals update the online feature store in place
+    await ensure_ready()
+    actuals = [(item.store, item.dept, item.date, item.weekly_sales) for item in request.items]
+    try:
+        # All or nothing: an invalid item leaves the store unchanged
+        await run_in_threadpool(feature_store.update_many, actuals)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        await run_in_threadpool(feature_store.save, str(FEATURE_STORE_PATH))
+    except Exception as e:
+        # The in-memory store is already updated; only persisting it failed
+        raise server_error("actuals_save", e)
+    return {"updated": len(request.items), "series": len(feature_store)}
+
+def fleet_forecast(keys):
+    """
+    Next-week forecasts (one batched model call) for many (Store, Dept)
+    keys, with the /predict defaults for everything else. Returns
+    (predicted_sales, version).
+    """
+    now = datetime.datetime.now()
+    template = build_api_input(PredictionRequest(store=0, dept=0, current_stock=0), now, {})
+    rows = [
+        {**template, 'Store': int(store), 'Dept': int(dept), **history}
+        for (store, dept), history in zip(keys, history_features_batch(keys))
+    ]
+    forecasts = predict_next_week(rows)
+    predicted_sales = np.array([forecast['next_week_sales'] for forecast in forecasts], dtype=np.float64)
+    version = forecasts[0]['model_version'] if forecasts else model_registry.version
+    return predicted_sales, version
+
+@app.post("/inventory/reorder-report")
+async def reorder_report_api(request: ReorderReportRequest):
+    # Whole-fleet report: one model call, one vectorized inventory pass
+    await ensure_ready()
+    try:
+        items = request.items
+        keys = [(item.store, item.dept) for item in items]
+        predicted_sales, version = await run_in_threadpool(fleet_forecast, keys)
+        demand_std, lead_time, z = inventory_inputs(keys, [item.lead_time for item in items])
+        report = reorder_report(
+            [item.store for item in items], [item.dept for item in items],
+            [item.current_stock for item in items],
+            predicted_sales, demand_std, lead_time, optimizer=inventory_optimizer, service_level=z
+        )
+        return {
+            "model_version": version,
+            "summary": report_summary(report),
+            "items": report_records(report)
+        }
+    except Exception as e:
+        raise server_error("reorder_report", e)
+
+@app.get("/inventory/demand-stats/{store}/{dept}")
+async def demand_stats_api(store: int, dept: int):
+    # Precomputed demand statistics and inventory parameters of one series
+    await ensure_ready()
+    return {
+        "store": store,
+        "dept": dept,
+        "indexed": bool(demand_stats.rows([store], [dept])[0] >= 0),
+        **{name: (None if np.isnan(value) else value) for name, value in demand_stats.lookup(store, dept).items()}
+    }
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text format: this process's metrics plus the last pipeline run's
+    body = REGISTRY.render()
+    if PIPELINE_METRICS_PATH.exists():
+        body += PIPELINE_METRICS_PATH.read_text()
+    return Response(content=body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {
+        "predictions": prediction_cache.stats(),
+        "ai_suggestions": ai_advisor.stats() if ai_advisor else None
+    }
+
+@app.get("/batching/stats")
+async def batching_stats():
+    return prediction_batcher.stats() if prediction_batcher else {"enabled": False}
+
+def check_admin(request):
+    # Fail closed: without a configured token nobody can swap the serving model
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not hmac.compare_digest(request.headers.get("x-admin-token", ""), ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/admin/models")
+async def model_versions(request: Request):
+    check_admin(request)
+    await ensure_ready()
+    return model_registry.status()
+
+@app.post("/admin/models/reload")
+async def reload_models(request: Request, body: ModelReloadRequest = ModelReloadRequest()):
+    # Loads and validates in a worker thread; traffic keeps using the active version
+    check_admin(request)
+    await ensure_ready()
+    try:
+        version = await run_in_threadpool(model_registry.activate, body.version)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Model version not activated: {type(e).__name__}: {e}")
+    return {"model_version": version, **model_registry.status()}
+
+@app.post("/admin/models/rollback")
+async def rollback_models(request: Request):
+    check_admin(request)
+    await ensure_ready()
+    try:
+        version = model_registry.rollback()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"model_version": version, **model_registry.status()}
 
 @app.get("/health")
 async def health():
+    # Liveness only; see /ready for the models
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def ready():
+    if startup["error"]:
+        status, code = "failed", 503
+    elif model_registry is None:
+        status, code = "loading", 503
+    else:
+        status, code = "ready", 200
+    body = {
+        "status": status,
+        "model_version": model_registry.version if model_registry else None,
+        "timings": startup["timings"]
+    }
+    if startup["error"]:
+        body["error"] = startup["error"]
+    return JSONResponse(content=body, status_code=code)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
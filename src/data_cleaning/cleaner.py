@@ -1,11 +1,46 @@
 import pandas as pd
 import numpy as np
 import os
+import shutil
+import sys
+from pathlib import Path
+
+# Allow running as `python src/data_cleaning/cleaner.py`
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from src.utils.datasets import optimize_dtypes, write_dataset
+
+MARKDOWN_COLUMNS = ['MarkDown1', 'MarkDown2', 'MarkDown3', 'MarkDown4', 'MarkDown5']
+
+# train.csv files at least this large are cleaned in chunks of
+# CLEAN_CHUNK_ROWS rows, so peak memory no longer grows with the input
+STREAMING_MIN_BYTES = int(float(os.getenv("CLEAN_STREAMING_MIN_MB", "256")) * 1024 * 1024)
+CLEAN_CHUNK_ROWS = int(os.getenv("CLEAN_CHUNK_ROWS", "1000000"))
 
-def clean_data(train_path, stores_path, features_path, output_path):
+# Compact dtypes straight from the parser (Date is parsed per chunk). Dept
+# stays int64 as it only lives until it becomes a categorical, whose
+# categories then match the in-memory path
+TRAIN_DTYPES = {'Store': 'int32', 'Dept': 'int64', 'Weekly_Sales': 'float32', 'IsHoliday': 'bool'}
+STORES_DTYPES = {'Store': 'int32', 'Type': 'category', 'Size': 'int32'}
+FEATURES_DTYPES = {'Store': 'int32', 'IsHoliday': 'bool'}
+
+def clean_data(train_path, stores_path, features_path, output_path, chunk_rows=None):
     """
     Standard data cleaning process for Walmart sales data.
+
+    chunk_rows: rows of train.csv per chunk in streaming mode; 0 loads
+    everything at once; None streams when train.csv is larger than
+    STREAMING_MIN_BYTES (CLEAN_CHUNK_ROWS rows per chunk).
+
+    Returns the cleaned DataFrame when loaded at once; in streaming mode it
+    is never in memory as a whole, so {"rows", "chunks"} is returned and the
+    cleaned data is read back from `output_path` (see clean_dataset).
     """
+    if chunk_rows is None:
+        chunk_rows = CLEAN_CHUNK_ROWS if os.path.getsize(train_path) >= STREAMING_MIN_BYTES else 0
+    if chunk_rows:
+        return clean_data_streaming(train_path, stores_path, features_path, output_path, chunk_rows)
+
     print("Loading data...")
     train = pd.read_csv(train_path)
     stores = pd.read_csv(stores_path)
@@ -18,27 +53,157 @@ def clean_data(train_path, stores_path, features_path, output_path):
 
     print("Handling missing values...")
     # Fill MarkDown missing values with 0
-    markdown_cols = ['MarkDown1', 'MarkDown2', 'MarkDown3', 'MarkDown4', 'MarkDown5']
-    for col in markdown_cols:
+    for col in MARKDOWN_COLUMNS:
         df[col] = df[col].fillna(0)
 
-    # Convert Date to datetime
+    # Convert Date to datetime, compact dtypes for everything else
     df['Date'] = pd.to_datetime(df['Date'])
+    df = optimize_dtypes(df)
 
     print(f"Saving cleaned data to {output_path}...")
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    df.to_csv(output_path, index=False)
+    write_dataset(df, output_path, partition_cols=['Store'])
     return df
 
-from pathlib import Path
+def clean_dataset(train_path, stores_path, features_path, output_path, chunk_rows=None):
+    """
+    clean_data as a pipeline stage: {"rows", "chunks"} in both modes (one
+    chunk when loaded at once) instead of the cleaned DataFrame.
+    """
+    result = clean_data(train_path, stores_path, features_path, output_path, chunk_rows=chunk_rows)
+    if isinstance(result, pd.DataFrame):
+        return {"rows": len(result), "chunks": 1}
+    return result
+
+def _feature_keys(stores, dates, holidays):
+    # (Store, Date, IsHoliday) packed into one int64: store | day | holiday bit
+    days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64) + (1 << 30)
+    return (np.asarray(stores, dtype=np.int64) << 32) | (days << 1) | np.asarray(holidays, dtype=np.int64)
+
+class JoinTables:
+    """
+    stores.csv and features.csv as in-memory tables indexed by their join
+    keys (Store; Store, Date, IsHoliday). Both are small next to train.csv:
+    one row per store and per store-week.
+    """
+
+    def __init__(self, stores_path, features_path):
+        stores = pd.read_csv(stores_path, dtype=STORES_DTYPES)
+        features = pd.read_csv(features_path, dtype=FEATURES_DTYPES)
+        features['Date'] = pd.to_datetime(features['Date'])
+        for col in features.columns:
+            if pd.api.types.is_float_dtype(features[col]):
+                features[col] = features[col].astype(np.float32)
+
+        self.store_index = pd.Index(stores['Store'].to_numpy())
+        self.feature_index = pd.Index(_feature_keys(features['Store'], features['Date'], features['IsHoliday']))
+        if not self.store_index.is_unique or not self.feature_index.is_unique:
+            raise ValueError("stores.csv / features.csv have duplicate join keys")
+
+        # A trailing all-NaN row stands in for keys with no match (left join)
+        self.stores = self._with_missing_row(stores.drop(columns=['Store']))
+        self.features = self._with_missing_row(features.drop(columns=['Store', 'Date', 'IsHoliday']))
+        self.type_categories = stores['Type'].cat.categories
+        # Weeks flagged as holidays in features.csv
+        self.holiday_dates = np.unique(features.loc[features['IsHoliday'], 'Date'].to_numpy())
+
+    @staticmethod
+    def _with_missing_row(table):
+        missing = pd.DataFrame({col: pd.Series([np.nan], dtype=table[col].dtype if col != 'Size' else 'float64')
+                                for col in table.columns})
+        return pd.concat([table, missing], ignore_index=True)
+
+    def _take(self, table, positions):
+        positions = np.where(positions < 0, len(table) - 1, positions)
+        return table.iloc[positions].reset_index(drop=True)
+
+    def join(self, chunk):
+        """
+        train rows + their store and feature columns, like the two left
+        merges of clean_data.
+        """
+        chunk = chunk.reset_index(drop=True)
+        store_rows = self.store_index.get_indexer(chunk['Store'].to_numpy())
+        feature_rows = self.feature_index.get_indexer(
+            _feature_keys(chunk['Store'], chunk['Date'], chunk['IsHoliday'])
+        )
+        return pd.concat(
+            [chunk, self._take(self.stores, store_rows), self._take(self.features, feature_rows)], axis=1
+        )
+
+def _dept_categories(train_path, chunk_rows):
+    # Every Dept in train.csv, sorted like optimize_dtypes sorts them, from a
+    # pass over that one column
+    depts = [
+        np.unique(chunk['Dept'].to_numpy())
+        for chunk in pd.read_csv(train_path, usecols=['Dept'], dtype={'Dept': 'int64'}, chunksize=chunk_rows)
+    ]
+    return pd.Index(np.unique(np.concatenate(depts)) if depts else np.empty(0, dtype=np.int64))
+
+def clean_data_streaming(train_path, stores_path, features_path, output_path, chunk_rows=CLEAN_CHUNK_ROWS):
+    """
+    clean_data for raw drops too large for memory: train.csv is read in
+    chunks of `chunk_rows` rows with compact dtypes, each chunk is joined
+    against the indexed stores/features tables and appended to the
+    Store-partitioned output (or appended to a .csv output). Peak memory
+    depends on chunk_rows, not on the size of train.csv; a first pass over
+    the Dept column gives every chunk the same Dept categories. The output is built
+    in a staging path and swapped in at the end, so a failed run leaves the
+    previous one intact.
+    """
+    print(f"Loading stores and features, streaming {train_path} in chunks of {chunk_rows:,} rows...")
+    tables = JoinTables(stores_path, features_path)
+    dept_categories = _dept_categories(train_path, chunk_rows)
+
+    # A .csv staging name keeps write_dataset writing CSV
+    base, ext = os.path.splitext(output_path)
+    staging = f"{base}.tmp{ext}" if ext == '.csv' else f"{output_path}.tmp"
+    if os.path.isdir(staging):
+        shutil.rmtree(staging)
+    elif os.path.exists(staging):
+        os.remove(staging)
+
+    total_rows = 0
+    reader = pd.read_csv(train_path, dtype=TRAIN_DTYPES, chunksize=chunk_rows)
+    for i, chunk in enumerate(reader):
+        chunk['Date'] = pd.to_datetime(chunk['Date'])
+        df = tables.join(chunk)
+        for col in MARKDOWN_COLUMNS:
+            df[col] = df[col].fillna(0)
+        df = optimize_dtypes(df)
+        # Same categories in every chunk, so the part files share one schema
+        df['Type'] = df['Type'].cat.set_categories(tables.type_categories)
+        df['Dept'] = df['Dept'].cat.set_categories(dept_categories)
+
+        write_dataset(df, staging, partition_cols=['Store'], append=i > 0)
+        total_rows += len(df)
+        print(f"  chunk {i + 1}: {total_rows:,} rows cleaned")
+
+    if total_rows == 0:
+        raise ValueError(f"No rows in {train_path}")
+
+    if os.path.isdir(output_path):
+        shutil.rmtree(output_path)
+    elif os.path.exists(output_path):
+        os.remove(output_path)
+    os.rename(staging, output_path)
+    print(f"Saved {total_rows:,} cleaned rows to {output_path}")
+    return {"rows": total_rows, "chunks": i + 1}
 
 # Detect project root
 ROOT_DIR = Path(__file__).resolve().parent.parent.parent
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk-rows", type=int, help="stream train.csv in chunks of this many rows "
+                                                       "(0: load at once; default: by file size)")
+    args = parser.parse_args()
+
     clean_data(
         str(ROOT_DIR / "data/raw/train.csv"),
         str(ROOT_DIR / "data/raw/stores.csv"),
         str(ROOT_DIR / "data/raw/features.csv"),
-        str(ROOT_DIR / "data/processed/sales_cleaned.csv")
+        str(ROOT_DIR / "data/processed/sales_cleaned.parquet"),
+        chunk_rows=args.chunk_rows
     )
@@ -1,19 +1,158 @@
 import pandas as pd
 import numpy as np
+import argparse
 import os
+import sys
+from pathlib import Path
 
-def create_features(df_path, output_path):
+# Allow running as `python src/feature_engineering/features.py`
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from src.utils.datasets import optimize_dtypes, read_dataset, write_dataset
+
+# Lags (in weeks) and rolling windows shared with the online feature store
+LAGS = [1, 2, 3, 4, 8, 12, 16, 20, 24]
+ROLLING_WINDOWS = [4, 12]
+
+def _key_codes(key):
+    if isinstance(key.dtype, pd.CategoricalDtype):
+        return key.cat.codes.to_numpy()
+    return key.to_numpy()
+
+def _group_positions(df):
     """
-    Standard feature engineering process for Walmart sales data.
+    Position of each row inside its (Store, Dept) series.
+    Expects df sorted by Store, Dept and Date.
     """
-    print("Loading cleaned data...")
-    df = pd.read_csv(df_path)
-    df['Date'] = pd.to_datetime(df['Date'])
+    store = _key_codes(df['Store'])
+    dept = _key_codes(df['Dept'])
+    new_series = np.ones(len(df), dtype=bool)
+    new_series[1:] = (store[1:] != store[:-1]) | (dept[1:] != dept[:-1])
 
-    print("Sorting data by Store, Dept, and Date...")
-    df = df.sort_values(['Store', 'Dept', 'Date'])
+    row = np.arange(len(df))
+    series_start = np.maximum.accumulate(np.where(new_series, row, 0))
+    return row - series_start
 
-    print("Adding calendar features...")
+def _shift(values, positions, lag):
+    # Same as groupby(['Store', 'Dept']).shift(lag) on series-sorted rows
+    shifted = np.full(len(values), np.nan)
+    if lag < len(values):
+        shifted[lag:] = values[:-lag]
+    shifted[positions < lag] = np.nan
+    return shifted
+
+def add_lag_rolling_features(df):
+    """
+    Lag and rolling mean/std features for every series in one sorted pass.
+
+    Replaces per-group groupby/transform lambdas with array shifts that are
+    masked at series boundaries. Output columns match the groupby version
+    (rolling stats agree to floating point rounding).
+    """
+    positions = _group_positions(df)
+    sales = df['Weekly_Sales'].to_numpy(dtype=np.float64)
+
+    shifted = {}
+    for lag in sorted(set(LAGS) | set(range(1, max(ROLLING_WINDOWS) + 1))):
+        shifted[lag] = _shift(sales, positions, lag)
+
+    columns = {}
+    for lag in LAGS:
+        columns[f'Lag_{lag}'] = shifted[lag]
+
+    # Rolling over the previous `window` weeks, i.e. shift(1).rolling(window)
+    for window in ROLLING_WINDOWS:
+        mean = sum(shifted[lag] for lag in range(1, window + 1)) / window
+        squared_dev = sum((shifted[lag] - mean) ** 2 for lag in range(1, window + 1))
+        columns[f'RollingMean_{window}'] = mean
+        columns[f'RollingStd_{window}'] = np.sqrt(squared_dev / (window - 1))
+
+    # Keep the dtype of the input measure (float32 for typed datasets)
+    dtype = df['Weekly_Sales'].dtype if pd.api.types.is_float_dtype(df['Weekly_Sales']) else np.float64
+    for name, values in columns.items():
+        df[name] = values.astype(dtype, copy=False)
+    return df
+
+# Last featurized week per series, kept next to the partitions of the
+# feature dataset (files starting with "_" are skipped when reading it)
+SERIES_STATE_FILE = "_series_state.parquet"
+
+def _save_series_state(df, output_path):
+    state = (
+        df.groupby(['Store', 'Dept'], observed=True)['Date'].max()
+        .rename('LastDate').reset_index()
+    )
+    state_path = os.path.join(output_path, SERIES_STATE_FILE)
+    if os.path.exists(state_path):
+        previous = pd.read_parquet(state_path)
+        state = pd.concat([previous, state]).groupby(['Store', 'Dept'], observed=True)['LastDate'].max().reset_index()
+    state['Store'] = state['Store'].astype(np.int64)
+    state['Dept'] = state['Dept'].astype(np.int64)
+    state.to_parquet(state_path, index=False)
+
+def _load_series_state(output_path):
+    state_path = os.path.join(output_path, SERIES_STATE_FILE)
+    if os.path.exists(state_path):
+        state = pd.read_parquet(state_path)
+    else:
+        state = (
+            read_dataset(output_path, columns=['Store', 'Dept', 'Date'])
+            .groupby(['Store', 'Dept'], observed=True)['Date'].max()
+            .rename('LastDate').reset_index()
+        )
+    state['Store'] = state['Store'].astype(np.int64)
+    state['Dept'] = state['Dept'].astype(np.int64)
+    return state.set_index(['Store', 'Dept'])['LastDate']
+
+def _newer_than(df, last_dates):
+    # Rows of series never seen before, or after the series' last featurized week
+    keys = pd.MultiIndex.from_arrays([df['Store'].astype(np.int64), df['Dept'].astype(np.int64)])
+    last = last_dates.reindex(keys).to_numpy()
+    return pd.isna(last) | (df['Date'].to_numpy() > last)
+
+# Lags and rolling windows look back by row within a series, so the rows
+# before a series' first new week that its features can reach
+HISTORY_ROWS = max(LAGS + ROLLING_WINDOWS)
+
+def _window_starts(index, new):
+    """
+    Date of the first row each series with new rows needs: HISTORY_ROWS rows
+    before its first new one (or its first row). Expects `index` sorted by
+    Store, Dept and Date; `new` marks the new rows, a suffix of each series.
+    """
+    positions = _group_positions(index)
+    first_new = new & ((positions == 0) | ~np.r_[False, new[:-1]])
+    rows = np.flatnonzero(first_new)
+    start_rows = rows - np.minimum(positions[rows], HISTORY_ROWS)
+    series = pd.MultiIndex.from_arrays(
+        [index['Store'].to_numpy()[rows].astype(np.int64), index['Dept'].to_numpy()[rows].astype(np.int64)],
+        names=['Store', 'Dept']
+    )
+    return pd.Series(index['Date'].to_numpy()[start_rows], index=series)
+
+def _already_written(df, output_path):
+    """
+    Rows of df whose (Store, Dept, Date) is already in the feature dataset:
+    appended by a run that stopped before saving the series state.
+    """
+    stores = df['Store'].astype(np.int64).unique().tolist()
+    existing = read_dataset(
+        output_path, columns=['Store', 'Dept', 'Date'],
+        filters=[('Store', 'in', stores), ('Date', '>=', df['Date'].min())]
+    )
+    written = pd.MultiIndex.from_arrays(
+        [existing['Store'].astype(np.int64), existing['Dept'].astype(np.int64), existing['Date']]
+    )
+    keys = pd.MultiIndex.from_arrays([df['Store'].astype(np.int64), df['Dept'].astype(np.int64), df['Date']])
+    return keys.isin(written)
+
+def _on_or_after(df, window_starts):
+    # Rows of the series in window_starts from their window start on
+    keys = pd.MultiIndex.from_arrays([df['Store'].astype(np.int64), df['Dept'].astype(np.int64)])
+    start = window_starts.reindex(keys).to_numpy()
+    return ~pd.isna(start) & (df['Date'].to_numpy() >= start)
+
+def add_calendar_features(df):
     df['Year'] = df['Date'].dt.year
     df['Month'] = df['Date'].dt.month
     df['Week'] = df['Date'].dt.isocalendar().week.astype(int)
@@ -22,33 +161,94 @@ def create_features(df_path, output_path):
     df['IsWeekend'] = (df['DayOfWeek'] >= 5).astype(int)
     df['IsMonthStart'] = df['Date'].dt.is_month_start.astype(int)
     df['IsMonthEnd'] = df['Date'].dt.is_month_end.astype(int)
+    return df
 
-    print("Adding lag features...")
-    lags = [1, 2, 3, 4, 8, 12, 16, 20, 24]
-    for lag in lags:
-        df[f'Lag_{lag}'] = df.groupby(['Store', 'Dept'])['Weekly_Sales'].shift(lag)
+def create_features(df_path, output_path):
+    """
+    Standard feature engineering process for Walmart sales data.
+    """
+    print("Loading cleaned data...")
+    df = read_dataset(df_path)
 
-    print("Adding rolling statistics...")
-    windows = [4, 12]
-    for window in windows:
-        df[f'RollingMean_{window}'] = df.groupby(['Store', 'Dept'])['Weekly_Sales'].transform(
-            lambda x: x.shift(1).rolling(window=window).mean()
-        )
-        df[f'RollingStd_{window}'] = df.groupby(['Store', 'Dept'])['Weekly_Sales'].transform(
-            lambda x: x.shift(1).rolling(window=window).std()
-        )
+    print("Sorting data by Store, Dept, and Date...")
+    df = df.sort_values(['Store', 'Dept', 'Date'])
+
+    print("Adding calendar features...")
+    df = add_calendar_features(df)
+
+    print("Adding lag features and rolling statistics...")
+    df = add_lag_rolling_features(df)
+
+    df = optimize_dtypes(df)
 
     print(f"Saving features to {output_path}...")
-    df.to_csv(output_path, index=False)
+    write_dataset(df, output_path, partition_cols=['Store'])
+    if not output_path.endswith('.csv'):
+        _save_series_state(df, output_path)
     return df
 
-from pathlib import Path
+def create_features_incremental(df_path, output_path):
+    """
+    Adds features only for (Store, Dept, Date) rows of the cleaned dataset
+    that are newer than the last week already in the feature dataset, reading
+    just the HISTORY_ROWS rows before them that their lags need, and appends them.
+
+    Falls back to create_features when there is no parquet feature dataset yet.
+    Revisions to weeks that were already featurized are not picked up; run a
+    full create_features for those.
+    """
+    if output_path.endswith('.csv') or not os.path.exists(output_path):
+        print("No existing feature dataset, running full feature engineering...")
+        return create_features(df_path, output_path)
+
+    print("Finding new weeks since the last run...")
+    keys = ['Store', 'Dept']
+    last_dates = _load_series_state(output_path)
+
+    # All keys, not just recent weeks: a series new in this batch can start
+    # before the last week of the others
+    index = read_dataset(df_path, columns=keys + ['Date']).sort_values(keys + ['Date'])
+    new = _newer_than(index, last_dates)
+
+    if not new.any():
+        print("Feature dataset is up to date.")
+        return index.iloc[:0]
+
+    window_starts = _window_starts(index, new)
+    stores = window_starts.index.get_level_values('Store').unique().tolist()
+
+    print(f"Loading {int(new.sum()):,} new rows with up to {HISTORY_ROWS} weeks of history per series...")
+    df = read_dataset(df_path, filters=[('Store', 'in', stores), ('Date', '>=', window_starts.min())])
+    df = df[_on_or_after(df, window_starts)].sort_values(keys + ['Date'])
+
+    df = add_calendar_features(df)
+    df = add_lag_rolling_features(df)
+
+    # Only the new rows are appended; the history rows are already featurized
+    new_rows = df[_newer_than(df, last_dates)]
+    # The parts are written before the series state, so a run that stopped in
+    # between has appended some of these rows already
+    df = optimize_dtypes(new_rows[~_already_written(new_rows, output_path)].copy())
+
+    print(f"Appending features for {len(df):,} rows to {output_path}...")
+    write_dataset(df, output_path, partition_cols=['Store'], append=True)
+    _save_series_state(new_rows, output_path)
+    return df
 
 # Detect project root
 ROOT_DIR = Path(__file__).resolve().parent.parent.parent
 
 if __name__ == "__main__":
-    create_features(
-        str(ROOT_DIR / "data/processed/sales_cleaned.csv"),
-        str(ROOT_DIR / "data/processed/sales_features.csv")
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only featurize weeks newer than the existing feature dataset"
+    )
+    args = parser.parse_args()
+
+    build = create_features_incremental if args.incremental else create_features
+    build(
+        str(ROOT_DIR / "data/processed/sales_cleaned.parquet"),
+        str(ROOT_DIR / "data/processed/sales_features.parquet")
     )
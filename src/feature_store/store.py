@@ -0,0 +1,276 @@
+import tempfile
+import threading
+import pandas as pd
+import numpy as np
+import os
+import sys
+from pathlib import Path
+
+# Allow running as `python src/feature_store/store.py`
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from src.utils.datasets import read_dataset
+from src.feature_engineering.features import LAGS, ROLLING_WINDOWS
+
+# Weeks of history kept per series: enough for the longest lag
+HISTORY_WEEKS = max(LAGS + ROLLING_WINDOWS)
+
+FEATURE_COLUMNS = [f'Lag_{lag}' for lag in LAGS]
+for window in ROLLING_WINDOWS:
+    FEATURE_COLUMNS += [f'RollingMean_{window}', f'RollingStd_{window}']
+
+# Used for series (or lags) with no recorded history, by the API and bulk
+# scoring alike
+DEFAULT_HISTORY_FEATURES = {
+    'Lag_1': 20000, 'Lag_2': 20000, 'Lag_3': 20000, 'Lag_4': 20000,
+    'Lag_8': 20000, 'Lag_12': 20000, 'Lag_16': 20000, 'Lag_20': 20000, 'Lag_24': 20000,
+    'RollingMean_4': 20000, 'RollingStd_4': 1000,
+    'RollingMean_12': 20000, 'RollingStd_12': 1500
+}
+# The same, in FEATURE_COLUMNS order (for features_from_history values)
+DEFAULT_FEATURE_VALUES = np.array([DEFAULT_HISTORY_FEATURES[c] for c in FEATURE_COLUMNS], dtype=np.float64)
+
+def features_from_history(recent):
+    """
+    FEATURE_COLUMNS values for the week after the given history: `recent`
+    holds weekly sales, newest first (column k-1 is Lag_k), NaN where unknown.
+    """
+    stats = [recent[:, [lag - 1 for lag in LAGS]]]
+    with np.errstate(invalid='ignore'):
+        for window in ROLLING_WINDOWS:
+            window_values = recent[:, :window]
+            stats.append(window_values.mean(axis=1)[:, None])
+            stats.append(window_values.std(axis=1, ddof=1)[:, None])
+    return np.hstack(stats)
+
+class FeatureStore:
+    """
+    In-memory lag/rolling feature store keyed by (Store, Dept).
+
+    Each series keeps its last HISTORY_WEEKS weekly actuals in a row of a ring
+    buffer, so reading all lags and rolling stats is O(1) per series and a new
+    weekly actual is an O(1) write.
+    """
+
+    def __init__(self, capacity=4096):
+        self.index = {}
+        self.history = np.full((capacity, HISTORY_WEEKS), np.nan, dtype=np.float64)
+        # Ring position of the most recent actual, number of actuals seen, last date
+        self.head = np.zeros(capacity, dtype=np.int64)
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.last_date = np.full(capacity, np.datetime64('NaT'), dtype='datetime64[D]')
+        self._lock = threading.Lock()
+        # One save at a time, so the file on disk is always the newest snapshot
+        self._save_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return (int(key[0]), int(key[1])) in self.index
+
+    @classmethod
+    def from_sales(cls, df):
+        """
+        Builds the store from a dataframe with Store, Dept, Date and Weekly_Sales.
+        """
+        df = df[['Store', 'Dept', 'Date', 'Weekly_Sales']].copy()
+        df['Store'] = df['Store'].astype(np.int64)
+        df['Dept'] = df['Dept'].astype(np.int64)
+        df['Date'] = pd.to_datetime(df['Date'])
+        df = df.sort_values(['Store', 'Dept', 'Date'])
+
+        grouped = df.groupby(['Store', 'Dept'], sort=False)
+        keys = grouped.size().index
+        series_ids = grouped.ngroup().to_numpy()
+        # Position counted back from the most recent week of each series
+        from_end = grouped.cumcount(ascending=False).to_numpy()
+
+        store = cls(capacity=max(len(keys), 1))
+        store.index = {(int(s), int(d)): i for i, (s, d) in enumerate(keys)}
+
+        # Keep the tail of each series, most recent actual in the last column
+        recent = from_end < HISTORY_WEEKS
+        columns = HISTORY_WEEKS - 1 - from_end[recent]
+        store.history[series_ids[recent], columns] = df['Weekly_Sales'].to_numpy()[recent]
+        store.head[:len(keys)] = HISTORY_WEEKS - 1
+        store.count[:len(keys)] = grouped.size().to_numpy()
+        store.last_date[series_ids[from_end == 0]] = df['Date'].to_numpy()[from_end == 0].astype('datetime64[D]')
+        return store
+
+    @classmethod
+    def from_file(cls, path):
+        if path.endswith('.npz'):
+            return cls.load(path)
+        return cls.from_sales(read_dataset(path, columns=['Store', 'Dept', 'Date', 'Weekly_Sales']))
+
+    def _grow(self):
+        capacity = 2 * len(self.head)
+        self.history = np.vstack([self.history, np.full_like(self.history, np.nan)])
+        self.head = np.concatenate([self.head, np.zeros_like(self.head)])
+        self.count = np.concatenate([self.count, np.zeros_like(self.count)])
+        self.last_date = np.concatenate([
+            self.last_date, np.full(capacity - len(self.last_date), np.datetime64('NaT'), dtype='datetime64[D]')
+        ])
+
+    def update(self, store, dept, date, weekly_sales):
+        """
+        Appends one weekly actual. Re-sending the latest week overwrites it;
+        weeks older than the latest one are rejected.
+        """
+        self.update_many([(store, dept, date, weekly_sales)])
+
+    def update_many(self, actuals):
+        """
+        Appends (store, dept, date, weekly_sales) actuals in date order, all
+        or nothing: every one is checked against the rule of `update` before
+        any is written.
+        """
+        parsed = [
+            ((int(store), int(dept)), np.datetime64(pd.Timestamp(date).date(), 'D'), float(weekly_sales))
+            for store, dept, date, weekly_sales in actuals
+        ]
+        # By date (not date string); same-day actuals keep their order, the last wins
+        parsed.sort(key=lambda actual: actual[1])
+
+        with self._lock:
+            for key, day, _ in parsed:
+                row = self.index.get(key)
+                last = self.last_date[row] if row is not None else np.datetime64('NaT')
+                if not np.isnat(last) and day < last:
+                    raise ValueError(f"Actual for {key} on {day} is older than latest week {last}")
+
+            for key, day, value in parsed:
+                row = self.index.get(key)
+                if row is None:
+                    row = len(self.index)
+                    if row >= len(self.head):
+                        self._grow()
+                    self.index[key] = row
+
+                last = self.last_date[row]
+                if np.isnat(last) or day > last:
+                    self.head[row] = (self.head[row] + 1) % HISTORY_WEEKS
+                    self.count[row] += 1
+                    self.last_date[row] = day
+                self.history[row, self.head[row]] = value
+
+    def _recent(self, rows):
+        # Most recent HISTORY_WEEKS actuals per row, newest first (column k-1 is Lag_k)
+        offsets = (self.head[rows][:, None] - np.arange(HISTORY_WEEKS)[None, :]) % HISTORY_WEEKS
+        recent = self.history[rows[:, None], offsets]
+        recent[np.arange(HISTORY_WEEKS)[None, :] >= self.count[rows][:, None]] = np.nan
+        return recent
+
+    def _lookup(self, keys):
+        with self._lock:
+            rows = np.array([self.index.get((int(s), int(d)), -1) for s, d in keys], dtype=np.int64)
+            known = rows >= 0
+            recent = self._recent(rows[known])
+        return recent, known
+
+    def get_recent_array(self, keys):
+        """
+        Last HISTORY_WEEKS weekly actuals per (Store, Dept) key, newest first
+        (NaN where unknown), and a mask of the keys that have any history.
+        """
+        recent, known = self._lookup(keys)
+        history = np.full((len(known), HISTORY_WEEKS), np.nan)
+        history[known] = recent
+        return history, known
+
+    def get_last_dates(self, keys):
+        """
+        Date (datetime64[D]) of the latest actual per (Store, Dept) key, NaT
+        where unknown.
+        """
+        with self._lock:
+            rows = np.array([self.index.get((int(s), int(d)), -1) for s, d in keys], dtype=np.int64)
+            dates = self.last_date[np.maximum(rows, 0)]
+        return np.where(rows >= 0, dates, np.datetime64('NaT', 'D'))
+
+    def get_features_array(self, keys):
+        """
+        Lag_* and Rolling* features for a list of (Store, Dept) keys as an
+        array (NaN where unknown), with its column names and a mask of the
+        keys that have any history. Avoids pandas for per-request lookups.
+        """
+        recent, known = self._lookup(keys)
+
+        columns = FEATURE_COLUMNS
+        values = np.full((len(known), len(columns)), np.nan)
+        if known.any():
+            values[known] = features_from_history(recent)
+        return columns, values, known
+
+    def get_features_batch(self, keys):
+        """
+        Returns a dataframe of Lag_* and Rolling* features for a list of
+        (Store, Dept) keys, plus a mask of the keys that have any history.
+        """
+        columns, values, known = self.get_features_array(keys)
+        return pd.DataFrame(values, columns=columns), known
+
+    def get_features(self, store, dept):
+        """
+        Lag/rolling features for the week after the latest actual of a series,
+        matching what create_features computes for training rows.
+        """
+        features, known = self.get_features_batch([(store, dept)])
+        if not known[0]:
+            return None
+        return features.iloc[0].to_dict()
+
+    def save(self, path):
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        with self._save_lock:
+            # Consistent snapshot under the lock; the (slow) write happens after
+            with self._lock:
+                n = len(self.index)
+                arrays = {
+                    'keys': np.array(list(self.index.keys()), dtype=np.int64).reshape(-1, 2),
+                    'rows': np.array(list(self.index.values()), dtype=np.int64),
+                    'history': self.history[:n].copy(),
+                    'head': self.head[:n].copy(),
+                    'count': self.count[:n].copy(),
+                    'last_date': self.last_date[:n].copy()
+                }
+            # Written to a temp file of its own and renamed, so a reader never
+            # loads half a file
+            f = tempfile.NamedTemporaryFile(dir=directory, suffix='.tmp', delete=False)
+            try:
+                with f:
+                    np.savez(f, **arrays)
+                os.replace(f.name, path)
+            except BaseException:
+                os.remove(f.name)
+                raise
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        n = len(data['rows'])
+        store = cls(capacity=max(n, 1))
+        store.index = {(int(s), int(d)): int(r) for (s, d), r in zip(data['keys'], data['rows'])}
+        store.history[:n] = data['history']
+        store.head[:n] = data['head']
+        store.count[:n] = data['count']
+        store.last_date[:n] = data['last_date']
+        return store
+
+def build_feature_store(sales_path, output_path):
+    print("Building online feature store...")
+    store = FeatureStore.from_file(sales_path)
+    print(f"Saving feature store ({len(store)} series) to {output_path}...")
+    store.save(output_path)
+    return store
+
+# Detect project root
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+
+if __name__ == "__main__":
+    build_feature_store(
+        str(ROOT_DIR / "data/processed/sales_cleaned.parquet"),
+        str(ROOT_DIR / "data/processed/feature_store.npz")
+    )
@@ -0,0 +1,206 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import struct
+import sys
+import zipfile
+from pathlib import Path
+import numpy as np
+
+# Allow running as `python src/inference/artifacts.py`
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from src.inference.compiled_trees import CompiledForest
+from src.inference.prophet_bundle import ALL, ProphetBundle, prophet_params
+
+# Detect project root
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+
+# Bumped whenever the layout of a model set changes
+FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+# Model files of a native set: LightGBM's text model, XGBoost's UBJSON,
+# Prophet's fitted parameters and the compiled trees (both uncompressed
+# .npz, memory-mapped on load)
+NATIVE_FILES = {
+    'lgbm': 'lgbm_model.txt',
+    'xgb': 'xgb_model.ubj',
+    'prophet': 'prophet_bundle.npz',
+    'compiled_trees': 'compiled_trees.npz'
+}
+CONFIG_FILES = ['feature_list.json', 'ensemble_config.json']
+# Pickled model set written before the native format
+LEGACY_FILES = ['lgbm_model.pkl', 'xgb_model.pkl', 'prophet_model.pkl']
+
+# No file of a model set may exceed this (GitHub's limit is 100MB)
+MAX_ARTIFACT_MB = float(os.getenv("MAX_ARTIFACT_MB", "80"))
+# Check every file against its manifest checksum when a set is loaded
+VERIFY_CHECKSUMS = os.getenv("MODEL_VERIFY_CHECKSUMS", "1") != "0"
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+def load_npz(path, mmap=True):
+    """
+    Arrays of an .npz by name. Members stored uncompressed (np.savez) are
+    memory-mapped read-only, so processes loading the same file share its
+    pages; compressed members and scalars are read into memory.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if mmap and info.compress_type == zipfile.ZIP_STORED:
+                # The member's .npy starts after its local header: 30 bytes,
+                # then the file name and extra field
+                f.seek(info.header_offset + 26)
+                name_length, extra_length = struct.unpack('<HH', f.read(4))
+                f.seek(info.header_offset + 30 + name_length + extra_length)
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+                if shape and np.prod(shape) > 0 and not dtype.hasobject:
+                    arrays[name] = np.memmap(
+                        path, dtype=dtype, mode='r', shape=shape, offset=f.tell(),
+                        order='F' if fortran_order else 'C'
+                    ).view(np.ndarray)
+                    continue
+            with archive.open(info) as member:
+                arrays[name] = np.lib.format.read_array(member)
+    return arrays
+
+def read_manifest(model_dir, verify=VERIFY_CHECKSUMS):
+    """
+    The manifest of a native model set; with `verify`, raises ValueError
+    when a listed file is missing or its checksum differs.
+    """
+    with open(os.path.join(model_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model format version {manifest.get('format_version')} in {model_dir} "
+                         f"(expected {FORMAT_VERSION})")
+    if verify:
+        for name, entry in manifest['files'].items():
+            path = os.path.join(model_dir, name)
+            if not os.path.exists(path):
+                raise ValueError(f"{name} listed in {MANIFEST_FILE} is missing from {model_dir}")
+            if file_sha256(path) != entry['sha256']:
+                raise ValueError(f"{name} in {model_dir} does not match its {MANIFEST_FILE} checksum")
+    return manifest
+
+def package_artifacts(model_dir):
+    """
+    Completes the native model set written by the trainers: compiles the
+    trees, enforces MAX_ARTIFACT_MB, removes pickles of the previous format
+    and writes manifest.json (format version, feature list, the file of
+    each model, size and sha256 per file). The manifest holds no
+    timestamp, so an unchanged set keeps its digest.
+    """
+    import lightgbm as lgb
+    import xgboost as xgb
+
+    required = [NATIVE_FILES[model] for model in ['lgbm', 'xgb', 'prophet']] + CONFIG_FILES
+    missing = [name for name in required if not os.path.exists(os.path.join(model_dir, name))]
+    if missing:
+        raise ValueError(f"Cannot package {model_dir}: missing {', '.join(missing)}")
+
+    with open(os.path.join(model_dir, 'feature_list.json')) as f:
+        features = json.load(f)
+
+    models = {model: NATIVE_FILES[model] for model in ['lgbm', 'xgb', 'prophet']}
+    compiled_path = os.path.join(model_dir, NATIVE_FILES['compiled_trees'])
+    try:
+        forest = CompiledForest.from_models(
+            features,
+            lgb.Booster(model_file=os.path.join(model_dir, NATIVE_FILES['lgbm'])),
+            xgb.Booster(model_file=os.path.join(model_dir, NATIVE_FILES['xgb']))
+        )
+        forest.save(compiled_path)
+        models['compiled_trees'] = NATIVE_FILES['compiled_trees']
+    except ValueError as e:
+        print(f"Compiled trees not packaged ({e})")
+        if os.path.exists(compiled_path):
+            os.remove(compiled_path)
+
+    files = {}
+    for name in list(models.values()) + CONFIG_FILES:
+        path = os.path.join(model_dir, name)
+        size = os.path.getsize(path)
+        if size > MAX_ARTIFACT_MB * 1024 * 1024:
+            raise ValueError(f"{name} is {size / (1024 * 1024):.1f}MB, over the {MAX_ARTIFACT_MB:g}MB limit")
+        files[name] = {'bytes': size, 'sha256': file_sha256(path)}
+
+    for name in LEGACY_FILES:
+        path = os.path.join(model_dir, name)
+        if os.path.exists(path):
+            print(f"Removing {name} (replaced by the native format)")
+            os.remove(path)
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'features': features,
+        'models': models,
+        'libraries': {'lightgbm': lgb.__version__, 'xgboost': xgb.__version__},
+        'files': files
+    }
+    with open(os.path.join(model_dir, f"{MANIFEST_FILE}.tmp"), 'w') as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(os.path.join(model_dir, f"{MANIFEST_FILE}.tmp"), os.path.join(model_dir, MANIFEST_FILE))
+    return manifest
+
+def convert_pickles(model_dir, output_dir=None):
+    """
+    Converts a pickled model set to the native format, in place or into
+    `output_dir`. A pickled chain-wide Prophet model becomes a one-series
+    bundle, which scores every series as before.
+    """
+    output_dir = output_dir or model_dir
+    os.makedirs(output_dir, exist_ok=True)
+
+    def unpickle(name):
+        with open(os.path.join(model_dir, name), 'rb') as f:
+            return pickle.load(f)
+
+    lgbm_model = unpickle('lgbm_model.pkl')
+    getattr(lgbm_model, 'booster_', lgbm_model).save_model(os.path.join(output_dir, NATIVE_FILES['lgbm']))
+    xgb_model = unpickle('xgb_model.pkl')
+    xgb_booster = xgb_model.get_booster() if hasattr(xgb_model, 'get_booster') else xgb_model
+    xgb_booster.save_model(os.path.join(output_dir, NATIVE_FILES['xgb']))
+
+    bundle_path = os.path.join(model_dir, NATIVE_FILES['prophet'])
+    if os.path.exists(bundle_path):
+        bundle = ProphetBundle(**load_npz(bundle_path, mmap=False))
+    else:
+        bundle = ProphetBundle.from_params({(ALL, ALL): prophet_params(unpickle('prophet_model.pkl'))})
+    bundle.save(os.path.join(output_dir, NATIVE_FILES['prophet']), compressed=False)
+
+    if output_dir != model_dir:
+        for name in CONFIG_FILES:
+            shutil.copy2(os.path.join(model_dir, name), os.path.join(output_dir, name))
+    return package_artifacts(output_dir)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Native model artifacts")
+    parser.add_argument("command", choices=["convert", "package", "verify"])
+    parser.add_argument("--model-dir", default=str(ROOT_DIR / "model_artifacts"))
+    parser.add_argument("--output", help="convert into this directory instead of in place")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        manifest = convert_pickles(args.model_dir, args.output)
+    elif args.command == "package":
+        manifest = package_artifacts(args.model_dir)
+    else:
+        manifest = read_manifest(args.model_dir, verify=True)
+    for name, entry in manifest['files'].items():
+        print(f"{name:<22} {entry['bytes'] / 1024:>10,.1f} KB  {entry['sha256'][:12]}")
+    print(f"Model set in {args.output or args.model_dir} OK (format {manifest['format_version']})")
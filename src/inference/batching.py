@@ -0,0 +1,99 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+class MicroBatcher:
+    """
+    Groups concurrent single-row predictions into batched model calls.
+
+    Requests queue up until `max_batch_size` rows are waiting or the oldest
+    has waited `max_wait_ms`; the batch then runs `predict_batch(rows)` in a
+    worker thread and each caller gets its own result back. While all
+    workers are busy the queue keeps filling, so batches grow with load.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=64, max_wait_ms=2.0, workers=1):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="predict-batch")
+        self._loop = None
+        self.counters = {'requests': 0, 'batches': 0, 'rows': 0, 'max_batch_rows': 0}
+
+    def _start(self, loop):
+        # Queue and collector belong to the loop that first submits
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._collector = loop.create_task(self._collect())
+
+    async def submit(self, row):
+        """
+        Predicts one input row (a dict), batched with concurrent submissions.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._start(loop)
+
+        future = loop.create_future()
+        self.counters['requests'] += 1
+        self._queue.put_nowait((row, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._slots.acquire()
+            loop.create_task(self._run(batch))
+
+    async def _run(self, batch):
+        # Callers that went away (cancelled) are dropped before the model call
+        batch = [(row, future) for row, future in batch if not future.done()]
+        try:
+            if not batch:
+                return
+            self.counters['batches'] += 1
+            self.counters['rows'] += len(batch)
+            self.counters['max_batch_rows'] = max(self.counters['max_batch_rows'], len(batch))
+
+            loop = asyncio.get_running_loop()
+            rows = [row for row, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self.predict_batch, rows)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        batches = self.counters['batches']
+        return {
+            **self.counters,
+            'mean_batch_rows': self.counters['rows'] / batches if batches else 0.0,
+            'queued': self._queue.qsize() if self._loop else 0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000
+        }
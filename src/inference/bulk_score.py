@@ -0,0 +1,321 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Allow running as `python src/inference/bulk_score.py`
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from src.data_cleaning.cleaner import MARKDOWN_COLUMNS, JoinTables
+from src.feature_store.store import (
+    DEFAULT_FEATURE_VALUES, FEATURE_COLUMNS, HISTORY_WEEKS, FeatureStore, features_from_history
+)
+from src.inference.predictor import SalesPredictor, calendar_features
+from src.inference.registry import artifacts_digest
+
+# Detect project root
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+
+# Input rows read per chunk (a chunk is extended to end on a series boundary)
+SCORE_CHUNK_ROWS = int(os.getenv("SCORE_CHUNK_ROWS", "50000"))
+# test.csv layout: Store, Dept, Date, IsHoliday (extra columns are kept out)
+INPUT_COLUMNS = ['Store', 'Dept', 'Date', 'IsHoliday']
+INPUT_DTYPES = {'Store': 'int32', 'Dept': 'int32', 'IsHoliday': 'bool'}
+# Written next to the part files: the job's identity (for resuming) and,
+# once every chunk is scored, the run summary
+JOB_FILE = "_job.json"
+SUCCESS_FILE = "_SUCCESS"
+
+class ChunkScorer:
+    """
+    Scores chunks of (Store, Dept, Date, IsHoliday) rows. Exogenous columns
+    come from stores.csv / features.csv, lag and rolling features from the
+    feature store's history. Weeks after a series' latest actual are
+    forecast recursively: each step scores every row of that step in one
+    vectorized ensemble call and feeds the predictions back as the later
+    weeks' lags. A chunk must hold whole series.
+    """
+
+    def __init__(self, model_dir, feature_store_path, stores_path, features_path, threads=None):
+        self.predictor = SalesPredictor(model_dir=model_dir, compiled_trees=True, threads=threads)
+        self.feature_store = FeatureStore.from_file(feature_store_path)
+        self.tables = JoinTables(stores_path, features_path)
+        self.version = artifacts_digest(model_dir)
+
+        features = self.predictor.features
+        self.history_columns = [(i, features.index(c)) for i, c in enumerate(FEATURE_COLUMNS) if c in features]
+        self.calendar_columns = {c: features.index(c) for c in ['Year', 'Month', 'Week', 'Day', 'DayOfWeek']
+                                 if c in features}
+        derived = set(FEATURE_COLUMNS) | set(self.calendar_columns)
+        self.input_columns = [(c, i) for i, c in enumerate(features) if c not in derived]
+
+    def _gap_weeks(self, series_keys, series_ids, steps, last_dates):
+        """
+        Rows for the weeks between each series' latest actual and its last
+        requested week that are not in the chunk: they are forecast too, as
+        later weeks' lags.
+        """
+        max_steps = np.zeros(len(series_keys), dtype=np.int64)
+        np.maximum.at(max_steps, series_ids, steps)
+        grid_series = np.repeat(np.arange(len(series_keys)), max_steps)
+        grid_steps = np.arange(len(grid_series)) - np.repeat(np.cumsum(max_steps) - max_steps, max_steps) + 1
+
+        width = int(max_steps.max(initial=0)) + 1
+        requested = series_ids[steps >= 1] * width + steps[steps >= 1]
+        gap = ~np.isin(grid_series * width + grid_steps, requested)
+        series, gap_steps = grid_series[gap], grid_steps[gap]
+        dates = last_dates[series] + gap_steps * np.timedelta64(7, 'D')
+        return pd.DataFrame({
+            'Store': series_keys[series, 0].astype(np.int32),
+            'Dept': series_keys[series, 1].astype(np.int32),
+            'Date': dates.astype('datetime64[ns]'),
+            'IsHoliday': np.isin(dates, self.tables.holiday_dates.astype('datetime64[D]'))
+        })
+
+    def score(self, chunk):
+        n = len(chunk)
+        keys = chunk[['Store', 'Dept']].to_numpy(dtype=np.int64)
+        series_keys, series_ids = np.unique(keys, axis=0, return_inverse=True)
+        series_ids = series_ids.ravel()
+        series_list = [tuple(key) for key in series_keys.tolist()]
+        dates = chunk['Date'].to_numpy().astype('datetime64[D]')
+
+        # Weeks after the latest actual; series without history start at
+        # their first row
+        first_dates = np.full(len(series_keys), np.datetime64('NaT', 'D'))
+        np.fmin.at(first_dates, series_ids, dates)
+        last_dates = self.feature_store.get_last_dates(series_list)
+        last_dates = np.where(np.isnat(last_dates), first_dates - np.timedelta64(7, 'D'), last_dates)
+        steps = (dates - last_dates[series_ids]).astype(np.int64) // 7
+
+        gaps = self._gap_weeks(series_keys, series_ids, steps, last_dates)
+        if len(gaps):
+            gap_keys = gaps[['Store', 'Dept']].to_numpy(dtype=np.int64)
+            gap_ids = np.searchsorted(series_keys[:, 0] * (1 << 32) + series_keys[:, 1],
+                                      gap_keys[:, 0] * (1 << 32) + gap_keys[:, 1])
+            gap_dates = gaps['Date'].to_numpy().astype('datetime64[D]')
+            series_ids = np.concatenate([series_ids, gap_ids])
+            steps = np.concatenate([steps, (gap_dates - last_dates[gap_ids]).astype(np.int64) // 7])
+            dates = np.concatenate([dates, gap_dates])
+
+        df = self.tables.join(pd.concat([chunk[INPUT_COLUMNS], gaps], ignore_index=True))
+        for col in MARKDOWN_COLUMNS:
+            df[col] = df[col].fillna(0)
+
+        # Per series: known history (oldest first) then one column per
+        # forecast week; column HISTORY_WEEKS - 1 + t is week t after the latest actual
+        recent, _ = self.feature_store.get_recent_array(series_list)
+        width = HISTORY_WEEKS + max(int(steps.max()), 0)
+        timeline = np.full((len(series_keys), width), np.nan)
+        timeline[:, :HISTORY_WEEKS] = recent[:, ::-1]
+
+        X = np.full((len(df), len(self.predictor.features)), np.nan)
+        for column, index in self.input_columns:
+            X[:, index] = df[column].to_numpy(dtype=np.float64)
+        for name, column in calendar_features(dates).items():
+            if name in self.calendar_columns:
+                X[:, self.calendar_columns[name]] = column
+
+        predictions = np.empty(len(df))
+        lags = np.arange(HISTORY_WEEKS)
+        for step in np.unique(steps):
+            rows = np.flatnonzero(steps == step)
+            series = series_ids[rows]
+            # Lag_k of week `step` sits k columns left of the week itself
+            columns = HISTORY_WEEKS - 2 + step - lags
+            known = columns >= 0
+            history = np.full((len(rows), HISTORY_WEEKS), np.nan)
+            history[:, known] = timeline[series[:, None], columns[known][None, :]]
+            # Missing history gets the API's defaults, so new and short
+            # series score as they do through /predict
+            values = features_from_history(history)
+            values = np.where(np.isnan(values), DEFAULT_FEATURE_VALUES, values)
+            for source, target in self.history_columns:
+                X[rows, target] = values[:, source]
+
+            predictions[rows] = self.predictor.predict_array(X[rows], dates[rows])
+            if step >= 1:
+                timeline[series, HISTORY_WEEKS - 1 + step] = predictions[rows]
+
+        return pd.DataFrame({
+            'Store': chunk['Store'].to_numpy(),
+            'Dept': chunk['Dept'].to_numpy(),
+            'Date': chunk['Date'].to_numpy(),
+            'IsHoliday': chunk['IsHoliday'].to_numpy(),
+            'Predicted_Sales': predictions[:n].astype(np.float32),
+            'model_version': self.version
+        })
+
+_scorer = None
+
+def _init_worker(scorer_args):
+    global _scorer
+    _scorer = ChunkScorer(*scorer_args)
+
+def _score_chunk(task):
+    index, chunk, part_path = task
+    start = time.perf_counter()
+    result = _scorer.score(chunk)
+    # Written aside and renamed: a part file on disk is always complete
+    result.to_parquet(f"{part_path}.tmp", engine='pyarrow', index=False)
+    os.replace(f"{part_path}.tmp", part_path)
+    return index, len(result), time.perf_counter() - start
+
+def read_chunks(input_path, chunk_rows):
+    """
+    Yields the input in chunks of about `chunk_rows` rows that end on a
+    series boundary, so each series is forecast within one chunk. The input
+    must be grouped by (Store, Dept) with dates ascending, like test.csv.
+    """
+    seen = set()
+    carry = None
+
+    def checked(chunk):
+        keys = set(zip(chunk['Store'].tolist(), chunk['Dept'].tolist()))
+        repeated = keys & seen
+        if repeated:
+            raise ValueError(f"{input_path} is not grouped by (Store, Dept): {sorted(repeated)[0]} appears "
+                             f"in separate runs; sort it by Store, Dept and Date")
+        seen.update(keys)
+        return chunk
+
+    reader = pd.read_csv(input_path, usecols=INPUT_COLUMNS, dtype=INPUT_DTYPES, chunksize=chunk_rows)
+    for chunk in reader:
+        chunk['Date'] = pd.to_datetime(chunk['Date'])
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        keys = (chunk['Store'].to_numpy(dtype=np.int64) << 32) | chunk['Dept'].to_numpy(dtype=np.int64)
+        # The last series may continue in the next chunk
+        others = np.flatnonzero(keys != keys[-1])
+        tail = others[-1] + 1 if len(others) else 0
+        carry = chunk.iloc[tail:].reset_index(drop=True)
+        if tail:
+            yield checked(chunk.iloc[:tail].reset_index(drop=True))
+    if carry is not None and len(carry):
+        yield checked(carry)
+
+def job_identity(input_path, chunk_rows, model_dir, feature_store_path):
+    stat = os.stat(input_path)
+    return {
+        'input': os.path.abspath(input_path),
+        'input_size': stat.st_size,
+        'input_mtime_ns': stat.st_mtime_ns,
+        'chunk_rows': chunk_rows,
+        'model_version': artifacts_digest(model_dir),
+        'feature_store_mtime_ns': os.stat(feature_store_path).st_mtime_ns
+    }
+
+def score_file(input_path, output_dir, model_dir, feature_store_path, stores_path, features_path,
+               chunk_rows=SCORE_CHUNK_ROWS, max_workers=None, restart=False):
+    """
+    Scores a test.csv-shaped file into `output_dir` as one parquet part file
+    per chunk (read the directory with pd.read_parquet). Chunks are scored
+    in a process pool, each worker holding its own models and feature
+    store. A rerun of an interrupted job resumes: chunks whose part file
+    exists are skipped. It must have the same input, chunk size, models and
+    feature store; `restart` discards the previous output instead.
+    """
+    identity = job_identity(input_path, chunk_rows, model_dir, feature_store_path)
+    job_path = os.path.join(output_dir, JOB_FILE)
+    if os.path.exists(job_path) and not restart:
+        with open(job_path) as f:
+            previous = json.load(f)
+        if previous != identity:
+            raise ValueError(f"{output_dir} holds a different scoring job (input, chunk size or models "
+                             f"changed); use --restart to discard it")
+        if os.path.exists(os.path.join(output_dir, SUCCESS_FILE)):
+            print(f"{output_dir} is already complete")
+            with open(os.path.join(output_dir, SUCCESS_FILE)) as f:
+                return json.load(f)
+        print(f"Resuming the scoring job in {output_dir}")
+    else:
+        if os.path.isdir(output_dir):
+            shutil.rmtree(output_dir)
+        os.makedirs(output_dir)
+        with open(job_path, "w") as f:
+            json.dump(identity, f, indent=4)
+
+    cores = os.cpu_count() or 1
+    workers = max_workers or cores
+    # The workers split the cores: each booster gets its share, not all of them
+    threads = max(1, cores // workers)
+    scorer_args = (model_dir, feature_store_path, stores_path, features_path, threads)
+    print(f"Scoring {input_path} in chunks of ~{chunk_rows:,} rows on {workers} worker(s), "
+          f"{threads} thread(s) each...")
+
+    start = time.perf_counter()
+    totals = {'rows': 0, 'chunks': 0, 'resumed_rows': 0, 'resumed_chunks': 0}
+
+    def report(index, rows, seconds):
+        totals['rows'] += rows
+        totals['chunks'] += 1
+        elapsed = time.perf_counter() - start
+        print(f"  chunk {index}: {rows:,} rows in {seconds:.2f}s | {totals['rows']:,} rows scored, "
+              f"{totals['rows'] / elapsed:,.0f} rows/s")
+
+    def tasks():
+        for index, chunk in enumerate(read_chunks(input_path, chunk_rows)):
+            part_path = os.path.join(output_dir, f"part-{index:05d}.parquet")
+            if os.path.exists(part_path):
+                totals['resumed_rows'] += len(chunk)
+                totals['resumed_chunks'] += 1
+                continue
+            yield index, chunk, part_path
+
+    if workers <= 1:
+        _init_worker(scorer_args)
+        for task in tasks():
+            report(*_score_chunk(task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(scorer_args,)) as pool:
+            # At most two chunks per worker in flight bounds the parent's memory
+            pending = set()
+            for task in tasks():
+                pending.add(pool.submit(_score_chunk, task))
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        report(*future.result())
+            for future in pending:
+                report(*future.result())
+
+    seconds = time.perf_counter() - start
+    summary = {
+        **totals,
+        'seconds': seconds,
+        'rows_per_sec': totals['rows'] / seconds if seconds else 0.0,
+        'workers': workers,
+        'threads': threads,
+        'model_version': identity['model_version']
+    }
+    with open(os.path.join(output_dir, SUCCESS_FILE), "w") as f:
+        json.dump(summary, f, indent=4)
+    resumed = f" ({totals['resumed_rows']:,} rows from a previous run)" if totals['resumed_chunks'] else ""
+    print(f"Scored {totals['rows']:,} rows in {seconds:.1f}s ({summary['rows_per_sec']:,.0f} rows/s){resumed} "
+          f"into {output_dir}")
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-score a test.csv-shaped file (Store, Dept, Date, IsHoliday)")
+    parser.add_argument("input", nargs="?", default=str(ROOT_DIR / "data/raw/test.csv"))
+    parser.add_argument("--output", default=str(ROOT_DIR / "data/predictions/test_scored"),
+                        help="output directory of parquet part files")
+    parser.add_argument("--model-dir", default=str(ROOT_DIR / "model_artifacts"))
+    parser.add_argument("--feature-store", default=str(ROOT_DIR / "data/processed/feature_store.npz"))
+    parser.add_argument("--stores", default=str(ROOT_DIR / "data/raw/stores.csv"))
+    parser.add_argument("--features", default=str(ROOT_DIR / "data/raw/features.csv"))
+    parser.add_argument("--chunk-rows", type=int, default=SCORE_CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, help="scoring processes (default: all cores)")
+    parser.add_argument("--restart", action="store_true", help="discard a previous run's output instead of resuming")
+    args = parser.parse_args()
+
+    score_file(
+        args.input, args.output, args.model_dir, args.feature_store, args.stores, args.features,
+        chunk_rows=args.chunk_rows, max_workers=args.workers, restart=args.restart
+    )
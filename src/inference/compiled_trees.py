@@ -0,0 +1,322 @@
+import json
+import numpy as np
+
+# Objectives whose prediction is the raw sum of the trees (identity link)
+LGBM_IDENTITY_OBJECTIVES = {'regression', 'regression_l1', 'huber', 'fair', 'quantile', 'mape'}
+XGB_IDENTITY_OBJECTIVES = {
+    'reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror', 'reg:quantileerror'
+}
+
+# Complete-tree layout needs 2**depth leaves per tree
+MAX_DEPTH = 12
+
+# LightGBM treats |x| <= kZeroThreshold as zero for zero-as-missing splits
+LGBM_ZERO_THRESHOLD = 1e-35
+
+def _float32_at_most(values):
+    """
+    Largest float32 <= each value, so that for float32 inputs
+    `x <= threshold` gives the same branch as the float64 comparison.
+    """
+    rounded = np.asarray(values, dtype=np.float64).astype(np.float32)
+    above = rounded.astype(np.float64) > np.asarray(values, dtype=np.float64)
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+class _TreeBuilder:
+    """
+    Collects the nodes of many trees into flat lists, in any order.
+    Leaves are nodes whose children point back to themselves.
+    """
+
+    def __init__(self):
+        self.feature = []
+        self.threshold = []
+        self.left = []
+        self.right = []
+        self.default_left = []
+        self.zero_missing = []
+        self.value = []
+        self.roots = []
+        self.groups = []
+        self.depth = 0
+
+    def add_node(self):
+        self.feature.append(0)
+        self.threshold.append(0.0)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.default_left.append(False)
+        self.zero_missing.append(False)
+        self.value.append(0.0)
+        return len(self.feature) - 1
+
+    def set_split(self, node, feature, threshold, left, right, default_left, zero_missing=False):
+        self.feature[node] = feature
+        self.threshold[node] = threshold
+        self.left[node] = left
+        self.right[node] = right
+        self.default_left[node] = default_left
+        self.zero_missing[node] = zero_missing
+
+    def set_leaf(self, node, value):
+        self.left[node] = node
+        self.right[node] = node
+        self.value[node] = value
+
+class CompiledForest:
+    """
+    Tree ensembles laid out as complete binary trees in flat float32 arrays
+    and scored directly on a NumPy feature matrix.
+
+    Node i of a tree has children 2i+1 (x <= threshold) and 2i+2, so a batch
+    is walked level by level with a few array ops and no per-row Python.
+    Leaves above the maximum depth are padded down to it. NaN (and, for
+    LightGBM zero-as-missing splits, zero) goes to the node's default side.
+    Each tree adds to one output group, one per exported model.
+
+    Thresholds are rounded so float32 inputs take exactly the original
+    branches; leaf values are float32, so predictions match the originals
+    within 1e-5 of the prediction scale (see benchmarks/bench_compiled_trees.py).
+    """
+
+    def __init__(self, features, builder, group_names, base_scores):
+        depth = builder.depth
+        if depth > MAX_DEPTH:
+            raise ValueError(f"Trees of depth {depth} are too deep to compile (max {MAX_DEPTH})")
+
+        self.features = list(features)
+        self.group_names = list(group_names)
+        self.depth = depth
+        self.base_scores = np.asarray(base_scores, dtype=np.float64)
+
+        n_trees = len(builder.roots)
+        n_internal = 2 ** depth - 1
+        feature = np.zeros((n_trees, n_internal), dtype=np.int32)
+        # Padding splits send everything left; both sides hold the same leaf
+        threshold = np.full((n_trees, n_internal), np.inf, dtype=np.float32)
+        default_left = np.ones((n_trees, n_internal), dtype=bool)
+        zero_missing = np.zeros((n_trees, n_internal), dtype=bool)
+        value = np.zeros((n_trees, 2 ** depth), dtype=np.float32)
+
+        for tree, root in enumerate(builder.roots):
+            stack = [(root, 0, 0)]
+            while stack:
+                node, position, level = stack.pop()
+                if level == depth:
+                    value[tree, position - n_internal] = builder.value[node]
+                    continue
+                left, right = builder.left[node], builder.right[node]
+                if left != node:
+                    feature[tree, position] = builder.feature[node]
+                    threshold[tree, position] = builder.threshold[node]
+                    default_left[tree, position] = builder.default_left[node]
+                    zero_missing[tree, position] = builder.zero_missing[node]
+                stack.append((left, 2 * position + 1, level + 1))
+                stack.append((right, 2 * position + 2, level + 1))
+
+        self.feature = feature.ravel()
+        self.threshold = threshold.ravel()
+        self.default_left = default_left.ravel()
+        self.zero_missing = zero_missing.ravel()
+        self.value = value.ravel()
+        self.groups = np.asarray(builder.groups, dtype=np.int32)
+        self._set_layout()
+
+    def _set_layout(self):
+        n_trees = len(self.groups)
+        n_internal = 2 ** self.depth - 1
+        self._tree_offsets = np.arange(n_trees, dtype=np.intp) * n_internal
+        self._leaf_offsets = np.arange(n_trees, dtype=np.intp) * 2 ** self.depth - n_internal
+        self._has_zero_missing = bool(self.zero_missing.any())
+
+        # Sums leaf values per output group with one matrix product
+        self.group_matrix = np.zeros((n_trees, len(self.group_names)), dtype=np.float64)
+        self.group_matrix[np.arange(n_trees), self.groups] = 1.0
+
+    @property
+    def n_trees(self):
+        return len(self._tree_offsets)
+
+    def save(self, path):
+        """
+        Writes the compiled arrays as an uncompressed .npz, so that loading
+        can memory-map them instead of compiling the models again.
+        """
+        np.savez(
+            path, features=np.array(self.features), group_names=np.array(self.group_names),
+            depth=np.int64(self.depth), base_scores=self.base_scores, groups=self.groups,
+            feature=self.feature, threshold=self.threshold, default_left=self.default_left,
+            zero_missing=self.zero_missing, value=self.value
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        A forest from the arrays written by `save` (e.g. memory-mapped).
+        """
+        forest = cls.__new__(cls)
+        forest.features = [str(name) for name in arrays['features']]
+        forest.group_names = [str(name) for name in arrays['group_names']]
+        forest.depth = int(arrays['depth'])
+        forest.base_scores = np.asarray(arrays['base_scores'], dtype=np.float64)
+        for name in ['groups', 'feature', 'threshold', 'default_left', 'zero_missing', 'value']:
+            setattr(forest, name, arrays[name])
+        forest._set_layout()
+        return forest
+
+    def predict(self, X):
+        """
+        X is an (n_rows, n_features) array in `self.features` order.
+        Returns an (n_rows, n_groups) float64 array of predictions.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != len(self.features):
+            raise ValueError(f"Expected an array of shape (n, {len(self.features)}), got {X.shape}")
+
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+        # Missing-value routing is only needed when some input can trigger it
+        missing_values = np.isnan(flat).any()
+        if self._has_zero_missing:
+            missing_values = missing_values or (np.abs(flat) <= LGBM_ZERO_THRESHOLD).any()
+
+        position = np.zeros((n_rows, self.n_trees), dtype=np.intp)
+        for _ in range(self.depth):
+            node = position + self._tree_offsets
+            x = flat[row_offsets + self.feature[node]]
+            go_right = x > self.threshold[node]
+            if missing_values:
+                missing = np.isnan(x)
+                if self._has_zero_missing:
+                    missing |= self.zero_missing[node] & (np.abs(x) <= LGBM_ZERO_THRESHOLD)
+                go_right = np.where(missing, ~self.default_left[node], go_right)
+            position = 2 * position + 1 + go_right
+
+        leaves = self.value[position + self._leaf_offsets].astype(np.float64)
+        return leaves @ self.group_matrix + self.base_scores
+
+    @classmethod
+    def from_models(cls, features, lgbm_model=None, xgb_model=None):
+        """
+        Exports fitted LGBMRegressor / XGBRegressor models (or their boosters).
+        Output groups are named 'lgbm' and 'xgb', in that order.
+        """
+        builder = _TreeBuilder()
+        group_names = []
+        base_scores = []
+        if lgbm_model is not None:
+            _add_lgbm(builder, lgbm_model, list(features), len(group_names))
+            group_names.append('lgbm')
+            base_scores.append(0.0)
+        if xgb_model is not None:
+            base_scores.append(_add_xgb(builder, xgb_model, list(features), len(group_names)))
+            group_names.append('xgb')
+        return cls(features, builder, group_names, base_scores)
+
+def _feature_index(features, name):
+    if name not in features:
+        raise ValueError(f"Model feature {name!r} is not in the serving feature list")
+    return features.index(name)
+
+def _add_lgbm(builder, model, features, group):
+    booster = getattr(model, 'booster_', model)
+    # Dumps up to the best iteration when there is one, like predict()
+    dump = booster.dump_model()
+    objective = dump['objective'].split()[0]
+    if objective not in LGBM_IDENTITY_OBJECTIVES:
+        raise ValueError(f"Unsupported LightGBM objective {objective!r}")
+    if dump['num_tree_per_iteration'] != 1 or dump.get('average_output'):
+        raise ValueError("Only single-output, non-averaged LightGBM models are supported")
+
+    columns = [_feature_index(features, name) for name in dump['feature_names']]
+    for tree in dump['tree_info']:
+        root = builder.add_node()
+        builder.roots.append(root)
+        builder.groups.append(group)
+        stack = [(tree['tree_structure'], root, 0)]
+        while stack:
+            node, index, depth = stack.pop()
+            builder.depth = max(builder.depth, depth)
+            if 'split_index' not in node:
+                builder.set_leaf(index, node['leaf_value'])
+                continue
+            if node['decision_type'] != '<=':
+                raise ValueError("Categorical LightGBM splits are not supported")
+
+            threshold = _float32_at_most(node['threshold'])
+            missing_type = node['missing_type']
+            if missing_type == 'None':
+                # NaN is scored as 0.0
+                default_left = bool(0.0 <= node['threshold'])
+            else:
+                default_left = bool(node['default_left'])
+
+            left = builder.add_node()
+            right = builder.add_node()
+            builder.set_split(
+                index, columns[node['split_feature']], threshold, left, right,
+                default_left, zero_missing=missing_type == 'Zero'
+            )
+            stack.append((node['left_child'], left, depth + 1))
+            stack.append((node['right_child'], right, depth + 1))
+
+def xgb_iteration_range(booster):
+    """
+    Boosting rounds XGBRegressor.predict uses: up to the best iteration when
+    early stopping recorded one, otherwise all of them ((0, 0)).
+    """
+    best_iteration = booster.attr('best_iteration')
+    if best_iteration is None:
+        return (0, 0)
+    return (0, int(best_iteration) + 1)
+
+def _add_xgb(builder, model, features, group):
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    learner = json.loads(booster.save_raw('json'))['learner']
+    objective = learner['objective']['name']
+    if objective not in XGB_IDENTITY_OBJECTIVES:
+        raise ValueError(f"Unsupported XGBoost objective {objective!r}")
+    if learner['gradient_booster']['name'] != 'gbtree':
+        raise ValueError("Only gbtree XGBoost models are supported")
+    if int(learner['learner_model_param'].get('num_target', 1)) != 1:
+        raise ValueError("Only single-target XGBoost models are supported")
+
+    model_json = learner['gradient_booster']['model']
+    trees = model_json['trees']
+    rounds = xgb_iteration_range(booster)[1]
+    if rounds:
+        per_round = int(model_json['gbtree_model_param'].get('num_parallel_tree', 1))
+        trees = trees[:rounds * per_round]
+
+    columns = [_feature_index(features, name) for name in learner['feature_names']]
+    for tree in trees:
+        if any(tree['split_type']):
+            raise ValueError("Categorical XGBoost splits are not supported")
+        left_children = tree['left_children']
+        offset = len(builder.feature)
+        for _ in left_children:
+            builder.add_node()
+        builder.roots.append(offset)
+        builder.groups.append(group)
+
+        # XGBoost goes left on x < condition: the largest float32 below it with <=
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        thresholds = np.nextafter(conditions, np.float32(-np.inf))
+        depth = np.zeros(len(left_children), dtype=np.int64)
+        for i, left in enumerate(left_children):
+            node = offset + i
+            if left == -1:
+                builder.set_leaf(node, float(conditions[i]))
+                continue
+            right = tree['right_children'][i]
+            depth[left] = depth[right] = depth[i] + 1
+            builder.set_split(
+                node, columns[tree['split_indices'][i]], thresholds[i],
+                offset + left, offset + right, bool(tree['default_left'][i])
+            )
+        builder.depth = max(builder.depth, int(depth.max()))
+
+    # base_score is stored as e.g. '[1.6284842E4]'
+    return float(learner['learner_model_param']['base_score'].strip('[]'))
@@ -1,62 +1,405 @@
+import datetime
 import pickle
 import pandas as pd
 import numpy as np
 import json
 import os
+import sys
+import warnings
+from pathlib import Path
+
+# Allow running as `python src/inference/predictor.py`
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from src.inference.artifacts import MANIFEST_FILE, load_npz, read_manifest
+from src.inference.compiled_trees import CompiledForest, xgb_iteration_range
+from src.inference.prophet_bundle import ProphetBundle
+from src.feature_store.store import FEATURE_COLUMNS, features_from_history
+from src.utils.metrics import INFERENCE_STAGE_SECONDS
+
+# Days of Prophet yhat precomputed beyond max(last training date, today)
+PROPHET_CACHE_HORIZON_DAYS = 2 * 366
+
+# With compiled trees, batches up to this size are scored on the float32
+# arrays; larger ones go to the native boosters, whose C++ traversal wins
+# once per-call overhead no longer dominates
+COMPILED_TREES_MAX_ROWS = 64
+
+# Longest recursive forecast (one quarter)
+HORIZON_WEEKS = 13
+# Forecast totals and the weeks they sum
+PERIOD_WEEKS = {'next_week_sales': 1, 'next_month_sales': 4, 'next_3_month_sales': HORIZON_WEEKS}
+
+# Per-stage latency (GET /metrics), bound once to keep the hot path cheap
+STAGE_TIMERS = {
+    stage: INFERENCE_STAGE_SECONDS.labels(stage=stage)
+    for stage in ['lgbm', 'xgb', 'trees', 'prophet', 'predict_batch', 'predict_horizon']
+}
+
+def calendar_features(dates):
+    """
+    Year, Month, Week (ISO), Day and DayOfWeek arrays for datetime64[D] dates,
+    as add_calendar_features computes them.
+    """
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    days = dates.astype(np.int64)
+    weekday = (days + 3) % 7  # 1970-01-01 was a Thursday
+    # ISO week: the week of the year that contains the week's Thursday
+    thursday = dates + (3 - weekday).astype('timedelta64[D]')
+    months = dates.astype('datetime64[M]')
+    return {
+        'Year': dates.astype('datetime64[Y]').astype(np.int64) + 1970,
+        'Month': months.astype(np.int64) % 12 + 1,
+        'Week': (thursday - thursday.astype('datetime64[Y]')).astype(np.int64) // 7 + 1,
+        'Day': (dates - months).astype(np.int64) + 1,
+        'DayOfWeek': weekday
+    }
+
+def period_forecasts(weekly):
+    """
+    Next week, next month (4 weeks) and next 3 months (13 weeks) sales for
+    each row of (n, weeks) weekly forecasts; totals longer than `weeks`
+    are left out.
+    """
+    weekly = np.asarray(weekly, dtype=np.float64)
+    totals = {
+        name: np.round(weekly[:, :n_weeks].sum(axis=1), 2).tolist()
+        for name, n_weeks in PERIOD_WEEKS.items() if n_weeks <= weekly.shape[1]
+    }
+    return [dict(zip(totals, values)) for values in zip(*totals.values())]
 
 class SalesPredictor:
-    def __init__(self, model_dir='model_artifacts'):
+    def __init__(self, model_dir='model_artifacts', compiled_trees=False, threads=None):
+        """
+        threads: threads of the native boosters (default: all cores), e.g.
+        1 per process when several predictors score side by side
+        """
         self.model_dir = model_dir
+        self.manifest = None
+        self.prophet_bundle = None
+        self.prophet_model = None
+        self.compiled_trees = None
+
+        # Native sets (manifest.json) load without unpickling anything;
+        # older sets are pickles
+        if os.path.exists(os.path.join(model_dir, MANIFEST_FILE)):
+            self._load_native(compiled_trees)
+        else:
+            self._load_pickles()
+            if compiled_trees:
+                self._compile_trees()
+        self.xgb_iteration_range = xgb_iteration_range(self.xgb_booster)
+        self.lgbm_predict_params = {}
+        if threads:
+            self.lgbm_predict_params['num_threads'] = threads
+            self.xgb_booster.set_param({'nthread': threads})
+
+    def _load_native(self, compiled_trees):
+        import lightgbm as lgb
+        import xgboost as xgb
+
+        self.manifest = read_manifest(self.model_dir)
+        models = self.manifest['models']
+        self.lgbm_model = self.lgbm_booster = lgb.Booster(model_file=os.path.join(self.model_dir, models['lgbm']))
+        self.xgb_model = self.xgb_booster = xgb.Booster(model_file=os.path.join(self.model_dir, models['xgb']))
+        self.prophet_bundle = ProphetBundle(**load_npz(os.path.join(self.model_dir, models['prophet'])))
+
+        with open(os.path.join(self.model_dir, 'feature_list.json'), 'r') as f:
+            self.features = json.load(f)
+        if self.features != self.manifest['features']:
+            raise ValueError(f"feature_list.json in {self.model_dir} does not match {MANIFEST_FILE}")
+        with open(os.path.join(self.model_dir, 'ensemble_config.json'), 'r') as f:
+            self.config = json.load(f)
+
+        if compiled_trees:
+            if 'compiled_trees' in models:
+                # Memory-mapped: no compile step, pages shared across processes
+                self.compiled_trees = CompiledForest.from_arrays(
+                    load_npz(os.path.join(self.model_dir, models['compiled_trees']))
+                )
+            if self.compiled_trees is None or self.compiled_trees.features != self.features:
+                self.compiled_trees = None
+                self._compile_trees()
+
+    def _load_pickles(self):
         self.lgbm_model = self._load_model('lgbm_model.pkl')
         self.xgb_model = self._load_model('xgb_model.pkl')
-        self.prophet_model = self._load_model('prophet_model.pkl')
+
+        # Per-series Prophet parameters when trained (train_prophet), else the
+        # single pickled chain-wide model
+        bundle_path = os.path.join(self.model_dir, 'prophet_bundle.npz')
+        if os.path.exists(bundle_path):
+            self.prophet_bundle = ProphetBundle.load(bundle_path)
+        else:
+            self.prophet_model = self._load_model('prophet_model.pkl')
         
-        with open(os.path.join(model_dir, 'feature_list.json'), 'r') as f:
+        # Trainers save native boosters; older artifacts are sklearn wrappers
+        self.lgbm_booster = getattr(self.lgbm_model, 'booster_', self.lgbm_model)
+        self.xgb_booster = (
+            self.xgb_model.get_booster() if hasattr(self.xgb_model, 'get_booster') else self.xgb_model
+        )
+
+        with open(os.path.join(self.model_dir, 'feature_list.json'), 'r') as f:
             self.features = json.load(f)
             
-        with open(os.path.join(model_dir, 'ensemble_config.json'), 'r') as f:
+        with open(os.path.join(self.model_dir, 'ensemble_config.json'), 'r') as f:
             self.config = json.load(f)
+
+        if self.prophet_model is not None:
+            self._build_prophet_cache()
             
     def _load_model(self, model_name):
         path = os.path.join(self.model_dir, model_name)
         with open(path, 'rb') as f:
             return pickle.load(f)
-            
-    def predict(self, input_data):
-        # input_data is a dict or dataframe with necessary features
-        if isinstance(input_data, dict):
-            df = pd.DataFrame([input_data])
+
+    def _compile_trees(self):
+        """
+        Serving mode: LGBM and XGB are scored on raw NumPy rows, skipping the
+        native boosters' per-call overhead that dominates small-batch latency.
+        """
+        try:
+            self.compiled_trees = CompiledForest.from_models(self.features, self.lgbm_model, self.xgb_model)
+        except ValueError as e:
+            print(f"Compiled trees unavailable ({e}), using the native boosters")
+
+    def _tree_predictions(self, X):
+        if self.compiled_trees is not None and len(X) <= COMPILED_TREES_MAX_ROWS:
+            # Both members in one pass over the compiled arrays
+            with STAGE_TIMERS['trees'].time():
+                predictions = self.compiled_trees.predict(X)
+            lgbm_pred, xgb_pred = predictions[:, 0], predictions[:, 1]
         else:
-            df = input_data
+            with STAGE_TIMERS['lgbm'].time():
+                lgbm_pred = self.lgbm_booster.predict(X, **self.lgbm_predict_params)
+            with STAGE_TIMERS['xgb'].time():
+                xgb_pred = self.xgb_booster.inplace_predict(X, iteration_range=self.xgb_iteration_range)
+        return np.asarray(lgbm_pred, dtype=np.float64), np.asarray(xgb_pred, dtype=np.float64)
+
+    def _build_prophet_cache(self):
+        """
+        The Prophet model is a single aggregate series that depends only on the
+        date, so yhat is computed once per day over the whole serving range and
+        stored in a day-indexed array.
+        """
+        history = self.prophet_model.history['ds']
+        start = np.datetime64(history.min().normalize(), 'D')
+        end = max(np.datetime64(history.max(), 'D'), np.datetime64('today', 'D'))
+        end = end + np.timedelta64(PROPHET_CACHE_HORIZON_DAYS, 'D')
+
+        self.prophet_cache_start = start
+        self.prophet_cache = self._compute_prophet_yhat(np.arange(start, end + 1))
+        # Dates outside the precomputed range, filled on first use
+        self.prophet_overflow = {}
+
+    def _compute_prophet_yhat(self, dates):
+        # Only yhat is used, so skip Prophet's uncertainty sampling
+        uncertainty_samples = self.prophet_model.uncertainty_samples
+        self.prophet_model.uncertainty_samples = 0
+        try:
+            # Prophet's time scaling assumes nanosecond timestamps
+            ds = pd.to_datetime(np.asarray(dates, dtype='datetime64[ns]'))
+            forecast = self.prophet_model.predict(pd.DataFrame({'ds': ds}))
+        finally:
+            self.prophet_model.uncertainty_samples = uncertainty_samples
+        return forecast['yhat'].to_numpy(dtype=np.float64)
+
+    def prophet_yhat(self, dates, stores=None, depts=None):
+        """
+        Looks up Prophet yhat for an array of dates (datetime64), per
+        (Store, Dept) series with a Prophet bundle.
+        """
+        if self.prophet_bundle is not None:
+            return self.prophet_bundle.predict(dates, stores, depts)
+
+        days = np.asarray(dates, dtype='datetime64[D]')
+        offsets = (days - self.prophet_cache_start).astype(np.int64)
+        in_range = (offsets >= 0) & (offsets < len(self.prophet_cache))
+
+        yhat = np.empty(len(days), dtype=np.float64)
+        yhat[in_range] = self.prophet_cache[offsets[in_range]]
+
+        if not in_range.all():
+            out_of_range = days[~in_range]
+            missing = np.unique([d for d in out_of_range if d not in self.prophet_overflow])
+            if len(missing):
+                self.prophet_overflow.update(zip(missing, self._compute_prophet_yhat(missing)))
+            yhat[~in_range] = [self.prophet_overflow[d] for d in out_of_range]
+
+        return yhat
             
+    def predict(self, input_data, history=None, defaults=None):
+        """
+        Forecast for one row (a dict, or the first row of a dataframe) with
+        the necessary features; history: that series' (HISTORY_WEEKS,)
+        weekly sales, newest first. Same keys as predict_batch.
+        """
+        rows = [input_data] if isinstance(input_data, dict) else input_data.iloc[:1]
+        if history is not None:
+            history = np.atleast_2d(history)
+        return self.predict_batch(rows, history, defaults)[0]
+
+    def _ensemble(self, X, dates):
         # LGBM & XGB Predictions
-        lgbm_pred = self.lgbm_model.predict(df[self.features])[0]
-        xgb_pred = self.xgb_model.predict(df[self.features])[0]
-        
-        # Prophet Prediction (Simplified - using day/month trend)
-        # Note: In a real scenario, we'd pass the date to the prophet model
-        # Here we just use the weights for the ensemble
-        # For simplicity, we'll assume the prophet model returns a baseline or we skip it for single row if not applicable
-        # But per requirements, all must be used.
-        
-        # We need a date for Prophet
-        ds = pd.to_datetime(f"{df['Year'].iloc[0]}-{df['Month'].iloc[0]}-{df['Day'].iloc[0]}")
-        prophet_df = pd.DataFrame({'ds': [ds]})
-        prophet_forecast = self.prophet_model.predict(prophet_df)
-        prophet_pred = prophet_forecast['yhat'].iloc[0]
-        
+        lgbm_pred, xgb_pred = self._tree_predictions(X)
+
+        # Prophet Prediction (per series, or precomputed per date)
+        if isinstance(X, pd.DataFrame):
+            stores, depts = X['Store'].to_numpy(), X['Dept'].to_numpy()
+        else:
+            stores, depts = X[:, self.features.index('Store')], X[:, self.features.index('Dept')]
+        with STAGE_TIMERS['prophet'].time():
+            prophet_pred = self.prophet_yhat(dates, stores, depts)
+
         # Ensemble weights
         w_lgbm = self.config['weights']['lgbm']
         w_xgb = self.config['weights']['xgb']
         w_prophet = self.config['weights']['prophet']
-        
-        final_pred = (w_lgbm * lgbm_pred) + (w_xgb * xgb_pred) + (w_prophet * prophet_pred)
-        
-        return {
-            'next_week_sales': round(final_pred, 2),
-            'next_month_sales': round(final_pred * 4, 2), # Simplified scaling
-            'next_3_month_sales': round(final_pred * 12, 2) # Simplified scaling
-        }
+
+        return (w_lgbm * lgbm_pred) + (w_xgb * xgb_pred) + (w_prophet * prophet_pred)
+
+    def predict_horizon(self, rows, history, weeks=HORIZON_WEEKS, defaults=None, on_step=None):
+        """
+        Recursive multi-week forecast for many series at once. Each step
+        predicts the next week for every row in one batched model call, then
+        feeds the prediction back into that series' history to derive the
+        next week's lag/rolling features.
+
+        rows: input dicts for the first forecast week (lag/rolling values, if
+        present, are ignored and derived from `history`); history: (n, HISTORY_WEEKS) weekly
+        sales, newest first, NaN where unknown; defaults: FEATURE_COLUMNS
+        values for features that stay NaN. on_step(week, predictions) is
+        called after each step. Returns (n, weeks) weekly predictions.
+        """
+        with STAGE_TIMERS['predict_horizon'].time():
+            return self._predict_horizon(list(rows), history, weeks, defaults, on_step)
+
+    def _predict_horizon(self, rows, history, weeks, defaults, on_step):
+        if not rows:
+            return np.empty((0, weeks))
+        # Lag/rolling features come from history, so rows need not carry them
+        X = np.array(
+            [[row.get(f, np.nan) if f in FEATURE_COLUMNS else row[f] for f in self.features] for row in rows],
+            dtype=np.float64
+        )
+        history = np.array(history, dtype=np.float64)
+        first_dates = np.array(
+            [datetime.date(row['Year'], row['Month'], row['Day']) for row in rows], dtype='datetime64[D]'
+        )
+
+        history_columns = [(i, self.features.index(c)) for i, c in enumerate(FEATURE_COLUMNS) if c in self.features]
+        calendar_columns = [c for c in ['Year', 'Month', 'Week', 'Day', 'DayOfWeek'] if c in self.features]
+        if defaults is not None:
+            defaults = np.asarray(defaults, dtype=np.float64)
+
+        predictions = np.empty((len(rows), weeks))
+        for week in range(weeks):
+            values = features_from_history(history)
+            if defaults is not None:
+                values = np.where(np.isnan(values), defaults, values)
+            for source, target in history_columns:
+                X[:, target] = values[:, source]
+
+            dates = first_dates + np.timedelta64(7 * week, 'D')
+            for name, column in calendar_features(dates).items():
+                if name in calendar_columns:
+                    X[:, self.features.index(name)] = column
+
+            X_step = X if self.compiled_trees is not None else pd.DataFrame(X, columns=self.features)
+            predictions[:, week] = self._ensemble(X_step, dates)
+
+            # The prediction becomes Lag_1 of the following week
+            history = np.hstack([predictions[:, week:week + 1], history[:, :-1]])
+            if on_step is not None:
+                on_step(week + 1, predictions[:, week])
+        return predictions
+
+    def predict_periods(self, rows, history, defaults=None):
+        """
+        Next week, month and 3-month sales per row (see period_forecasts),
+        from a HORIZON_WEEKS recursive forecast; arguments as predict_horizon.
+        """
+        rows = list(rows)
+        if not rows:
+            return []
+        return period_forecasts(self.predict_horizon(rows, history, HORIZON_WEEKS, defaults))
+
+    def predict_array(self, X, dates):
+        """
+        Ensemble predictions (float64) for a feature matrix in `self.features`
+        order and its datetime64[D] dates: the bulk scoring entry point.
+        """
+        with STAGE_TIMERS['predict_batch'].time():
+            return self._ensemble(np.asarray(X, dtype=np.float64), np.asarray(dates, dtype='datetime64[D]'))
+
+    def predict_batch(self, input_data, history=None, defaults=None):
+        """
+        Scores many rows at once: one call per model, ensemble blended with NumPy.
+        input_data is a list of dicts or a dataframe with the necessary features.
+        Returns one {'next_week_sales', 'next_month_sales', 'next_3_month_sales'}
+        dict per row, in input order.
+
+        With `history` (and `defaults`, as for predict_horizon) the month and
+        3-month totals sum the recursive forecast of predict_periods. Without
+        it they are next week x4 and x12, which is deprecated and warns;
+        predict_next_week scores next week alone.
+        """
+        if history is not None:
+            rows = input_data.to_dict('records') if isinstance(input_data, pd.DataFrame) else list(input_data)
+            return self.predict_periods(rows, history, defaults)
+
+        warnings.warn(
+            "next_month_sales and next_3_month_sales without `history` are next week x4 and x12 and will be "
+            "removed; pass the series' history (see predict_periods) or use predict_next_week",
+            DeprecationWarning, stacklevel=2
+        )
+        with STAGE_TIMERS['predict_batch'].time():
+            next_week = self._predict_batch(input_data)
+        return [
+            {'next_week_sales': week, 'next_month_sales': month, 'next_3_month_sales': quarter}
+            for week, month, quarter in zip(
+                np.round(next_week, 2).tolist(), np.round(next_week * 4, 2).tolist(),
+                np.round(next_week * 12, 2).tolist()
+            )
+        ]
+
+    def predict_next_week(self, input_data):
+        """
+        predict_batch without the period totals: one {'next_week_sales'} dict
+        per row, from a single ensemble call.
+        """
+        with STAGE_TIMERS['predict_batch'].time():
+            next_week = self._predict_batch(input_data)
+        return [{'next_week_sales': week} for week in np.round(next_week, 2).tolist()]
+
+    def _predict_batch(self, input_data):
+        # Next-week ensemble predictions (float64), one per row
+        if self.compiled_trees is not None and not isinstance(input_data, pd.DataFrame):
+            # Dict rows go straight to NumPy, no DataFrame needed
+            rows = list(input_data)
+            if not rows:
+                return np.empty(0)
+            X = np.array([[row[f] for f in self.features] for row in rows], dtype=np.float64)
+            dates = np.array(
+                [datetime.date(row['Year'], row['Month'], row['Day']) for row in rows], dtype='datetime64[D]'
+            )
+        else:
+            if isinstance(input_data, pd.DataFrame):
+                df = input_data.reset_index(drop=True)
+            else:
+                df = pd.DataFrame(list(input_data))
+
+            if df.empty:
+                return np.empty(0)
+
+            X = df[self.features]
+            if self.compiled_trees is not None:
+                X = X.to_numpy(dtype=np.float64)
+            dates = pd.to_datetime(pd.DataFrame({
+                'year': df['Year'], 'month': df['Month'], 'day': df['Day']
+            })).values
+
+        return self._ensemble(X, dates)
 
 if __name__ == "__main__":
     # Create default config if not exists
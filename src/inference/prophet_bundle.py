@@ -0,0 +1,162 @@
+import numpy as np
+
+# Key of the chain-wide series; store-level series use Dept == ALL
+ALL = -1
+NS_PER_DAY = 24 * 3600 * 10**9
+
+def prophet_params(model):
+    """
+    What ProphetBundle needs to reproduce yhat of a fitted (MAP, linear
+    growth, additive) Prophet model, as plain arrays.
+    """
+    if model.growth != 'linear' or model.mcmc_samples:
+        raise ValueError("Only MAP-fitted linear-growth Prophet models can be bundled")
+    if model.holidays is not None or model.extra_regressors or model.component_modes['multiplicative'] != [
+        'multiplicative_terms', 'extra_regressors_multiplicative'
+    ]:
+        raise ValueError("Only models with additive seasonalities (no holidays/regressors) can be bundled")
+    return {
+        'start_ns': np.int64(model.start.value),
+        't_scale_ns': np.int64(model.t_scale.value),
+        'y_scale': float(model.y_scale),
+        'floor': float(model.y_min) if model.scaling == 'minmax' else 0.0,
+        'k': float(model.params['k'][0, 0]),
+        'm': float(model.params['m'][0, 0]),
+        'changepoints_t': np.asarray(model.changepoints_t, dtype=np.float64),
+        'delta': np.asarray(model.params['delta'][0], dtype=np.float64),
+        'beta': np.asarray(model.params['beta'][0], dtype=np.float64),
+        'seasonalities': [
+            (float(props['period']), int(props['fourier_order'])) for props in model.seasonalities.values()
+        ]
+    }
+
+class ProphetBundle:
+    """
+    Many fitted Prophet models stored as stacked parameter arrays in one
+    .npz, scored with NumPy (no Prophet or Stan at inference).
+
+    Series are keyed by (Store, Dept); (Store, ALL) holds a store's mean
+    series and (ALL, ALL) the chain-wide mean. Scoring a series without its
+    own model falls back to its store's, then to the chain-wide one.
+    """
+
+    def __init__(self, keys, start_ns, t_scale_ns, y_scale, floor, k, m, changepoints_t, delta, beta,
+                 periods, orders, level='global'):
+        self.keys = np.asarray(keys, dtype=np.int64).reshape(-1, 2)
+        self.start_ns = np.asarray(start_ns, dtype=np.int64)
+        self.t_scale_ns = np.asarray(t_scale_ns, dtype=np.int64)
+        self.y_scale = np.asarray(y_scale, dtype=np.float64)
+        self.floor = np.asarray(floor, dtype=np.float64)
+        self.k = np.asarray(k, dtype=np.float64)
+        self.m = np.asarray(m, dtype=np.float64)
+        # Padded to the longest changepoint list with inf / 0 (never active)
+        self.changepoints_t = np.asarray(changepoints_t, dtype=np.float64)
+        self.delta = np.asarray(delta, dtype=np.float64)
+        self.beta = np.asarray(beta, dtype=np.float64)
+        self.periods = np.asarray(periods, dtype=np.float64)
+        self.orders = np.asarray(orders, dtype=np.int64)
+        self.level = str(level)
+        self.index = {(int(s), int(d)): i for i, (s, d) in enumerate(self.keys)}
+        if (ALL, ALL) not in self.index:
+            raise ValueError("Prophet bundle has no chain-wide (ALL, ALL) series")
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def from_params(cls, params_by_key, level='global'):
+        """
+        Builds a bundle from {(store, dept): prophet_params(model)}.
+        """
+        keys = list(params_by_key)
+        params = [params_by_key[key] for key in keys]
+        layout = params[0]['seasonalities']
+        if any(p['seasonalities'] != layout for p in params):
+            raise ValueError("All bundled models need the same seasonalities")
+
+        width = max(len(p['changepoints_t']) for p in params)
+        changepoints_t = np.full((len(params), width), np.inf)
+        delta = np.zeros((len(params), width))
+        for i, p in enumerate(params):
+            changepoints_t[i, :len(p['changepoints_t'])] = p['changepoints_t']
+            delta[i, :len(p['delta'])] = p['delta']
+
+        return cls(
+            keys=keys,
+            start_ns=[p['start_ns'] for p in params],
+            t_scale_ns=[p['t_scale_ns'] for p in params],
+            y_scale=[p['y_scale'] for p in params],
+            floor=[p['floor'] for p in params],
+            k=[p['k'] for p in params],
+            m=[p['m'] for p in params],
+            changepoints_t=changepoints_t,
+            delta=delta,
+            beta=np.array([p['beta'] for p in params]),
+            periods=[period for period, _ in layout],
+            orders=[order for _, order in layout],
+            level=level
+        )
+
+    def save(self, path, compressed=True):
+        # Uncompressed members can be memory-mapped when loaded
+        save = np.savez_compressed if compressed else np.savez
+        save(
+            path, keys=self.keys, start_ns=self.start_ns, t_scale_ns=self.t_scale_ns,
+            y_scale=self.y_scale, floor=self.floor, k=self.k, m=self.m,
+            changepoints_t=self.changepoints_t, delta=self.delta, beta=self.beta,
+            periods=self.periods, orders=self.orders, level=np.array(self.level)
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(**{name: data[name] for name in data.files})
+
+    def series_index(self, stores, depts=None):
+        """
+        Bundle row used for each (store, dept), with the fallbacks above.
+        """
+        stores = np.asarray(stores, dtype=np.int64)
+        depts = np.full(len(stores), ALL) if depts is None else np.asarray(depts, dtype=np.int64)
+        chain = self.index[(ALL, ALL)]
+        lookup = {}
+        rows = np.empty(len(stores), dtype=np.int64)
+        for i, key in enumerate(zip(stores.tolist(), depts.tolist())):
+            row = lookup.get(key)
+            if row is None:
+                row = self.index.get(key, self.index.get((key[0], ALL), chain))
+                lookup[key] = row
+            rows[i] = row
+        return rows
+
+    def _seasonal_features(self, dates_ns):
+        # Same Fourier terms (days since epoch) as Prophet.fourier_series
+        t = (dates_ns // 10**9) / (3600 * 24.)
+        columns = []
+        for period, order in zip(self.periods, self.orders):
+            for i in range(order):
+                c = t * np.pi * 2 * (i + 1) / period
+                columns += [np.sin(c), np.cos(c)]
+        return np.column_stack(columns)
+
+    def predict(self, dates, stores=None, depts=None):
+        """
+        yhat per row for datetime64 dates; without stores, the chain-wide series.
+        """
+        dates_ns = np.asarray(dates, dtype='datetime64[ns]').astype(np.int64)
+        if stores is None:
+            rows = np.full(len(dates_ns), self.index[(ALL, ALL)])
+        else:
+            rows = self.series_index(stores, depts)
+
+        t = (dates_ns - self.start_ns[rows]) / self.t_scale_ns[rows]
+        # Piecewise-linear trend (Prophet.piecewise_linear)
+        changepoints = self.changepoints_t[rows]
+        active = changepoints <= t[:, None]
+        deltas = np.where(active, self.delta[rows], 0.0)
+        k_t = deltas.sum(axis=1) + self.k[rows]
+        m_t = np.where(active, -changepoints * deltas, 0.0).sum(axis=1) + self.m[rows]
+        trend = (k_t * t + m_t) * self.y_scale[rows] + self.floor[rows]
+
+        seasonal = np.einsum('ij,ij->i', self._seasonal_features(dates_ns), self.beta[rows]) * self.y_scale[rows]
+        return trend + seasonal
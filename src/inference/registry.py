@@ -0,0 +1,225 @@
+import argparse
+import datetime
+import hashlib
+import math
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+# Files that make up one model set, native (manifest.json) or pickled;
+# missing files are skipped
+ARTIFACT_FILES = [
+    'manifest.json', 'lgbm_model.txt', 'xgb_model.ubj', 'compiled_trees.npz',
+    'lgbm_model.pkl', 'xgb_model.pkl', 'prophet_bundle.npz', 'prophet_model.pkl',
+    'feature_list.json', 'ensemble_config.json'
+]
+VERSIONS_DIRNAME = 'versions'
+# Published versions kept on disk (older ones are pruned on publish)
+KEEP_VERSIONS = 5
+
+def artifact_files(directory):
+    return [name for name in ARTIFACT_FILES if os.path.exists(os.path.join(directory, name))]
+
+def artifacts_digest(directory):
+    """
+    Short content hash of the model set in a directory.
+    """
+    digest = hashlib.sha256()
+    for name in artifact_files(directory):
+        digest.update(name.encode())
+        with open(os.path.join(directory, name), 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+def list_versions(artifacts_dir):
+    """
+    Published version ids, oldest first (ids start with a UTC timestamp).
+    """
+    versions_dir = os.path.join(artifacts_dir, VERSIONS_DIRNAME)
+    if not os.path.isdir(versions_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(versions_dir)
+        if not name.startswith('.') and os.path.isdir(os.path.join(versions_dir, name))
+    )
+
+def publish_version(artifacts_dir, keep=KEEP_VERSIONS):
+    """
+    Copies the model set written by the trainers (the flat files in
+    `artifacts_dir`) to versions/<timestamp>-<hash>. The copy is staged in
+    a hidden directory and renamed into place, so a watching server never
+    sees a half-written version. Returns the version id; an unchanged model
+    set returns the latest version instead of publishing a duplicate.
+    """
+    versions_dir = os.path.join(artifacts_dir, VERSIONS_DIRNAME)
+    os.makedirs(versions_dir, exist_ok=True)
+
+    digest = artifacts_digest(artifacts_dir)
+    existing = list_versions(artifacts_dir)
+    if existing and existing[-1].endswith(digest):
+        return existing[-1]
+
+    # Microseconds, so publishes within one second still sort by time
+    timestamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+    version = f"{timestamp}-{digest}"
+    staging = os.path.join(versions_dir, f".{version}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for name in artifact_files(artifacts_dir):
+        shutil.copy2(os.path.join(artifacts_dir, name), os.path.join(staging, name))
+    os.rename(staging, os.path.join(versions_dir, version))
+
+    for old in list_versions(artifacts_dir)[:-keep]:
+        shutil.rmtree(os.path.join(versions_dir, old), ignore_errors=True)
+    return version
+
+class ModelRegistry:
+    """
+    Holds the active predictor and swaps it for new model versions.
+
+    Versions are the directories under <artifacts_dir>/versions/; without
+    any, the flat artifact directory is the only version ("flat-<hash>").
+    A new version is loaded and checked on `smoke_rows` in the calling
+    thread while the old one keeps serving, then becomes active with a
+    single reference swap: requests already holding the old predictor
+    finish on it. The previously active predictor stays loaded so
+    `rollback()` is instant.
+    """
+
+    def __init__(self, artifacts_dir, load_predictor, smoke_rows):
+        self.artifacts_dir = str(artifacts_dir)
+        self.load_predictor = load_predictor
+        self.smoke_rows = smoke_rows
+        # (version, predictor) pairs, replaced as a whole
+        self.active = None
+        self.previous = None
+        self.latest_seen = None
+        self.history = []
+        self._lock = threading.Lock()
+        self._watcher = None
+
+    @property
+    def version(self):
+        active = self.active
+        return active[0] if active else None
+
+    @property
+    def predictor(self):
+        active = self.active
+        return active[1] if active else None
+
+    def version_dir(self, version):
+        if version in list_versions(self.artifacts_dir):
+            return os.path.join(self.artifacts_dir, VERSIONS_DIRNAME, version)
+        if version == f"flat-{artifacts_digest(self.artifacts_dir)}":
+            return self.artifacts_dir
+        raise ValueError(f"Unknown model version: {version}")
+
+    def latest_version(self):
+        versions = list_versions(self.artifacts_dir)
+        if versions:
+            return versions[-1]
+        return f"flat-{artifacts_digest(self.artifacts_dir)}"
+
+    def validate(self, predictor):
+        forecasts = predictor.predict_next_week(self.smoke_rows)
+        if len(forecasts) != len(self.smoke_rows):
+            raise ValueError(f"smoke batch returned {len(forecasts)} rows for {len(self.smoke_rows)}")
+        for forecast in forecasts:
+            if not all(math.isfinite(value) for value in forecast.values()):
+                raise ValueError(f"non-finite forecast on smoke batch: {forecast}")
+
+    def activate(self, version=None):
+        """
+        Loads, validates and switches to `version` (default: the latest).
+        Raises (and keeps the active version) when loading or the smoke
+        batch fails.
+        """
+        with self._lock:
+            version = version or self.latest_version()
+            if version == self.version:
+                return version
+            directory = self.version_dir(version)
+            predictor = self.load_predictor(directory)
+            self.validate(predictor)
+
+            self.previous = self.active
+            self.active = (version, predictor)
+            self.history.append({
+                'version': version,
+                'activated_at': datetime.datetime.now(datetime.timezone.utc).isoformat()
+            })
+            print(f"Model version {version} active")
+            return version
+
+    def rollback(self):
+        """
+        Switches back to the previously active version.
+        """
+        with self._lock:
+            if self.previous is None:
+                raise ValueError("No previous model version to roll back to")
+            self.active, self.previous = self.previous, self.active
+            self.history.append({
+                'version': self.active[0],
+                'activated_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                'rollback': True
+            })
+            print(f"Rolled back to model version {self.active[0]}")
+            return self.active[0]
+
+    def check_for_update(self):
+        """
+        Activates a newly published version. Only a change of the latest
+        version counts, so a rollback is not undone by the next check.
+        """
+        latest = self.latest_version()
+        if latest == self.latest_seen:
+            return None
+        self.latest_seen = latest
+        return self.activate(latest)
+
+    def watch(self, interval_seconds):
+        """
+        Polls for new versions in a daemon thread.
+        """
+        if self._watcher is not None:
+            return
+        self.latest_seen = self.latest_seen or self.version
+
+        def loop():
+            while True:
+                time.sleep(interval_seconds)
+                try:
+                    self.check_for_update()
+                except Exception as e:
+                    print(f"Model reload failed: {type(e).__name__}: {e}")
+
+        self._watcher = threading.Thread(target=loop, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def status(self):
+        return {
+            'active': self.version,
+            'previous': self.previous[0] if self.previous else None,
+            'available': list_versions(self.artifacts_dir),
+            'history': self.history[-20:]
+        }
+
+if __name__ == "__main__":
+    # Detect project root
+    ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+
+    parser = argparse.ArgumentParser(description="Model artifact versions")
+    parser.add_argument("command", choices=["publish", "list"])
+    parser.add_argument("--artifacts-dir", default=str(ROOT_DIR / "model_artifacts"))
+    args = parser.parse_args()
+
+    if args.command == "publish":
+        print(f"Published model version {publish_version(args.artifacts_dir)}")
+    else:
+        for version in list_versions(args.artifacts_dir):
+            print(version)
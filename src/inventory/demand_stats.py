@@ -0,0 +1,232 @@
+import os
+import shutil
+import sys
+from pathlib import Path
+from statistics import NormalDist
+
+import numpy as np
+
+# Allow running as `python src/inventory/demand_stats.py`
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+# Weeks of recent history the demand statistics are computed over, and the
+# (shorter) window compared against it for the trend
+STATS_WEEKS = 52
+TREND_WEEKS = 4
+
+# Used for series missing from the index (or with too little history),
+# the same values InventoryOptimizer and the API used before the index
+# (DEFAULT_DEMAND_STD is a daily std, like daily_std)
+DEFAULT_DEMAND_STD = 2000
+DEFAULT_LEAD_TIME = 7
+DEFAULT_SERVICE_LEVEL = 0.95
+DEFAULT_Z = 1.65
+
+# One .npy file per column, float64, one row per (Store, Dept) series
+STATS_COLUMNS = ['mean', 'std', 'daily_std', 'cv', 'trend', 'weeks', 'lead_time', 'service_level', 'z']
+# Days per sales week: InventoryOptimizer works in days (predicted_sales / 7
+# per day, Z * std * sqrt(lead time in days)), so the weekly std is scaled
+# to a daily one by 1 / sqrt(DAYS_PER_WEEK)
+DAYS_PER_WEEK = 7
+
+class DemandStats:
+    """
+    Per-(Store, Dept) demand statistics and inventory parameters, precomputed
+    by the pipeline: demand mean, std and CV over the last STATS_WEEKS weeks,
+    recent trend (last TREND_WEEKS weeks vs. that mean, as a ratio - 1),
+    lead time in days and service level (with its Z-score).
+
+    Saved as a directory of .npy columns plus a dense [store, dept] -> row
+    table, and loaded memory-mapped, so a lookup is two array reads with no
+    pandas and no recomputation from the sales history.
+
+    `mean` and `std` are of weekly sales; `daily_std` (std / sqrt(7)) is the
+    per-day demand std that inventory_inputs hands to InventoryOptimizer.
+    """
+
+    def __init__(self, keys, columns, table=None):
+        self.keys = np.asarray(keys, dtype=np.int64).reshape(-1, 2)
+        self.columns = columns
+        if table is None:
+            table = np.full(
+                (int(self.keys[:, 0].max(initial=-1)) + 1, int(self.keys[:, 1].max(initial=-1)) + 1),
+                -1, dtype=np.int32
+            )
+            table[self.keys[:, 0], self.keys[:, 1]] = np.arange(len(self.keys), dtype=np.int32)
+        self.table = table
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty((0, 2)), {name: np.empty(0) for name in STATS_COLUMNS})
+
+    def save(self, directory):
+        """
+        Writes the index to a staging directory and swaps it in, so a server
+        never maps a half-written index.
+        """
+        directory = str(directory)
+        staging, old = f"{directory}.tmp", f"{directory}.old"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        np.save(os.path.join(staging, 'keys.npy'), self.keys)
+        np.save(os.path.join(staging, 'table.npy'), self.table)
+        for name in STATS_COLUMNS:
+            np.save(os.path.join(staging, f'{name}.npy'), np.asarray(self.columns[name], dtype=np.float64))
+
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.exists(directory):
+            os.rename(directory, old)
+        os.rename(staging, directory)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        def column(name):
+            return np.load(os.path.join(str(directory), f'{name}.npy'), mmap_mode=mmap_mode)
+        # Indexes built before daily_std derive it from the weekly std
+        columns = {
+            name: column(name) for name in STATS_COLUMNS
+            if os.path.exists(os.path.join(str(directory), f'{name}.npy'))
+        }
+        columns.setdefault('daily_std', columns['std'] / np.sqrt(DAYS_PER_WEEK))
+        return cls(column('keys'), columns, table=column('table'))
+
+    def rows(self, stores, depts):
+        """
+        Index row per (store, dept), -1 for series not in the index.
+        """
+        stores = np.asarray(stores, dtype=np.int64)
+        depts = np.asarray(depts, dtype=np.int64)
+        known = (stores >= 0) & (stores < self.table.shape[0]) & (depts >= 0) & (depts < self.table.shape[1])
+        rows = np.full(stores.shape, -1, dtype=np.int64)
+        rows[known] = self.table[stores[known], depts[known]]
+        return rows
+
+    def lookup_batch(self, stores, depts):
+        """
+        Dict of STATS_COLUMNS arrays for many series; daily demand std, lead
+        time, service level and Z fall back to the defaults where unknown (NaN
+        for the purely descriptive columns, weekly std included).
+        """
+        rows = self.rows(stores, depts)
+        known = rows >= 0
+        defaults = {
+            'daily_std': DEFAULT_DEMAND_STD, 'weeks': 0, 'lead_time': DEFAULT_LEAD_TIME,
+            'service_level': DEFAULT_SERVICE_LEVEL, 'z': DEFAULT_Z
+        }
+        result = {}
+        for name in STATS_COLUMNS:
+            values = np.full(rows.shape, np.nan)
+            values[known] = self.columns[name][rows[known]]
+            if name in defaults:
+                values = np.where(np.isnan(values), defaults[name], values)
+            result[name] = values
+        return result
+
+    def inventory_inputs(self, stores, depts, lead_time=None):
+        """
+        (demand_std, lead_time, z) arrays for InventoryOptimizer: the daily
+        demand std and lead times in days; given lead times (per item or one
+        value, NaN = use the index) take precedence.
+        """
+        stats = self.lookup_batch(stores, depts)
+        lead_times = stats['lead_time']
+        if lead_time is not None:
+            given = np.broadcast_to(np.asarray(lead_time, dtype=np.float64), lead_times.shape)
+            lead_times = np.where(np.isnan(given), lead_times, given)
+        return stats['daily_std'], lead_times, stats['z']
+
+    def lookup(self, store, dept):
+        """
+        lookup_batch for one series, as plain floats.
+        """
+        return {name: float(values[0]) for name, values in self.lookup_batch([store], [dept]).items()}
+
+def compute_demand_stats(sales, params=None):
+    """
+    DemandStats from a sales history frame (Store, Dept, Date, Weekly_Sales)
+    and optional inventory parameters (Store, Dept, Lead_Time in days,
+    Service_Level between 0 and 1). Series with parameters but no sales get
+    the default demand statistics.
+    """
+    import pandas as pd
+
+    sales = pd.DataFrame({
+        'Store': sales['Store'].astype(np.int64),
+        'Dept': sales['Dept'].astype(np.int64),
+        'Date': pd.to_datetime(sales['Date']),
+        'Weekly_Sales': sales['Weekly_Sales'].astype(np.float64)
+    }).sort_values(['Store', 'Dept', 'Date'])
+
+    # Weeks back from each series' latest week (0 = latest)
+    age = sales.groupby(['Store', 'Dept'], sort=False).cumcount(ascending=False)
+    window = sales[age < STATS_WEEKS].groupby(['Store', 'Dept'])['Weekly_Sales']
+    stats = window.agg(['mean', 'std', 'count'])
+    recent = sales[age < TREND_WEEKS].groupby(['Store', 'Dept'])['Weekly_Sales'].mean()
+
+    if params is not None:
+        params = pd.DataFrame({
+            'Store': params['Store'].astype(np.int64),
+            'Dept': params['Dept'].astype(np.int64),
+            'lead_time': params['Lead_Time'].astype(np.float64),
+            'service_level': params['Service_Level'].astype(np.float64)
+        }).set_index(['Store', 'Dept'])
+        if not params['service_level'].between(0, 1, inclusive='neither').all():
+            raise ValueError("Service_Level must be between 0 and 1 (exclusive)")
+        if (params['lead_time'] < 0).any():
+            raise ValueError("Lead_Time must not be negative")
+        stats = stats.join(params, how='outer')
+
+    keys = np.array(stats.index.tolist(), dtype=np.int64).reshape(-1, 2)
+    if (keys < 0).any():
+        raise ValueError("Store and Dept must be non-negative")
+
+    def column(name, default=np.nan):
+        return stats[name].to_numpy(dtype=np.float64) if name in stats else np.full(len(stats), default)
+
+    mean = column('mean')
+    positive = mean > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cv = np.where(positive, column('std') / mean, np.nan)
+        trend = np.where(positive, recent.reindex(stats.index).to_numpy(dtype=np.float64) / mean - 1, np.nan)
+
+    lead_time = column('lead_time')
+    service_level = column('service_level')
+    # Explicit service levels get their own Z; the rest keep the default
+    z = np.full(len(stats), np.nan)
+    given = ~np.isnan(service_level)
+    z[given] = [NormalDist().inv_cdf(level) for level in service_level[given]]
+
+    return DemandStats(keys, {
+        'mean': mean, 'std': column('std'), 'daily_std': column('std') / np.sqrt(DAYS_PER_WEEK), 'cv': cv, 'trend': trend,
+        'weeks': np.nan_to_num(column('count'), nan=0.0),
+        'lead_time': lead_time, 'service_level': service_level, 'z': z
+    })
+
+def build_demand_stats(sales_path, output_dir, params_path=None):
+    from src.utils.datasets import read_dataset
+    import pandas as pd
+
+    print("Building demand statistics index...")
+    sales = read_dataset(sales_path, columns=["Store", "Dept", "Date", "Weekly_Sales"])
+    params = None
+    if params_path and os.path.exists(params_path):
+        params = pd.read_csv(params_path)
+        print(f"Using inventory parameters for {len(params)} series from {params_path}")
+    stats = compute_demand_stats(sales, params)
+    print(f"Saving demand statistics ({len(stats)} series) to {output_dir}...")
+    stats.save(output_dir)
+    return {"series": len(stats)}
+
+# Detect project root
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+
+if __name__ == "__main__":
+    build_demand_stats(
+        str(ROOT_DIR / "data/processed/sales_cleaned.parquet"),
+        str(ROOT_DIR / "data/processed/demand_stats"),
+        str(ROOT_DIR / "data/raw/inventory_params.csv")
+    )
@@ -1,5 +1,24 @@
 import math
 
+import numpy as np
+
+STOCK_STATUSES = ["OUT OF STOCK", "UNDERSTOCK", "HEALTHY", "REORDER RECOMMENDED"]
+
+def round_like_python(values, ndigits=2):
+    """
+    round(x, ndigits) over an array. np.round scales by 10**ndigits before
+    rounding, which can tip values within an ulp of a .5 tie (and very large
+    values) the other way; those few are rounded by Python itself.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, ndigits)
+    scaled = np.abs(values * 10.0 ** ndigits)
+    with np.errstate(invalid='ignore'):
+        near_tie = np.abs(scaled - np.floor(scaled) - 0.5) <= 2 * np.spacing(scaled)
+    for i in np.flatnonzero(near_tie | (scaled >= 2.0 ** 52)):
+        rounded[i] = round(float(values[i]), ndigits)
+    return rounded
+
 class InventoryOptimizer:
     def __init__(self, service_level=1.65, lead_time=7):
         """
@@ -9,20 +28,25 @@ class InventoryOptimizer:
         self.Z = service_level
         self.lead_time = lead_time
 
-    def calculate_metrics(self, current_stock, predicted_sales, historical_std):
+    def calculate_metrics(self, current_stock, predicted_sales, historical_std, lead_time=None, service_level=None):
         """
         predicted_sales: Forecasted sales for the next week
         historical_std: Standard deviation of demand
+        lead_time, service_level: per-item overrides (days, Z-score) of the
+        optimizer's own
         """
+        Z = self.Z if service_level is None else service_level
+        lead_time = self.lead_time if lead_time is None else lead_time
+
         # Average Daily Demand
         avg_daily_demand = predicted_sales / 7
         
         # Safety Stock = Z * Demand_Std * sqrt(Lead_Time)
         # Assuming lead time is in days
-        safety_stock = self.Z * historical_std * math.sqrt(self.lead_time)
+        safety_stock = Z * historical_std * math.sqrt(lead_time)
         
         # Reorder Point = (Average Daily Demand * Lead Time) + Safety Stock
-        reorder_point = (avg_daily_demand * self.lead_time) + safety_stock
+        reorder_point = (avg_daily_demand * lead_time) + safety_stock
         
         # Stock Status
         if current_stock <= 0:
@@ -43,3 +67,40 @@ class InventoryOptimizer:
             "stock_status": status,
             "recommended_order_qty": round(recommended_order_qty, 2)
         }
+
+    def calculate_metrics_batch(self, current_stock, predicted_sales, historical_std, lead_time=None,
+                                service_level=None):
+        """
+        calculate_metrics over whole columns at once (arrays, or scalars
+        broadcast against them); lead_time and service_level default to the
+        optimizer's.
+        Returns the same keys, as NumPy arrays, with identical values.
+        """
+        current_stock = np.asarray(current_stock, dtype=np.float64)
+        predicted_sales = np.asarray(predicted_sales, dtype=np.float64)
+        historical_std = np.asarray(historical_std, dtype=np.float64)
+        lead_time = np.asarray(self.lead_time if lead_time is None else lead_time, dtype=np.float64)
+        Z = np.asarray(self.Z if service_level is None else service_level, dtype=np.float64)
+
+        # Same operations, in the same order, as the scalar version
+        avg_daily_demand = predicted_sales / 7
+        safety_stock = Z * historical_std * np.sqrt(lead_time)
+        reorder_point = (avg_daily_demand * lead_time) + safety_stock
+
+        current_stock, safety_stock, reorder_point = np.broadcast_arrays(current_stock, safety_stock, reorder_point)
+        status = np.select(
+            [current_stock <= 0, current_stock < safety_stock, current_stock >= reorder_point],
+            STOCK_STATUSES[:3],
+            default=STOCK_STATUSES[3]
+        )
+
+        # max(0, x) is 0 for NaN as well, hence not np.maximum
+        shortfall = reorder_point - current_stock
+        recommended_order_qty = np.where((status != "HEALTHY") & (shortfall > 0), shortfall, 0.0)
+
+        return {
+            "reorder_point": round_like_python(reorder_point),
+            "safety_stock": round_like_python(safety_stock),
+            "stock_status": status,
+            "recommended_order_qty": round_like_python(recommended_order_qty)
+        }
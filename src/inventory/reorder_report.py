@@ -0,0 +1,111 @@
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Allow running as `python src/inventory/reorder_report.py`
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from src.inventory.optimization import InventoryOptimizer, STOCK_STATUSES
+from src.inventory.demand_stats import DemandStats
+
+REPORT_COLUMNS = [
+    'Store', 'Dept', 'Current_Stock', 'Lead_Time', 'Predicted_Sales', 'Demand_Std',
+    'Safety_Stock', 'Reorder_Point', 'Stock_Status', 'Recommended_Order_Qty'
+]
+
+def reorder_report(store, dept, current_stock, predicted_sales, demand_std, lead_time=None, optimizer=None,
+                   service_level=None):
+    """
+    Reorder metrics for a whole fleet of (Store, Dept) items in one
+    vectorized pass. Takes equal-length columns (lead_time in days and
+    service_level as a Z-score, per item or one value; the optimizer's when
+    None) and returns a dict of REPORT_COLUMNS arrays, in input order.
+    """
+    optimizer = optimizer or InventoryOptimizer()
+    lead_time = np.broadcast_to(
+        np.asarray(optimizer.lead_time if lead_time is None else lead_time, dtype=np.float64),
+        np.shape(current_stock)
+    )
+    metrics = optimizer.calculate_metrics_batch(current_stock, predicted_sales, demand_std, lead_time, service_level)
+    return {
+        'Store': np.asarray(store),
+        'Dept': np.asarray(dept),
+        'Current_Stock': np.asarray(current_stock, dtype=np.float64),
+        'Lead_Time': lead_time,
+        'Predicted_Sales': np.asarray(predicted_sales, dtype=np.float64),
+        'Demand_Std': np.asarray(demand_std, dtype=np.float64),
+        'Safety_Stock': metrics['safety_stock'],
+        'Reorder_Point': metrics['reorder_point'],
+        'Stock_Status': metrics['stock_status'],
+        'Recommended_Order_Qty': metrics['recommended_order_qty']
+    }
+
+def report_summary(report):
+    status = report['Stock_Status']
+    return {
+        'items': len(status),
+        'status_counts': {name: int((status == name).sum()) for name in STOCK_STATUSES},
+        'total_order_qty': round(float(report['Recommended_Order_Qty'].sum()), 2)
+    }
+
+def report_records(report):
+    """
+    The report as a list of row dicts (plain Python values, JSON-ready).
+    """
+    columns = {name: values.tolist() for name, values in report.items()}
+    return [dict(zip(REPORT_COLUMNS, row)) for row in zip(*(columns[name] for name in REPORT_COLUMNS))]
+
+# Detect project root
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Fleet-wide reorder report")
+    parser.add_argument("stock", help="CSV with Store, Dept, Current_Stock and optional Lead_Time, "
+                                      "Predicted_Sales and Demand_Std columns (demand std, lead time and "
+                                      "service level otherwise come from the demand statistics index)")
+    parser.add_argument("--output", default="reorder_report.csv")
+    parser.add_argument("--demand-stats", default=str(ROOT_DIR / "data/processed/demand_stats"))
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    items = pd.read_csv(args.stock)
+    lead_time = items['Lead_Time'].to_numpy(dtype=np.float64) if 'Lead_Time' in items else None
+
+    if os.path.exists(args.demand_stats):
+        stats = DemandStats.load(args.demand_stats)
+    else:
+        print(f"No demand statistics index at {args.demand_stats}, using defaults")
+        stats = DemandStats.empty()
+    index_std, lead_time, service_level = stats.inventory_inputs(items['Store'], items['Dept'], lead_time)
+
+    if 'Predicted_Sales' in items:
+        predicted_sales = items['Predicted_Sales'].to_numpy()
+    else:
+        keys = list(zip(items['Store'], items['Dept']))
+        # Same model version, feature store history and defaults as the API
+        from src.api import main as api
+        api.load_components()
+        if api.startup["error"]:
+            raise SystemExit(f"Model loading failed: {api.startup['error']}")
+        predicted_sales, version = api.fleet_forecast(keys)
+        print(f"Forecast {len(items)} items with model version {version}")
+    demand_std = items['Demand_Std'].to_numpy() if 'Demand_Std' in items else index_std
+
+    report = reorder_report(
+        items['Store'].to_numpy(), items['Dept'].to_numpy(), items['Current_Stock'].to_numpy(),
+        predicted_sales, demand_std, lead_time, service_level=service_level
+    )
+    pd.DataFrame(report, columns=REPORT_COLUMNS).to_csv(args.output, index=False)
+
+    summary = report_summary(report)
+    print(f"Reorder report for {summary['items']} items written to {args.output} "
+          f"in {time.perf_counter() - start:.2f}s")
+    for name, count in summary['status_counts'].items():
+        print(f" - {name}: {count}")
+    print(f" - Total recommended order qty: {summary['total_order_qty']:,.2f}")
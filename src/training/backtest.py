@@ -0,0 +1,331 @@
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Allow running as `python src/training/backtest.py`
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from src.training.common import FEATURES, MAX_BOOST_ROUNDS, EARLY_STOPPING_ROUNDS, ensemble_weights, train_threads
+from src.training.dataset_cache import EARLY_STOPPING_FRACTION, split_index
+from src.training.train_prophet import PROPHET_LEVEL, _fit_series, build_series
+from src.inference.prophet_bundle import ALL, ProphetBundle
+from src.utils.datasets import read_dataset, to_model_frame
+
+# Detect project root
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+
+MODELS = ["lgbm", "xgb", "prophet"]
+# Expanding-window folds: each tests the HORIZON_WEEKS weeks after its
+# cutoff, the last one ending at the last week of data
+BACKTEST_FOLDS = int(os.getenv("BACKTEST_FOLDS", "4"))
+BACKTEST_HORIZON_WEEKS = int(os.getenv("BACKTEST_HORIZON_WEEKS", "13"))
+# The first fold trains on at least this many weeks
+MIN_TRAIN_WEEKS = 52
+# Prophet series fitted per pool task
+PROPHET_CHUNK_SERIES = 50
+
+# Tree-model rows sorted by Date, memory-mapped read-only by every worker
+SHARED_ARRAYS = ["X", "y", "days"]
+_shared = {}
+
+def _attach(shared_dir):
+    # Pool initializer: map the shared arrays once per process
+    for name in SHARED_ARRAYS:
+        _shared[name] = np.load(os.path.join(shared_dir, f"{name}.npy"), mmap_mode="r")
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+
+def make_folds(weeks, n_folds=BACKTEST_FOLDS, horizon_weeks=BACKTEST_HORIZON_WEEKS):
+    """
+    Expanding-window folds over the sorted unique weeks (datetime64[D]):
+    fold k trains on every week before its cutoff and tests the
+    `horizon_weeks` weeks from the cutoff on.
+    """
+    if len(weeks) < MIN_TRAIN_WEEKS + n_folds * horizon_weeks:
+        raise ValueError(
+            f"{len(weeks)} weeks of data, {n_folds} folds of {horizon_weeks} weeks "
+            f"need at least {MIN_TRAIN_WEEKS + n_folds * horizon_weeks}"
+        )
+    folds = []
+    for k in range(n_folds):
+        start = len(weeks) - (n_folds - k) * horizon_weeks
+        folds.append({"fold": k + 1, "cutoff": weeks[start], "test_end": weeks[start + horizon_weeks - 1]})
+    return folds
+
+def _fold_rows(fold):
+    # Rows are sorted by day: training and test rows are contiguous slices
+    days = _shared["days"]
+    cutoff = fold["cutoff"].astype(np.int64)
+    train_end = int(np.searchsorted(days, cutoff, side="left"))
+    test_end = int(np.searchsorted(days, fold["test_end"].astype(np.int64), side="right"))
+    return train_end, test_end
+
+def _tree_task(task):
+    """
+    Trains one tree model on a fold's training weeks, early-stopping on their
+    last EARLY_STOPPING_FRACTION like the trainers, and predicts the test weeks.
+    """
+    model, fold, threads = task
+    X, y = _shared["X"], _shared["y"]
+    train_end, test_end = _fold_rows(fold)
+    split = split_index(train_end, EARLY_STOPPING_FRACTION)
+
+    start = time.perf_counter()
+    if model == "lgbm":
+        import lightgbm as lgb
+        from src.training.train_lgbm import DATASET_PARAMS, PARAMS
+
+        train_set = lgb.Dataset(X[:split], y[:split], params=DATASET_PARAMS)
+        val_set = lgb.Dataset(X[split:train_end], y[split:train_end], reference=train_set)
+        booster = lgb.train(
+            {**PARAMS, "num_threads": threads}, train_set, num_boost_round=MAX_BOOST_ROUNDS, valid_sets=[val_set],
+            callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)]
+        )
+        best_iteration = booster.best_iteration or booster.current_iteration()
+        pred = booster.predict(X[train_end:test_end], num_iteration=best_iteration)
+    else:
+        import xgboost as xgb
+        from src.training.train_xgb import PARAMS
+
+        dtrain = xgb.DMatrix(X[:split], y[:split], nthread=threads)
+        dval = xgb.DMatrix(X[split:train_end], y[split:train_end], nthread=threads)
+        booster = xgb.train(
+            {**PARAMS, "nthread": threads}, dtrain, num_boost_round=MAX_BOOST_ROUNDS, evals=[(dval, "validation")],
+            early_stopping_rounds=EARLY_STOPPING_ROUNDS, verbose_eval=False
+        )
+        best_iteration = booster.best_iteration + 1
+        pred = booster.inplace_predict(np.asarray(X[train_end:test_end]), iteration_range=(0, best_iteration))
+    seconds = time.perf_counter() - start
+    return fold["fold"], model, np.asarray(pred, dtype=np.float64), seconds, int(best_iteration)
+
+def _prophet_task(task):
+    fold_number, series = task
+    start = time.perf_counter()
+    results = [_fit_series(item) for item in series]
+    return fold_number, "prophet", results, time.perf_counter() - start, None
+
+def _prophet_tasks(sales, fold, level):
+    """
+    Prophet fitting tasks of one fold: the chain-wide series and the
+    store / (Store, Dept) series of its training weeks, in chunks.
+    """
+    train_df = sales[sales["Date"] < fold["cutoff"]]
+    chain = train_df.groupby("Date")["Weekly_Sales"].mean()
+    series = [((ALL, ALL), chain.index.to_numpy(), chain.to_numpy(dtype=np.float64))]
+    series += build_series(train_df, level)[0]
+    return [
+        (fold["fold"], series[i:i + PROPHET_CHUNK_SERIES])
+        for i in range(0, len(series), PROPHET_CHUNK_SERIES)
+    ]
+
+def score(y_true, y_pred):
+    y_true = np.asarray(y_true, dtype=np.float64)
+    nonzero = y_true != 0
+    return {
+        "rmse": float(np.sqrt(np.mean((y_true - y_pred) ** 2))),
+        "mae": float(np.mean(np.abs(y_true - y_pred))),
+        "mape": float(np.mean(np.abs((y_true[nonzero] - y_pred[nonzero]) / y_true[nonzero])) * 100)
+    }
+
+def walk_forward_weights(fold_rmse):
+    """
+    Ensemble weights per fold from the mean RMSE of the earlier folds only,
+    so the ensemble is scored on weeks its weights never saw; the first fold
+    has no earlier ones and weights the models equally. fold_rmse:
+    {fold: {model: rmse}}, in fold order.
+    """
+    weights, seen = {}, []
+    for fold, rmse in fold_rmse.items():
+        if seen:
+            weights[fold] = ensemble_weights({model: float(np.mean([r[model] for r in seen])) for model in rmse})
+        else:
+            weights[fold] = {model: 1 / len(rmse) for model in rmse}
+        seen.append(rmse)
+    return weights
+
+def run_backtest(data_path, output_dir, n_folds=BACKTEST_FOLDS, horizon_weeks=BACKTEST_HORIZON_WEEKS,
+                 models=MODELS, prophet_level=PROPHET_LEVEL, max_workers=None):
+    """
+    Rolling-origin backtest of the ensemble members and the weighted
+    ensemble. Every (fold, model) pair - Prophet split into chunks of
+    series - is one task in a single process pool; the feature matrix is
+    written once and memory-mapped read-only by all workers.
+
+    Writes folds.csv (metrics per fold and model), series.csv (RMSE per
+    Store/Dept and model over all test weeks) and summary.json (mean and
+    std of the fold RMSEs, and the inverse-RMSE ensemble weights they give)
+    to `output_dir`. Returns the summary. The ensemble rows are out of
+    sample: each fold is blended with the weights of the earlier folds
+    (see walk_forward_weights).
+    """
+    models = [m for m in MODELS if m in models]
+    start = time.perf_counter()
+
+    print(f"Loading data for the backtest from {data_path}...")
+    df = read_dataset(data_path, columns=list(FEATURES) + ["Date", "Weekly_Sales"])
+    df = df.sort_values("Date", kind="stable").reset_index(drop=True)
+    sales = df[["Store", "Dept", "Date", "Weekly_Sales"]].copy()
+    folds = make_folds(np.unique(df["Date"].to_numpy().astype("datetime64[D]")), n_folds, horizon_weeks)
+
+    # Rows the tree trainers use (no NaN lag / rolling features)
+    rows = df.dropna()
+    y = rows["Weekly_Sales"].to_numpy(dtype=np.float32)
+    keys = rows[["Store", "Dept"]].astype(np.int64).to_numpy()
+    dates = rows["Date"].to_numpy()
+    shared_dir = tempfile.mkdtemp(prefix="backtest-")
+    try:
+        np.save(os.path.join(shared_dir, "X.npy"), to_model_frame(rows, list(FEATURES)).to_numpy())
+        np.save(os.path.join(shared_dir, "y.npy"), y)
+        np.save(os.path.join(shared_dir, "days.npy"), dates.astype("datetime64[D]").astype(np.int64))
+        del df, rows
+        _attach(shared_dir)
+
+        prophet_tasks = []
+        for fold in folds:
+            train_end, test_end = _fold_rows(fold)
+            fold.update(train_rows=train_end, test_start_row=train_end, test_rows=test_end - train_end)
+            if "prophet" in models:
+                prophet_tasks += [(_prophet_task, task) for task in _prophet_tasks(sales, fold, prophet_level)]
+        tree_models = [model for model in models if model != "prophet"]
+        budget = train_threads()
+        workers = min(len(prophet_tasks) + len(folds) * len(tree_models), max_workers or budget)
+        # Threads per tree task: the workers share the stage's cores
+        threads = max(1, budget // workers)
+        tasks = [(_tree_task, (model, fold, threads)) for fold in folds for model in tree_models] + prophet_tasks
+
+        print(f"Backtesting {', '.join(models)} over {len(folds)} folds of {horizon_weeks} weeks: "
+              f"{len(tasks)} tasks on {workers} worker(s)...")
+        predictions = {(fold["fold"], model): None for fold in folds for model in models}
+        prophet_params = {fold["fold"]: {} for fold in folds}
+        seconds = {key: 0.0 for key in predictions}
+        best_iterations = {}
+
+        def collect(result):
+            fold_number, model, output, task_seconds, best_iteration = result
+            seconds[(fold_number, model)] += task_seconds
+            if model == "prophet":
+                for key, params, _ in output:
+                    if params is not None:
+                        prophet_params[fold_number][key] = params
+            else:
+                predictions[(fold_number, model)] = output
+                best_iterations[(fold_number, model)] = best_iteration
+                print(f"  fold {fold_number} {model}: {task_seconds:.1f}s, {best_iteration} rounds")
+
+        if workers <= 1:
+            for func, task in tasks:
+                collect(func(task))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(shared_dir,)) as pool:
+                futures = [pool.submit(func, task) for func, task in tasks]
+                for future in as_completed(futures):
+                    collect(future.result())
+    finally:
+        _shared.clear()
+        shutil.rmtree(shared_dir, ignore_errors=True)
+
+    fold_rows, series_parts = [], []
+    for fold in folds:
+        test = slice(fold["test_start_row"], fold["test_start_row"] + fold["test_rows"])
+        if "prophet" in models:
+            if (ALL, ALL) not in prophet_params[fold["fold"]]:
+                raise RuntimeError(f"Chain-wide Prophet model failed to fit in fold {fold['fold']}")
+            bundle = ProphetBundle.from_params(prophet_params[fold["fold"]], level=prophet_level)
+            predictions[(fold["fold"], "prophet")] = bundle.predict(dates[test], keys[test, 0], keys[test, 1])
+        part = pd.DataFrame({"Store": keys[test, 0], "Dept": keys[test, 1], "Weekly_Sales": y[test]})
+        for model in models:
+            part[model] = predictions[(fold["fold"], model)]
+            fold_rows.append({
+                "fold": fold["fold"], "cutoff": str(fold["cutoff"]), "test_end": str(fold["test_end"]),
+                "train_rows": fold["train_rows"], "test_rows": fold["test_rows"], "model": model,
+                **score(part["Weekly_Sales"], part[model].to_numpy()),
+                "train_seconds": seconds[(fold["fold"], model)],
+                "best_iteration": best_iterations.get((fold["fold"], model))
+            })
+        series_parts.append(part)
+    folds_df = pd.DataFrame(fold_rows)
+
+    # The weights the pipeline takes from all the fold RMSEs; scoring the
+    # ensemble with them would be in-sample, so each fold uses only the
+    # folds before it
+    mean_rmse = folds_df.groupby("model")["rmse"].mean()
+    weights = ensemble_weights({model: float(mean_rmse[model]) for model in models})
+    fold_weights = walk_forward_weights({
+        fold["fold"]: {row["model"]: row["rmse"] for row in fold_rows if row["fold"] == fold["fold"]}
+        for fold in folds
+    })
+    for part, fold in zip(series_parts, folds):
+        part["ensemble"] = sum(fold_weights[fold["fold"]][model] * part[model] for model in models)
+        folds_df = pd.concat([folds_df, pd.DataFrame([{
+            "fold": fold["fold"], "cutoff": str(fold["cutoff"]), "test_end": str(fold["test_end"]),
+            "train_rows": fold["train_rows"], "test_rows": fold["test_rows"], "model": "ensemble",
+            **score(part["Weekly_Sales"], part["ensemble"].to_numpy())
+        }])], ignore_index=True)
+
+    folds_df = folds_df.sort_values("fold", kind="stable").reset_index(drop=True)
+    folds_df["best_iteration"] = folds_df["best_iteration"].astype("Int64")
+
+    tested = pd.concat(series_parts, ignore_index=True)
+    squared = {model: (tested[model] - tested["Weekly_Sales"]) ** 2 for model in models + ["ensemble"]}
+    series_df = pd.DataFrame({"Store": tested["Store"], "Dept": tested["Dept"], **squared})
+    grouped = series_df.groupby(["Store", "Dept"], sort=True)
+    series_df = np.sqrt(grouped.mean()).add_prefix("rmse_")
+    series_df.insert(0, "rows", grouped.size())
+    series_df = series_df.reset_index()
+
+    by_model = folds_df.groupby("model", sort=False)["rmse"]
+    summary = {
+        "folds": len(folds),
+        "horizon_weeks": horizon_weeks,
+        "rmse": {model: float(v) for model, v in by_model.mean().items()},
+        "rmse_std": {model: float(v) for model, v in by_model.std(ddof=0).items()},
+        "weights": weights,
+        "ensemble_fold_weights": {str(fold): w for fold, w in fold_weights.items()},
+        "prophet_level": prophet_level,
+        "workers": workers,
+        "seconds": time.perf_counter() - start
+    }
+
+    os.makedirs(output_dir, exist_ok=True)
+    folds_df.to_csv(os.path.join(output_dir, "folds.csv"), index=False)
+    series_df.to_csv(os.path.join(output_dir, "series.csv"), index=False)
+    with open(os.path.join(output_dir, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=4)
+
+    print(f"\n--- Backtest ({len(folds)} folds, {summary['seconds']:.1f}s) ---")
+    print(f"{'model':<9} | {'mean RMSE':>10} | {'std':>9} | {'weight':>6}")
+    for model in models + ["ensemble"]:
+        weight = f"{weights[model]:.3f}" if model in weights else "-"
+        print(f"{model:<9} | {summary['rmse'][model]:>10,.2f} | {summary['rmse_std'][model]:>9,.2f} | {weight:>6}")
+    print(f"Results written to {output_dir}")
+    return summary
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", default=str(ROOT_DIR / "data/processed/sales_features.parquet"))
+    parser.add_argument("--folds", type=int, default=BACKTEST_FOLDS)
+    parser.add_argument("--horizon", type=int, default=BACKTEST_HORIZON_WEEKS, help="test weeks per fold")
+    parser.add_argument("--models", nargs="+", default=MODELS, choices=MODELS)
+    parser.add_argument("--prophet-level", default=PROPHET_LEVEL, choices=["global", "store", "store_dept"])
+    parser.add_argument("--workers", type=int, help="processes (default: all cores)")
+    parser.add_argument("--output", default=str(ROOT_DIR / "data/processed/backtest"))
+    args = parser.parse_args()
+
+    run_backtest(
+        args.data,
+        args.output,
+        n_folds=args.folds,
+        horizon_weeks=args.horizon,
+        models=args.models,
+        prophet_level=args.prophet_level,
+        max_workers=args.workers
+    )
@@ -0,0 +1,37 @@
+import os
+
+# Model input columns shared by the LightGBM and XGBoost trainers
+# (also written to model_artifacts/feature_list.json for inference)
+FEATURES = [
+    'Store', 'Dept', 'IsHoliday', 'Temperature', 'Fuel_Price',
+    'MarkDown1', 'MarkDown2', 'MarkDown3', 'MarkDown4', 'MarkDown5',
+    'CPI', 'Unemployment', 'Size',
+    'Year', 'Month', 'Week', 'Day', 'DayOfWeek',
+    'Lag_1', 'Lag_2', 'Lag_3', 'Lag_4', 'Lag_8', 'Lag_12',
+    'Lag_16', 'Lag_20', 'Lag_24',
+    'RollingMean_4', 'RollingStd_4',
+    'RollingMean_12', 'RollingStd_12'
+]
+
+# Boosting rounds are capped at MAX_BOOST_ROUNDS; early stopping on the
+# validation split stops a trainer after EARLY_STOPPING_ROUNDS rounds
+# without improvement and keeps the best round
+MAX_BOOST_ROUNDS = int(os.getenv("TRAIN_MAX_ROUNDS", "1000"))
+EARLY_STOPPING_ROUNDS = int(os.getenv("TRAIN_EARLY_STOPPING_ROUNDS", "25"))
+
+def train_threads():
+    """
+    Cores a training stage may use (TRAIN_THREADS, 0 or unset: all cores).
+    Read at call time: the retrain pipeline sets it per stage so stages
+    running at the same time share the cores.
+    """
+    return int(os.getenv("TRAIN_THREADS", "0")) or os.cpu_count() or 1
+
+def ensemble_weights(rmse):
+    """
+    Inverse-RMSE ensemble weights, shared by the retrain pipeline and the
+    backtest: weight = (1 / rmse) / sum(1 / rmse).
+    """
+    inv = {k: 1 / v for k, v in rmse.items() if v > 0}
+    total = sum(inv.values())
+    return {k: inv[k] / total for k in inv}
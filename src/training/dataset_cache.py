@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+
+from src.utils.datasets import read_dataset, to_model_frame
+
+from pathlib import Path
+
+# Detect project root
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+
+# Binned/parsed training matrices, one directory per data hash
+TRAIN_CACHE_DIR = os.getenv("TRAIN_CACHE_DIR", str(ROOT_DIR / "data" / "cache" / "training"))
+# Cache entries (data versions) kept; older ones are removed on a miss
+TRAIN_CACHE_KEEP = int(os.getenv("TRAIN_CACHE_KEEP", "2"))
+# Time-ordered split: the last 20% of rows (by Date) validate, i.e. give
+# the reported metrics; the last 10% of the remaining training rows drive
+# early stopping, so the validation rows never choose the model
+VALIDATION_FRACTION = 0.2
+EARLY_STOPPING_FRACTION = 0.1
+# Bumped whenever the cached layout or the split changes
+CACHE_VERSION = 2
+
+def data_hash(data_path, features):
+    """
+    Hash of the dataset's content (every file under a partitioned dataset),
+    the feature list and the split.
+    """
+    sha = hashlib.sha256()
+    sha.update(json.dumps([CACHE_VERSION, list(features), VALIDATION_FRACTION, EARLY_STOPPING_FRACTION]).encode())
+    root = Path(data_path)
+    files = sorted(p for p in root.rglob("*") if p.is_file()) if root.is_dir() else [root]
+    for path in files:
+        sha.update(str(path.relative_to(root) if root.is_dir() else path.name).encode())
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+    return sha.hexdigest()[:16]
+
+def split_index(n_rows, fraction):
+    # Rows before the index train, the last `fraction` of them are held out
+    return int(n_rows * (1 - fraction))
+
+def _save_atomic(path, write):
+    # Trainers can run in parallel on the same entry: write aside, rename
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+class TrainingCache:
+    """
+    Training data of one dataset version for the tree trainers: the
+    train / early-stopping / validation split and, per trainer, the
+    training matrix in its library's binary format (LightGBM's binned Dataset, XGBoost's DMatrix).
+    Keyed by data_hash, so a rerun on unchanged data loads the binaries
+    instead of reading the dataset and binning it again.
+    """
+
+    def __init__(self, data_path, features, cache_dir=TRAIN_CACHE_DIR):
+        self.data_path = data_path
+        self.features = list(features)
+        self.key = data_hash(data_path, self.features)
+        self.cache_dir = cache_dir
+        self.dir = os.path.join(cache_dir, self.key)
+        self._split = None
+
+    def _path(self, name):
+        return os.path.join(self.dir, name)
+
+    def _prepare_dir(self):
+        if os.path.isdir(self.dir):
+            return
+        os.makedirs(self.dir, exist_ok=True)
+        # Drop the oldest data versions
+        entries = sorted(
+            (os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)),
+            key=os.path.getmtime, reverse=True
+        )
+        for entry in entries[max(1, TRAIN_CACHE_KEEP):]:
+            if entry != self.dir and os.path.isdir(entry):
+                shutil.rmtree(entry, ignore_errors=True)
+
+    def split(self):
+        """
+        {'train', 'early_stopping', 'validation'}: (X, y) float32 arrays in
+        time order, read from the dataset on first use.
+        """
+        if self._split is None:
+            print(f"Reading training data from {self.data_path}...")
+            df = read_dataset(self.data_path, columns=self.features + ["Date", "Weekly_Sales"])
+            # Sort by time, drop rows with NaN lag / rolling features
+            df = df.sort_values("Date", kind="stable").dropna()
+            X = to_model_frame(df, self.features).to_numpy()
+            y = df["Weekly_Sales"].to_numpy(dtype=np.float32)
+            val_start = split_index(len(df), VALIDATION_FRACTION)
+            stop_start = split_index(val_start, EARLY_STOPPING_FRACTION)
+            self._split = {
+                "train": (X[:stop_start], y[:stop_start]),
+                "early_stopping": (X[stop_start:val_start], y[stop_start:val_start]),
+                "validation": (X[val_start:], y[val_start:])
+            }
+        return self._split
+
+    def _held_out(self, name):
+        path = self._path(f"{name}.npz")
+        if os.path.exists(path):
+            with np.load(path) as data:
+                return data["X"], data["y"]
+        X, y = self.split()[name]
+        self._prepare_dir()
+
+        def write(tmp_path):
+            with open(tmp_path, "wb") as f:
+                np.savez(f, X=X, y=y)
+
+        _save_atomic(path, write)
+        return X, y
+
+    def early_stopping(self):
+        """
+        (X, y) the boosters early-stop on, cached in early_stopping.npz.
+        """
+        return self._held_out("early_stopping")
+
+    def validation(self):
+        """
+        (X_val, y_val) the metrics are reported on, cached in validation.npz.
+        """
+        return self._held_out("validation")
+
+    def lgbm_dataset(self, params):
+        """
+        Binned lgb.Dataset of the training rows. `params` are the Dataset
+        (binning) parameters; they are part of the file name.
+        """
+        import lightgbm as lgb
+
+        params_key = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:8]
+        path = self._path(f"lgbm_train-{params_key}.bin")
+        if os.path.exists(path):
+            print(f"Loading binned LightGBM dataset from {path}")
+            return lgb.Dataset(path, params=params, feature_name=self.features).construct()
+
+        X_train, y_train = self.split()["train"]
+        dataset = lgb.Dataset(X_train, y_train, params=params, feature_name=self.features,
+                              free_raw_data=False).construct()
+        self._prepare_dir()
+        _save_atomic(path, lambda tmp_path: dataset.save_binary(tmp_path))
+        return dataset
+
+    def xgb_dmatrix(self, nthread=0):
+        """
+        xgb.DMatrix of the training rows. Histogram sketching still runs at
+        training time: QuantileDMatrix cannot be saved, a DMatrix can.
+        """
+        import xgboost as xgb
+
+        path = self._path("xgb_train.buffer")
+        if os.path.exists(path):
+            print(f"Loading XGBoost DMatrix from {path}")
+            return xgb.DMatrix(path, nthread=nthread)
+
+        X_train, y_train = self.split()["train"]
+        dmatrix = xgb.DMatrix(X_train, y_train, feature_names=self.features, nthread=nthread)
+        self._prepare_dir()
+        _save_atomic(path, lambda tmp_path: dmatrix.save_binary(tmp_path))
+        return dmatrix
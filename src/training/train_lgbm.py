@@ -1,70 +1,70 @@
-import pandas as pd
 import lightgbm as lgb
-import pickle
 import os
 import json
+import time
 import numpy as np
+import sys
+from pathlib import Path
+
+# Allow running as `python src/training/train_lgbm.py`
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
 
+from src.training.common import FEATURES, MAX_BOOST_ROUNDS, EARLY_STOPPING_ROUNDS, train_threads
+from src.training.dataset_cache import TrainingCache, TRAIN_CACHE_DIR
 from sklearn.metrics import (
     mean_absolute_error,
     mean_squared_error,
     r2_score
 )
 
-def train_lgbm(data_path, model_path, config_path):
-    print("Loading data for LightGBM...")
-    df = pd.read_csv(data_path)
-
-    # Sort by time
-    df = df.sort_values("Date")
-
-    # Drop NaN from lag & rolling features
-    df = df.dropna()
-
-    features = [
-        'Store', 'Dept', 'IsHoliday', 'Temperature', 'Fuel_Price',
-        'MarkDown1', 'MarkDown2', 'MarkDown3', 'MarkDown4', 'MarkDown5',
-        'CPI', 'Unemployment', 'Size',
-        'Year', 'Month', 'Week', 'Day', 'DayOfWeek',
-        'Lag_1', 'Lag_2', 'Lag_3', 'Lag_4', 'Lag_8', 'Lag_12',
-        'Lag_16', 'Lag_20', 'Lag_24',
-        'RollingMean_4', 'RollingStd_4',
-        'RollingMean_12', 'RollingStd_12'
-    ]
-
-    X = df[features]
-    y = df["Weekly_Sales"]
-
-    # ==============================
-    # TRAIN / VALIDATION SPLIT
-    # ==============================
+# Binning parameters of the cached training Dataset
+DATASET_PARAMS = {"max_bin": 255, "verbose": -1}
+# Booster parameters (also used by the backtest)
+PARAMS = {
+    "objective": "regression",
+    "max_depth": 6,
+    "learning_rate": 0.1,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+    "random_state": 42,
+    "verbose": -1
+}
+
+def train_lgbm(data_path, model_path, config_path, cache_dir=TRAIN_CACHE_DIR):
+    features = list(FEATURES)
 
-    split_index = int(len(df) * 0.8)
-
-    X_train, X_val = X.iloc[:split_index], X.iloc[split_index:]
-    y_train, y_val = y.iloc[:split_index], y.iloc[split_index:]
-
-    print(f"Training rows: {len(X_train)}")
+    print("Loading data for LightGBM...")
+    # Time-ordered split (see dataset_cache); the binned training Dataset is cached per data hash
+    cache = TrainingCache(data_path, features, cache_dir)
+    start = time.perf_counter()
+    train_set = cache.lgbm_dataset(DATASET_PARAMS)
+    X_stop, y_stop = cache.early_stopping()
+    X_val, y_val = cache.validation()
+    dataset_seconds = time.perf_counter() - start
+
+    print(f"Training rows: {train_set.num_data()}")
+    print(f"Early stopping rows: {len(X_stop)}")
     print(f"Validation rows: {len(X_val)}")
 
     # ==============================
     # MODEL TRAINING
     # ==============================
 
-    params = {
-        "n_estimators": 250,
-        "max_depth": 6,
-        "learning_rate": 0.1,
-        "subsample": 0.8,
-        "colsample_bytree": 0.8,
-        "random_state": 42,
-        "verbose": -1
-    }
-
-    model = lgb.LGBMRegressor(**params)
+    params = {**PARAMS, "num_threads": train_threads()}
 
-    print("Training LightGBM model...")
-    model.fit(X_train, y_train)
+    print(f"Training LightGBM model (up to {MAX_BOOST_ROUNDS} rounds, early stopping)...")
+    start = time.perf_counter()
+    # Early stopping never sees the validation rows the metrics come from
+    stop_set = lgb.Dataset(X_stop, y_stop, reference=train_set, feature_name=features)
+    booster = lgb.train(
+        params, train_set, num_boost_round=MAX_BOOST_ROUNDS, valid_sets=[stop_set],
+        callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)]
+    )
+    # Only the rounds up to the best one are kept
+    best_iteration = booster.best_iteration or booster.current_iteration()
+    model = lgb.Booster(model_str=booster.model_to_string(num_iteration=best_iteration))
+    train_seconds = time.perf_counter() - start
+    print(f"Best iteration: {best_iteration}, trained in {train_seconds:.1f}s")
 
     # ==============================
     # EVALUATION
@@ -92,8 +92,8 @@ def train_lgbm(data_path, model_path, config_path):
     print(f"\nSaving LightGBM model to {model_path}...")
     os.makedirs(os.path.dirname(model_path), exist_ok=True)
 
-    with open(model_path, "wb") as f:
-        pickle.dump(model, f)
+    # LightGBM's own text format (see src/inference/artifacts.py)
+    model.save_model(model_path)
 
     # Save feature list for inference
     feature_list_path = os.path.join(
@@ -105,16 +105,18 @@ def train_lgbm(data_path, model_path, config_path):
         json.dump(features, f)
 
     print("LightGBM training complete ✅")
-    print(rmse)
-
-from pathlib import Path
+    return {
+        "rmse": float(rmse), "mae": float(mae), "mape": float(mape), "r2": float(r2),
+        "best_iteration": int(best_iteration), "train_seconds": train_seconds,
+        "dataset_seconds": dataset_seconds
+    }
 
 # Detect project root (parent directory of 'src/training')
 ROOT_DIR = Path(__file__).resolve().parent.parent.parent
 
 if __name__ == "__main__":
     train_lgbm(
-        str(ROOT_DIR / "data/processed/sales_features.csv"),
-        str(ROOT_DIR / "model_artifacts/lgbm_model.pkl"),
+        str(ROOT_DIR / "data/processed/sales_features.parquet"),
+        str(ROOT_DIR / "model_artifacts/lgbm_model.txt"),
         None
     )
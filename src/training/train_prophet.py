@@ -1,80 +1,163 @@
+import logging
+import time
 import pandas as pd
 from prophet import Prophet
-import pickle
+from concurrent.futures import ProcessPoolExecutor
 import os
 import numpy as np
+import sys
+from pathlib import Path
+
+# Allow running as `python src/training/train_prophet.py`
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
 
+from src.training.common import train_threads
+from src.utils.datasets import read_dataset
+from src.inference.prophet_bundle import ALL, ProphetBundle, prophet_params
 from sklearn.metrics import (
     mean_absolute_error,
     mean_squared_error,
     r2_score
 )
 
-def train_prophet(data_path, model_path):
+PROPHET_ARGS = dict(
+    yearly_seasonality=True,
+    weekly_seasonality=True,
+    daily_seasonality=False
+)
+# Series fitted besides the chain-wide one: 'global' (none), 'store' (mean
+# per store) or 'store_dept' (per store and per (Store, Dept))
+PROPHET_LEVEL = os.getenv("PROPHET_SERIES_LEVEL", "store_dept")
+# Shorter series are not fitted; they fall back to their store's or the
+# chain-wide model
+MIN_SERIES_WEEKS = 52
+
+def _fit_series(task):
+    key, ds, y = task
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    try:
+        model = Prophet(**PROPHET_ARGS).fit(pd.DataFrame({"ds": ds, "y": y}))
+    except Exception as e:
+        return key, None, f"{type(e).__name__}: {e}"
+    return key, prophet_params(model), None
+
+def build_series(df, level):
+    """
+    (key, ds, y) fitting tasks for the store / (Store, Dept) series of
+    `df`, and the number of series skipped as too short.
+    """
+    groupings = {"global": [], "store": [["Store"]], "store_dept": [["Store"], ["Store", "Dept"]]}[level]
+    tasks, skipped = [], 0
+    for columns in groupings:
+        series = df.groupby(columns + ["Date"], sort=True, observed=True)["Weekly_Sales"].mean().reset_index()
+        for key, group in series.groupby(columns, sort=True, observed=True):
+            key = key if isinstance(key, tuple) else (key,)
+            if len(group) < MIN_SERIES_WEEKS:
+                skipped += 1
+                continue
+            store, dept = (int(key[0]), int(key[1]) if len(key) > 1 else ALL)
+            tasks.append(((store, dept), group["Date"].to_numpy(), group["Weekly_Sales"].to_numpy(dtype=np.float64)))
+    return tasks, skipped
+
+def fit_series(tasks, max_workers=None):
+    """
+    Fits every task in a process pool (inline with one worker), reporting
+    progress. Returns ({key: params}, {key: error}).
+    """
+    workers = min(len(tasks), max_workers or train_threads())
+    params, errors = {}, {}
+    if not tasks:
+        return params, errors
+
+    start = time.perf_counter()
+    step = max(1, len(tasks) // 10)
+
+    def collect(results):
+        for done, (key, result, error) in enumerate(results, start=1):
+            if result is None:
+                errors[key] = error
+            else:
+                params[key] = result
+            if done % step == 0 or done == len(tasks):
+                elapsed = time.perf_counter() - start
+                print(f"  {done}/{len(tasks)} series fitted ({elapsed:.1f}s, "
+                      f"~{elapsed / done * (len(tasks) - done):.0f}s left)")
+
+    if workers <= 1:
+        collect(map(_fit_series, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            collect(executor.map(_fit_series, tasks, chunksize=max(1, len(tasks) // (workers * 8))))
+    return params, errors
+
+def train_prophet(data_path, model_path, level=PROPHET_LEVEL, max_workers=None):
     print("Loading data for Prophet...")
-    df = pd.read_csv(data_path)
+    df = read_dataset(data_path, columns=["Store", "Dept", "Date", "Weekly_Sales"])
+    df["Date"] = pd.to_datetime(df["Date"])
 
     # ==============================
-    # AGGREGATE SALES BY DATE
+    # TRAIN / VALIDATION SPLIT (by date)
     # ==============================
 
-    prophet_df = (
-        df.groupby("Date")["Weekly_Sales"]
-        .mean()
-        .reset_index()
-    )
+    dates = np.sort(df["Date"].unique())
+    split_date = dates[int(len(dates) * 0.8)]
 
-    prophet_df.columns = ["ds", "y"]
+    train_df = df[df["Date"] < split_date]
+    val_df = df[df["Date"] >= split_date]
 
-    prophet_df = prophet_df.sort_values("ds")
+    print(f"Training weeks: {int((dates < split_date).sum())}")
+    print(f"Validation weeks: {int((dates >= split_date).sum())}")
 
     # ==============================
-    # TRAIN / VALIDATION SPLIT
+    # TRAIN MODELS
     # ==============================
 
-    split_index = int(len(prophet_df) * 0.8)
-
-    train_df = prophet_df.iloc[:split_index]
-    val_df = prophet_df.iloc[split_index:]
-
-    print(f"Training rows: {len(train_df)}")
-    print(f"Validation rows: {len(val_df)}")
+    start = time.perf_counter()
+
+    # Chain-wide mean series: the fallback for every other series
+    print("Training chain-wide Prophet model...")
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    chain_df = train_df.groupby("Date")["Weekly_Sales"].mean().reset_index()
+    chain_df.columns = ["ds", "y"]
+    chain_model = Prophet(**PROPHET_ARGS).fit(chain_df)
+    params = {(ALL, ALL): prophet_params(chain_model)}
+
+    tasks, skipped = build_series(train_df, level)
+    workers = min(len(tasks), max_workers or train_threads()) if tasks else 0
+    print(f"Training {len(tasks)} {level} Prophet models on {workers} worker(s) "
+          f"({skipped} series under {MIN_SERIES_WEEKS} weeks skipped)...")
+    series_params, errors = fit_series(tasks, max_workers)
+    params.update(series_params)
+    for key, error in list(errors.items())[:5]:
+        print(f"  {key} not fitted: {error}")
+
+    train_seconds = time.perf_counter() - start
+    print(f"Fitted {len(params)} models in {train_seconds:.1f}s")
+
+    bundle = ProphetBundle.from_params(params, level=level)
+
+    # The bundle must score like Prophet itself
+    check_dates = pd.DataFrame({"ds": pd.to_datetime(np.unique(val_df["Date"]))})
+    chain_model.uncertainty_samples = 0
+    expected = chain_model.predict(check_dates)["yhat"].to_numpy()
+    scored = bundle.predict(check_dates["ds"].to_numpy())
+    if not np.allclose(scored, expected, rtol=1e-9, atol=1e-6):
+        raise RuntimeError(f"Prophet bundle scoring differs from Prophet by {np.abs(scored - expected).max()}")
 
     # ==============================
-    # TRAIN MODEL
-    # ==============================
-
-    print("Training Prophet model...")
-
-    model = Prophet(
-        yearly_seasonality=True,
-        weekly_seasonality=True,
-        daily_seasonality=False
-    )
-
-    model.fit(train_df)
-
-    # ==============================
-    # EVALUATION
+    # EVALUATION (per Store/Dept row, as blended by the ensemble)
     # ==============================
 
     print("\n--- Prophet Evaluation Metrics ---")
 
-    future = model.make_future_dataframe(
-        periods=len(val_df),
-        freq="W"
-    )
-
-    forecast = model.predict(future)
-
-    # Match validation range
-    y_true = val_df["y"].values
-    y_pred = forecast.iloc[-len(val_df):]["yhat"].values
+    y_true = val_df["Weekly_Sales"].to_numpy(dtype=np.float64)
+    y_pred = bundle.predict(val_df["Date"].to_numpy(), val_df["Store"].to_numpy(), val_df["Dept"].to_numpy())
 
     rmse = np.sqrt(mean_squared_error(y_true, y_pred))
     mae = mean_absolute_error(y_true, y_pred)
     r2 = r2_score(y_true, y_pred)
-    mape = np.mean(np.abs((y_true - y_pred) / y_true)) * 100
+    nonzero = y_true != 0
+    mape = np.mean(np.abs((y_true[nonzero] - y_pred[nonzero]) / y_true[nonzero])) * 100
 
     print(f"RMSE : {rmse:,.2f}")
     print(f"MAE  : {mae:,.2f}")
@@ -85,23 +168,33 @@ def train_prophet(data_path, model_path):
     # SAVE MODEL
     # ==============================
 
-    print(f"\nSaving Prophet model to {model_path}...")
+    print(f"\nSaving Prophet bundle ({len(bundle)} series) to {model_path}...")
 
     os.makedirs(os.path.dirname(model_path), exist_ok=True)
-
-    with open(model_path, "wb") as f:
-        pickle.dump(model, f)
+    # Uncompressed, so serving can memory-map it
+    bundle.save(model_path, compressed=False)
 
     print("Prophet training complete ✅")
-    print(rmse)
-
-from pathlib import Path
+    return {
+        "rmse": float(rmse), "mae": float(mae), "mape": float(mape), "r2": float(r2),
+        "series": len(bundle), "skipped": skipped + len(errors),
+        "workers": workers, "train_seconds": train_seconds
+    }
 
 # Detect project root
 ROOT_DIR = Path(__file__).resolve().parent.parent.parent
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--level", default=PROPHET_LEVEL, choices=["global", "store", "store_dept"])
+    parser.add_argument("--workers", type=int, help="processes used for fitting (default: all cores)")
+    args = parser.parse_args()
+
     train_prophet(
-        str(ROOT_DIR / "data/processed/sales_features.csv"),
-        str(ROOT_DIR / "model_artifacts/prophet_model.pkl")
+        str(ROOT_DIR / "data/processed/sales_features.parquet"),
+        str(ROOT_DIR / "model_artifacts/prophet_bundle.npz"),
+        level=args.level,
+        max_workers=args.workers
     )
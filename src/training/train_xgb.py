@@ -1,75 +1,76 @@
-import pandas as pd
 import xgboost as xgb
-import pickle
 import os
-import json
+import time
 import numpy as np
+import sys
+from pathlib import Path
+
+# Allow running as `python src/training/train_xgb.py`
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
 
+from src.training.common import FEATURES, MAX_BOOST_ROUNDS, EARLY_STOPPING_ROUNDS, train_threads
+from src.training.dataset_cache import TrainingCache, TRAIN_CACHE_DIR
 from sklearn.metrics import (
     mean_absolute_error,
     mean_squared_error,
     r2_score
 )
 
-from pathlib import Path
-
 # Detect project root
 ROOT_DIR = Path(__file__).resolve().parent.parent.parent
 
-def train_xgb(data_path, model_path):
-    print("Loading data for XGBoost...")
-    df = pd.read_csv(data_path)
-
-    df = df.sort_values("Date")
-    df = df.dropna()
-
-    # ==============================
-    # LOAD FEATURE LIST
-    # ==============================
-
-    feature_list_path = ROOT_DIR / "model_artifacts/feature_list.json"
-    with open(feature_list_path, "r") as f:
-        features = json.load(f)
-
-    X = df[features]
-    y = df["Weekly_Sales"]
+# Booster parameters (also used by the backtest)
+PARAMS = {
+    "max_depth": 6,
+    "learning_rate": 0.1,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+    "tree_method": "hist",
+    "seed": 42,
+    "objective": "reg:squarederror",
+    "verbosity": 0
+}
+
+def train_xgb(data_path, model_path, cache_dir=TRAIN_CACHE_DIR):
+    features = list(FEATURES)
 
-    # ==============================
-    # TRAIN / VALIDATION SPLIT
-    # ==============================
-
-    split_index = int(len(df) * 0.8)
-
-    X_train, X_val = X.iloc[:split_index], X.iloc[split_index:]
-    y_train, y_val = y.iloc[:split_index], y.iloc[split_index:]
-
-    print(f"Training rows: {len(X_train)}")
+    print("Loading data for XGBoost...")
+    # Time-ordered split (see dataset_cache); the training DMatrix is cached per data hash
+    cache = TrainingCache(data_path, features, cache_dir)
+    threads = train_threads()
+    start = time.perf_counter()
+    dtrain = cache.xgb_dmatrix(nthread=threads)
+    X_stop, y_stop = cache.early_stopping()
+    X_val, y_val = cache.validation()
+    dataset_seconds = time.perf_counter() - start
+
+    print(f"Training rows: {dtrain.num_row()}")
+    print(f"Early stopping rows: {len(X_stop)}")
     print(f"Validation rows: {len(X_val)}")
 
     # ==============================
     # MODEL PARAMETERS
     # ==============================
 
-    params = {
-        "n_estimators": 250,
-        "max_depth": 6,
-        "learning_rate": 0.1,
-        "subsample": 0.8,
-        "colsample_bytree": 0.8,
-        "tree_method": "hist",
-        "random_state": 42,
-        "objective": "reg:squarederror",
-        "verbosity": 0
-    }
-
-    model = xgb.XGBRegressor(**params)
+    params = {**PARAMS, "nthread": threads}
 
     # ==============================
     # TRAIN MODEL
     # ==============================
 
-    print("Training XGBoost model...")
-    model.fit(X_train, y_train)
+    print(f"Training XGBoost model (up to {MAX_BOOST_ROUNDS} rounds, early stopping)...")
+    start = time.perf_counter()
+    # Early stopping never sees the validation rows the metrics come from
+    dstop = xgb.DMatrix(X_stop, y_stop, feature_names=features, nthread=threads)
+    booster = xgb.train(
+        params, dtrain, num_boost_round=MAX_BOOST_ROUNDS, evals=[(dstop, "early_stopping")],
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS, verbose_eval=False
+    )
+    # Only the rounds up to the best one are kept
+    best_iteration = booster.best_iteration + 1
+    model = booster[:best_iteration]
+    train_seconds = time.perf_counter() - start
+    print(f"Best iteration: {best_iteration}, trained in {train_seconds:.1f}s")
 
     # ==============================
     # EVALUATION
@@ -77,7 +78,7 @@ def train_xgb(data_path, model_path):
 
     print("\n--- XGBoost Evaluation Metrics ---")
 
-    y_pred = model.predict(X_val)
+    y_pred = model.inplace_predict(X_val)
 
     rmse = np.sqrt(mean_squared_error(y_val, y_pred))
     mae = mean_absolute_error(y_val, y_pred)
@@ -97,14 +98,18 @@ def train_xgb(data_path, model_path):
 
     os.makedirs(os.path.dirname(model_path), exist_ok=True)
 
-    with open(model_path, "wb") as f:
-        pickle.dump(model, f)
+    # XGBoost's own binary format (UBJSON, chosen by the .ubj extension)
+    model.save_model(model_path)
 
     print("XGBoost training complete ✅")
-    print(rmse)
+    return {
+        "rmse": float(rmse), "mae": float(mae), "mape": float(mape), "r2": float(r2),
+        "best_iteration": int(best_iteration), "train_seconds": train_seconds,
+        "dataset_seconds": dataset_seconds
+    }
 
 if __name__ == "__main__":
     train_xgb(
-        str(ROOT_DIR / "data/processed/sales_features.csv"),
-        str(ROOT_DIR / "model_artifacts/xgb_model.pkl")
+        str(ROOT_DIR / "data/processed/sales_features.parquet"),
+        str(ROOT_DIR / "model_artifacts/xgb_model.ubj")
     )
@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import inspect
+import json
+import time
+from collections import OrderedDict
+
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+
+def _normalize(value):
+    # 1, 1.0 and np.float32(1) are the same request
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, float, np.number)):
+        return float(value)
+    return value
+
+def cache_key(*parts):
+    """
+    Stable key for JSON-like request data: independent of dict field order
+    and of int/float spelling of the same number.
+    """
+    payload = json.dumps(_normalize(parts), sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class PredictionCache:
+    """
+    Bounded LRU cache with a TTL for prediction responses.
+
+    Concurrent requests for the same key share one computation (single
+    flight). Blocking computations run in the threadpool so the event loop
+    stays free; coroutine functions are awaited directly. Failures are not
+    cached. When
+    `fingerprint()` (e.g. of the model artifacts) changes, every entry is
+    dropped and results still in flight are not stored. Cached values are
+    shared between callers and must not be mutated.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=60.0, fingerprint=None, check_interval=1.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.fingerprint = fingerprint
+        self.check_interval = check_interval
+
+        self._entries = OrderedDict() # key -> (expires_at, value)
+        self._inflight = {}
+        self._generation = 0
+        self._fingerprint_value = fingerprint() if fingerprint else None
+        self._next_check = time.monotonic() + check_interval
+        self.counters = {
+            'hits': 0, 'misses': 0, 'coalesced': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self._generation += 1
+
+    def _check_fingerprint(self, now):
+        if self.fingerprint is None or now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        current = self.fingerprint()
+        if current != self._fingerprint_value:
+            self._fingerprint_value = current
+            self.clear()
+            self.counters['invalidations'] += 1
+
+    def _store(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    async def _compute(self, key, compute, generation):
+        try:
+            if inspect.iscoroutinefunction(compute):
+                value = await compute()
+            else:
+                value = await run_in_threadpool(compute)
+        finally:
+            self._inflight.pop(key, None)
+        if generation == self._generation:
+            self._store(key, value)
+        return value
+
+    async def get_or_compute(self, key, compute):
+        """
+        Returns the cached value for `key`, or the result of `compute()`,
+        shared with any identical request already running.
+        """
+        now = time.monotonic()
+        self._check_fingerprint(now)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._entries.move_to_end(key)
+                self.counters['hits'] += 1
+                return entry[1]
+            del self._entries[key]
+            self.counters['expirations'] += 1
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.counters['misses'] += 1
+            # The generation is taken now: the task may only start after an invalidation
+            task = asyncio.ensure_future(self._compute(key, compute, self._generation))
+            # Callers may all have given up (e.g. timed out); the error is theirs to see, not the loop's
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = task
+        else:
+            self.counters['coalesced'] += 1
+        # A cancelled request must not cancel the computation others wait on
+        return await asyncio.shield(task)
+
+    def stats(self):
+        lookups = self.counters['hits'] + self.counters['misses'] + self.counters['coalesced']
+        return {
+            **self.counters,
+            'size': len(self._entries),
+            'in_flight': len(self._inflight),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'hit_rate': (self.counters['hits'] + self.counters['coalesced']) / lookups if lookups else 0.0
+        }
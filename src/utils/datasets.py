@@ -0,0 +1,143 @@
+import os
+import shutil
+import uuid
+import pandas as pd
+import numpy as np
+
+# Compact dtypes for the processed datasets
+CATEGORICAL_COLUMNS = ['Store', 'Dept', 'Type']
+INTEGER_COLUMNS = {
+    'Size': 'int32',
+    'Year': 'int16',
+    'Month': 'int8',
+    'Week': 'int8',
+    'Day': 'int8',
+    'DayOfWeek': 'int8',
+    'IsWeekend': 'int8',
+    'IsMonthStart': 'int8',
+    'IsMonthEnd': 'int8'
+}
+BOOLEAN_COLUMNS = ['IsHoliday']
+
+# Partition files are written in Date order with bounded row groups, so a
+# Date filter only decompresses the row groups covering that window
+ROW_GROUP_ROWS = 4096
+WRITE_BATCH_ROWS = 1_000_000
+
+def optimize_dtypes(df):
+    """
+    Categoricals for Store/Dept/Type, float32 for the measures,
+    small ints for calendar columns and native datetimes for Date.
+    """
+    for col in df.columns:
+        if col in CATEGORICAL_COLUMNS:
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('category')
+            # Partition discovery can yield categories in directory order
+            categories = df[col].cat.categories
+            if not categories.is_monotonic_increasing:
+                df[col] = df[col].cat.reorder_categories(categories.sort_values())
+        elif col in INTEGER_COLUMNS:
+            df[col] = df[col].astype(INTEGER_COLUMNS[col])
+        elif col in BOOLEAN_COLUMNS:
+            df[col] = df[col].astype(bool)
+        elif col == 'Date':
+            df[col] = pd.to_datetime(df[col])
+        elif pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].astype(np.float32)
+    return df
+
+def write_dataset(df, path, partition_cols=None, append=False):
+    """
+    Writes a processed dataset. Parquet (optionally partitioned into a
+    hive-style directory, e.g. Store=1/) unless the path ends in .csv.
+    With append=True new files are added next to the existing partitions.
+    """
+    print(f"{'Appending' if append else 'Saving'} dataset to {path}...")
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+
+    if path.endswith('.csv'):
+        df.to_csv(path, index=False, mode='a' if append else 'w', header=not (append and os.path.exists(path)))
+        return
+
+    if append and not partition_cols:
+        raise ValueError("Appending to a parquet dataset requires partition_cols")
+
+    # Replace, don't append to, an existing dataset
+    if not append:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    if not partition_cols:
+        df.to_parquet(path, engine='pyarrow', index=False)
+        return
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    file_name = f"part-{uuid.uuid4().hex[:12]}.parquet" if append else "part-0.parquet"
+    partitions = df.groupby(partition_cols, observed=True, sort=False).indices
+    dates = df['Date'].to_numpy() if 'Date' in df.columns else None
+
+    # Partitions are converted to Arrow in batches of at most WRITE_BATCH_ROWS
+    # rows, which bounds the extra memory and amortizes per-conversion overhead
+    batch = []
+    batch_rows = 0
+    items = list(partitions.items())
+    for i, (values, rows) in enumerate(items):
+        if dates is not None:
+            rows = rows[np.argsort(dates[rows], kind='stable')]
+        batch.append((values, rows))
+        batch_rows += len(rows)
+        if batch_rows < WRITE_BATCH_ROWS and i < len(items) - 1:
+            continue
+
+        part_df = df.iloc[np.concatenate([rows for _, rows in batch])].drop(columns=partition_cols)
+        table = pa.Table.from_pandas(part_df, preserve_index=False)
+        offset = 0
+        for values, rows in batch:
+            values = values if isinstance(values, tuple) else (values,)
+            part_dir = os.path.join(path, *[f"{col}={value}" for col, value in zip(partition_cols, values)])
+            os.makedirs(part_dir, exist_ok=True)
+            pq.write_table(
+                table.slice(offset, len(rows)), os.path.join(part_dir, file_name), row_group_size=ROW_GROUP_ROWS
+            )
+            offset += len(rows)
+        batch = []
+        batch_rows = 0
+
+def read_dataset(path, columns=None, filters=None):
+    """
+    Reads a processed dataset, loading only `columns` and, for parquet,
+    only the partitions / row groups matching `filters`
+    (e.g. [('Store', 'in', [1, 2])]).
+    """
+    if path.endswith('.csv'):
+        df = pd.read_csv(path, usecols=columns)
+        return optimize_dtypes(df)
+
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    dataset = ds.dataset(path, format='parquet', partitioning='hive')
+    expression = pq.filters_to_expression(filters) if filters else None
+    table = dataset.to_table(columns=columns, filter=expression)
+    # Frees each Arrow column as soon as it has been converted
+    df = table.to_pandas(self_destruct=True, split_blocks=True)
+    del table
+    return optimize_dtypes(df)
+
+def to_model_frame(df, columns):
+    """
+    Model input matrix: categorical keys back to their numeric values,
+    everything as float32.
+    """
+    X = df[columns].copy()
+    for col in X.columns:
+        if isinstance(X[col].dtype, pd.CategoricalDtype):
+            X[col] = X[col].astype(X[col].cat.categories.dtype)
+    return X.astype(np.float32)
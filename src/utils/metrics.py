@@ -0,0 +1,230 @@
+import bisect
+import math
+import os
+import threading
+import time
+
+# METRICS_ENABLED=0 turns every timer into a no-op
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+
+# Latency buckets in seconds: sub-millisecond model stages up to slow AI calls
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if value != value:
+        return "NaN"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels_text(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        return lines + self.samples()
+
+class Gauge(_Metric):
+    """
+    A value set by the code, or read at scrape time from `read()`, which
+    returns the value (no labels) or {label values tuple: value}.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, help_text, label_names=(), read=None):
+        super().__init__(name, help_text, label_names)
+        self.values = {}
+        self.read = read
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = value
+
+    def samples(self):
+        if self.read is not None:
+            values = self.read()
+            if not isinstance(values, dict):
+                values = {(): values}
+        else:
+            with self._lock:
+                values = dict(self.values)
+        return [
+            f"{self.name}{_labels_text(self.label_names, key)} {_format_value(v)}"
+            for key, v in values.items() if v is not None
+        ]
+
+class Counter(Gauge):
+    """
+    A monotonically increasing value: incremented by the code, or read at
+    scrape time from counters kept elsewhere (e.g. cache stats).
+    """
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _Timer:
+    __slots__ = ('series', 'start')
+
+    def __init__(self, series):
+        self.series = series
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.series.observe(time.perf_counter() - self.start)
+        return False
+
+class _HistogramSeries:
+    """
+    One label combination of a histogram, bound once so hot paths skip the
+    label lookup.
+    """
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets, lock):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = lock
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """
+        Context manager observing the wall-clock seconds of the block (also
+        when it raises).
+        """
+        return _Timer(self) if METRICS_ENABLED else _NULL_TIMER
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}
+
+    def labels(self, **labels):
+        key = self._key(labels)
+        series = self.series.get(key)
+        if series is None:
+            with self._lock:
+                series = self.series.setdefault(key, _HistogramSeries(self.buckets, self._lock))
+        return series
+
+    def observe(self, value, **labels):
+        self.labels(**labels).observe(value)
+
+    def time(self, **labels):
+        return self.labels(**labels).time()
+
+    def samples(self):
+        with self._lock:
+            series = {key: (list(child.counts), child.sum, child.count) for key, child in self.series.items()}
+        lines = []
+        for key, (counts, total, count) in series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                labels = _labels_text(self.label_names, key, [("le", _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels_text(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Registry:
+    """
+    The metrics of one process, rendered in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, label_names=(), read=None):
+        return self.register(Counter(name, help_text, label_names, read))
+
+    def gauge(self, name, help_text, label_names=(), read=None):
+        return self.register(Gauge(name, help_text, label_names, read))
+
+    def histogram(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help_text, label_names, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+# Hot-path instruments shared by the predictor, the API and the AI advisor
+INFERENCE_STAGE_SECONDS = REGISTRY.histogram(
+    "smartstock_inference_stage_seconds",
+    "Seconds per model stage: lgbm, xgb, trees (both, compiled), prophet, and whole predict_batch/predict_horizon calls",
+    ["stage"]
+)
+AI_ADVISOR_SECONDS = REGISTRY.histogram(
+    "smartstock_ai_advisor_seconds",
+    "AI suggestion latency: per request (call=suggestion) and per backend (Gemini) call (call=backend)",
+    ["call", "outcome"]
+)
+CHART_SECONDS = REGISTRY.histogram(
+    "smartstock_chart_seconds", "Seconds spent building and serializing chart data", ["chart"]
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "smartstock_http_request_seconds", "HTTP request latency by route and status", ["method", "route", "status"]
+)
+ERRORS = REGISTRY.counter(
+    "smartstock_errors_total", "Errors caught by request handlers", ["where", "type"]
+)
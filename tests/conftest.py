@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Detect project root, so `src` imports work from any working directory
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+def make_sales(n_stores=3, n_depts=4, n_weeks=40, seed=0, drop_fraction=0.0):
+    """
+    Walmart-shaped weekly sales (Store, Dept, Date, IsHoliday, Weekly_Sales);
+    `drop_fraction` of the rows are removed to leave gaps in the series.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2010-02-05', periods=n_weeks, freq='7D')
+    stores, depts, days = np.meshgrid(np.arange(1, n_stores + 1), np.arange(1, n_depts + 1), dates, indexing='ij')
+    df = pd.DataFrame({
+        'Store': stores.ravel(),
+        'Dept': depts.ravel(),
+        'Date': days.ravel(),
+    })
+    df['IsHoliday'] = df['Date'].dt.isocalendar().week.isin([6, 36, 47, 52]).to_numpy()
+    df['Weekly_Sales'] = rng.gamma(2.0, 5000.0, len(df)) + 1000 * df['Dept']
+    if drop_fraction:
+        df = df[rng.random(len(df)) >= drop_fraction]
+    return df.reset_index(drop=True)
+
+@pytest.fixture
+def sales():
+    return make_sales()
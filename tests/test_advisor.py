@@ -0,0 +1,43 @@
+import asyncio
+import threading
+
+from src.ai_advisor.advisor import AIAdvisor, StubBackend, demand_trend
+
+INVENTORY = {'stock_status': 'UNDERSTOCK', 'recommended_order_qty': 1200.0}
+
+def forecast(next_week, weekly_ahead):
+    return {
+        'next_week_sales': next_week,
+        'next_month_sales': next_week + 3 * weekly_ahead,
+        'next_3_month_sales': next_week + 12 * weekly_ahead
+    }
+
+def test_demand_trend_follows_the_quarter_forecast():
+    assert demand_trend(forecast(1000.0, 1200.0)) == 'up'
+    assert demand_trend(forecast(1000.0, 800.0)) == 'down'
+    assert demand_trend(forecast(1000.0, 1010.0)) == 'flat'
+    assert demand_trend(forecast(0.0, 500.0)) == 'flat'
+
+def test_trend_is_part_of_the_suggestion_bucket():
+    advisor = AIAdvisor(backend=StubBackend(0.0))
+    assert advisor.bucket(forecast(1000.0, 1200.0), INVENTORY) != advisor.bucket(forecast(1000.0, 800.0), INVENTORY)
+
+def test_advisor_built_on_another_thread_works_in_each_loop():
+    advisor = []
+    # The API builds the advisor on its loader thread
+    loader = threading.Thread(target=lambda: advisor.append(
+        AIAdvisor(backend=StubBackend(0.01), max_concurrency=1, cache_ttl_seconds=0.0)
+    ))
+    loader.start()
+    loader.join()
+
+    async def suggestions():
+        # More concurrent backend calls than the semaphore admits
+        return await asyncio.gather(*[
+            advisor[0].get_suggestion_async(forecast(1000.0, weekly), INVENTORY) for weekly in (500.0, 1000.0, 1500.0)
+        ])
+
+    for _ in range(2):
+        results = asyncio.run(suggestions())
+        assert all(result.startswith("Stub suggestion") for result in results)
+    assert advisor[0].counters == {'timeouts': 0, 'errors': 0}
@@ -0,0 +1,60 @@
+import json
+import os
+
+import lightgbm as lgb
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from src.inference.artifacts import MANIFEST_FILE, NATIVE_FILES, load_npz, package_artifacts, read_manifest
+
+FEATURES = ['Store', 'Dept', 'Week']
+
+@pytest.fixture
+def model_dir(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.random((200, len(FEATURES)))
+    y = X @ np.array([3.0, 1.0, 2.0])
+    lgb.train({'verbose': -1, 'num_leaves': 4}, lgb.Dataset(X, y, feature_name=FEATURES), num_boost_round=3) \
+        .save_model(str(tmp_path / NATIVE_FILES['lgbm']))
+    xgb.train({'max_depth': 2}, xgb.DMatrix(X, y, feature_names=FEATURES), num_boost_round=3) \
+        .save_model(str(tmp_path / NATIVE_FILES['xgb']))
+    # Packaging only checksums the Prophet bundle
+    np.savez(tmp_path / NATIVE_FILES['prophet'], k=np.arange(4.0))
+    with open(tmp_path / 'feature_list.json', 'w') as f:
+        json.dump(FEATURES, f)
+    with open(tmp_path / 'ensemble_config.json', 'w') as f:
+        json.dump({'weights': {'lgbm': 0.5, 'xgb': 0.3, 'prophet': 0.2}}, f)
+    package_artifacts(str(tmp_path))
+    return tmp_path
+
+def test_packaged_set_verifies(model_dir):
+    manifest = read_manifest(str(model_dir), verify=True)
+    assert manifest['features'] == FEATURES
+    assert set(manifest['files']) == set(NATIVE_FILES.values()) | {'feature_list.json', 'ensemble_config.json'}
+    # The uncompressed bundle is memory-mapped
+    arrays = load_npz(str(model_dir / NATIVE_FILES['prophet']))
+    assert isinstance(arrays['k'].base, np.memmap)
+    np.testing.assert_array_equal(arrays['k'], np.arange(4.0))
+
+def test_changed_file_fails_its_checksum(model_dir):
+    with open(model_dir / 'ensemble_config.json', 'w') as f:
+        json.dump({'weights': {'lgbm': 1.0, 'xgb': 0.0, 'prophet': 0.0}}, f)
+    with pytest.raises(ValueError, match="ensemble_config.json .* checksum"):
+        read_manifest(str(model_dir), verify=True)
+    # The check can be skipped
+    assert read_manifest(str(model_dir), verify=False)['features'] == FEATURES
+
+def test_missing_file_fails(model_dir):
+    os.remove(model_dir / NATIVE_FILES['compiled_trees'])
+    with pytest.raises(ValueError, match="missing"):
+        read_manifest(str(model_dir), verify=True)
+
+def test_unknown_format_version_fails(model_dir):
+    with open(model_dir / MANIFEST_FILE) as f:
+        manifest = json.load(f)
+    manifest['format_version'] += 1
+    with open(model_dir / MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f)
+    with pytest.raises(ValueError, match="format version"):
+        read_manifest(str(model_dir), verify=False)
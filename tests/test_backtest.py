@@ -0,0 +1,16 @@
+import pytest
+
+from src.training.backtest import walk_forward_weights
+from src.training.common import ensemble_weights
+
+def test_walk_forward_weights_only_use_earlier_folds():
+    fold_rmse = {
+        1: {'lgbm': 100.0, 'xgb': 200.0},
+        2: {'lgbm': 300.0, 'xgb': 100.0},
+        3: {'lgbm': 1.0, 'xgb': 1e6},
+    }
+    weights = walk_forward_weights(fold_rmse)
+
+    assert weights[1] == {'lgbm': 0.5, 'xgb': 0.5}
+    assert weights[2] == pytest.approx(ensemble_weights(fold_rmse[1]))
+    assert weights[3] == pytest.approx(ensemble_weights({'lgbm': 200.0, 'xgb': 150.0}))
@@ -0,0 +1,85 @@
+import os
+
+import pandas as pd
+import pytest
+
+import src.inference.bulk_score as bulk_score
+from conftest import make_sales
+
+class FakeScorer:
+    """
+    Stands in for ChunkScorer (no models needed): 'predicts' each row's
+    position in its series and records the chunks it scored. Raises on the
+    chunk holding `fail_on` to simulate an interrupted run.
+    """
+    scored = []
+    fail_on = None
+
+    def __init__(self, *args):
+        pass
+
+    def score(self, chunk):
+        first = (int(chunk['Store'].iloc[0]), int(chunk['Dept'].iloc[0]))
+        if first == FakeScorer.fail_on:
+            raise RuntimeError("interrupted")
+        FakeScorer.scored.append(first)
+        return chunk.assign(Weekly_Sales=chunk.groupby(['Store', 'Dept']).cumcount().astype(float))
+
+@pytest.fixture
+def job(tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk_score, 'ChunkScorer', FakeScorer)
+    FakeScorer.scored = []
+    FakeScorer.fail_on = None
+
+    input_path = str(tmp_path / "test.csv")
+    make_sales(n_stores=2, n_depts=3, n_weeks=10)[bulk_score.INPUT_COLUMNS].to_csv(input_path, index=False)
+    model_dir = tmp_path / "models"
+    model_dir.mkdir()
+    feature_store_path = str(tmp_path / "feature_store.npz")
+    open(feature_store_path, "wb").close()
+
+    def run(output, chunk_rows=25, restart=False):
+        return bulk_score.score_file(
+            input_path, str(tmp_path / output), str(model_dir), feature_store_path, None, None,
+            chunk_rows=chunk_rows, max_workers=1, restart=restart
+        )
+    return run
+
+def read_output(path):
+    return pd.read_parquet(path).sort_values(['Store', 'Dept', 'Date']).reset_index(drop=True)
+
+def test_interrupted_job_resumes_where_it_stopped(job, tmp_path):
+    # Chunks of ~25 rows end on series boundaries: 2, 2, 1 and 1 series of 10 weeks
+    FakeScorer.fail_on = (2, 2)
+    with pytest.raises(RuntimeError):
+        job("scored")
+    assert FakeScorer.scored == [(1, 1), (1, 3)]
+    assert not os.path.exists(tmp_path / "scored" / bulk_score.SUCCESS_FILE)
+
+    FakeScorer.fail_on = None
+    FakeScorer.scored = []
+    summary = job("scored")
+    # Only the chunks without a part file are scored again
+    assert FakeScorer.scored == [(2, 2), (2, 3)]
+    assert summary['resumed_chunks'] == 2 and summary['chunks'] == 2
+    assert summary['rows'] + summary['resumed_rows'] == 60
+
+    job("clean")
+    pd.testing.assert_frame_equal(read_output(tmp_path / "scored"), read_output(tmp_path / "clean"))
+
+def test_completed_job_is_not_scored_again(job):
+    first = job("scored")
+    FakeScorer.scored = []
+    assert job("scored") == first
+    assert FakeScorer.scored == []
+
+def test_changed_job_needs_restart(job):
+    FakeScorer.fail_on = (2, 2)
+    with pytest.raises(RuntimeError):
+        job("scored")
+    FakeScorer.fail_on = None
+
+    with pytest.raises(ValueError, match="different scoring job"):
+        job("scored", chunk_rows=40)
+    summary = job("scored", chunk_rows=40, restart=True)
+    assert summary['resumed_chunks'] == 0 and summary['rows'] == 60
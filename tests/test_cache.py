@@ -0,0 +1,120 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from src.utils.cache import PredictionCache, cache_key
+
+def test_cache_key_ignores_field_order_and_number_spelling():
+    assert cache_key({'store': 1, 'dept': 2.0}) == cache_key({'dept': 2, 'store': np.float32(1)})
+    assert cache_key({'store': 1}) != cache_key({'store': 2})
+
+def test_concurrent_requests_share_one_computation():
+    calls = []
+
+    async def main():
+        cache = PredictionCache()
+        release = asyncio.Event()
+
+        async def compute():
+            calls.append(1)
+            await release.wait()
+            return {'sales': 1.0}
+
+        waiters = [asyncio.ensure_future(cache.get_or_compute('k', compute)) for _ in range(10)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+        return cache, results
+
+    cache, results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert cache.counters['misses'] == 1 and cache.counters['coalesced'] == 9
+    assert cache.stats()['in_flight'] == 0
+
+def test_blocking_computation_runs_in_the_threadpool():
+    loop_thread = threading.get_ident()
+
+    async def main():
+        cache = PredictionCache()
+        threads = []
+
+        def compute():
+            threads.append(threading.get_ident())
+            return 42
+
+        first = await cache.get_or_compute('k', compute)
+        second = await cache.get_or_compute('k', compute)
+        return cache, threads, first, second
+
+    cache, threads, first, second = asyncio.run(main())
+    assert first == second == 42
+    assert len(threads) == 1 and threads[0] != loop_thread
+    assert cache.counters['hits'] == 1
+
+def test_failures_are_not_cached():
+    async def main():
+        cache = PredictionCache()
+
+        async def fail():
+            raise RuntimeError("model error")
+
+        async def succeed():
+            return 'ok'
+
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute('k', fail)
+        return len(cache), await cache.get_or_compute('k', succeed)
+
+    assert asyncio.run(main()) == (0, 'ok')
+
+def test_changed_fingerprint_drops_entries_and_in_flight_results():
+    fingerprint = ['v1']
+
+    async def main():
+        cache = PredictionCache(fingerprint=lambda: fingerprint[0], check_interval=0.0)
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return 'old model'
+
+        await cache.get_or_compute('cached', lambda: 'old')
+        pending = asyncio.ensure_future(cache.get_or_compute('pending', slow))
+        await asyncio.sleep(0)
+
+        # New model artifacts: the next lookup drops everything
+        fingerprint[0] = 'v2'
+        fresh = await cache.get_or_compute('cached', lambda: 'new')
+        release.set()
+        await pending
+        return cache, fresh
+
+    cache, fresh = asyncio.run(main())
+    assert fresh == 'new'
+    assert cache.counters['invalidations'] == 1
+    # The result computed with the old model was not stored
+    assert 'pending' not in cache._entries
+
+def test_least_recently_used_entries_are_evicted():
+    async def main():
+        cache = PredictionCache(max_entries=2)
+        for key in ['a', 'b', 'a', 'c']:
+            await cache.get_or_compute(key, lambda: key)
+        return cache
+
+    cache = asyncio.run(main())
+    assert list(cache._entries) == ['a', 'c']
+    assert cache.counters['evictions'] == 1
+
+def test_expired_entries_are_recomputed():
+    async def main():
+        cache = PredictionCache(ttl_seconds=0.0)
+        await cache.get_or_compute('k', lambda: 1)
+        return cache, await cache.get_or_compute('k', lambda: 2)
+
+    cache, value = asyncio.run(main())
+    assert value == 2
+    assert cache.counters['expirations'] == 1
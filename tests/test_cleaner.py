@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from conftest import make_sales
+from src.data_cleaning.cleaner import clean_data, clean_dataset
+from src.utils.datasets import read_dataset
+
+@pytest.fixture
+def raw(tmp_path):
+    sales = make_sales(n_weeks=20, seed=4)
+    sales.to_csv(tmp_path / "train.csv", index=False, date_format='%Y-%m-%d')
+
+    stores = pd.DataFrame({'Store': [1, 2, 3], 'Type': ['A', 'B', 'A'], 'Size': [151315, 202307, 37392]})
+    stores.to_csv(tmp_path / "stores.csv", index=False)
+
+    # One store-week has no features row, so the left join leaves it empty
+    weeks = sales[['Store', 'Date', 'IsHoliday']].drop_duplicates().iloc[1:].reset_index(drop=True)
+    rng = np.random.default_rng(4)
+    features = weeks.assign(Temperature=rng.normal(60, 15, len(weeks)), Fuel_Price=3.0, CPI=211.0, Unemployment=8.1)
+    for i in range(1, 6):
+        features[f'MarkDown{i}'] = np.where(rng.random(len(weeks)) < 0.5, np.nan, rng.gamma(2, 1000, len(weeks)))
+    features.to_csv(tmp_path / "features.csv", index=False, date_format='%Y-%m-%d')
+    return tmp_path
+
+def clean(raw, name, chunk_rows):
+    output = str(raw / name)
+    summary = clean_dataset(str(raw / "train.csv"), str(raw / "stores.csv"), str(raw / "features.csv"), output,
+                         chunk_rows=chunk_rows)
+    df = read_dataset(output).sort_values(['Store', 'Dept', 'Date']).reset_index(drop=True)
+    return summary, df
+
+def test_streaming_matches_loading_at_once(raw):
+    summary, expected = clean(raw, "at_once.parquet", chunk_rows=0)
+    streamed_summary, streamed = clean(raw, "streamed.parquet", chunk_rows=100)
+
+    assert summary == {"rows": len(expected), "chunks": 1}
+    assert streamed_summary == {"rows": len(expected), "chunks": int(np.ceil(len(expected) / 100))}
+    pd.testing.assert_frame_equal(streamed[expected.columns], expected)
+    assert (expected[[f'MarkDown{i}' for i in range(1, 6)]].notna()).all().all()
+
+def test_streaming_to_csv_matches_loading_at_once(raw):
+    _, expected = clean(raw, "at_once.csv", chunk_rows=0)
+    streamed_summary, streamed = clean(raw, "streamed.csv", chunk_rows=100)
+
+    assert streamed_summary["chunks"] == int(np.ceil(len(expected) / 100))
+    pd.testing.assert_frame_equal(streamed, expected)
+    assert not (raw / "streamed.tmp.csv").exists()
+
+def test_loading_at_once_returns_the_cleaned_frame(raw):
+    output = str(raw / "at_once.parquet")
+    df = clean_data(str(raw / "train.csv"), str(raw / "stores.csv"), str(raw / "features.csv"), output, chunk_rows=0)
+
+    assert isinstance(df, pd.DataFrame)
+    assert len(df) == len(read_dataset(output))
+
+def test_streamed_parts_share_the_dept_categories(raw):
+    # Chunks of 30 rows (20 weeks per series) each see one or two depts
+    clean(raw, "streamed.parquet", chunk_rows=30)
+
+    parts = sorted((raw / "streamed.parquet").rglob("*.parquet"))
+    assert len(parts) > 1
+    for part in parts:
+        columns = {col['name']: col for col in pq.read_schema(part).pandas_metadata['columns']}
+        assert columns['Dept']['metadata']['num_categories'] == 4
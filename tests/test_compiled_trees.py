@@ -0,0 +1,65 @@
+import lightgbm as lgb
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from src.inference.artifacts import load_npz
+from src.inference.compiled_trees import CompiledForest
+
+FEATURES = ['a', 'b', 'c', 'd', 'e']
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, len(FEATURES))).astype(np.float32) * 100
+    y = (3 * X[:, 0] + X[:, 1] ** 2 / 50 + np.where(X[:, 2] > 0, 200, -50) + rng.normal(size=len(X))).astype(np.float32)
+    # Missing values and exact zeros exercise the default-direction routing
+    X[rng.random(X.shape) < 0.05] = np.nan
+    X[rng.random(X.shape) < 0.05] = 0.0
+    return X, y
+
+@pytest.fixture(scope="module")
+def boosters(data):
+    X, y = data
+    lgbm = lgb.train(
+        {"objective": "regression", "max_depth": 6, "num_leaves": 40, "verbose": -1, "num_threads": 1},
+        lgb.Dataset(X, y, feature_name=FEATURES), num_boost_round=40
+    )
+    xgbm = xgb.train(
+        {"objective": "reg:squarederror", "max_depth": 6, "nthread": 1},
+        xgb.DMatrix(X, y, feature_names=FEATURES), num_boost_round=40
+    )
+    return lgbm, xgbm
+
+def test_matches_native_boosters(data, boosters):
+    X, y = data
+    lgbm, xgbm = boosters
+    forest = CompiledForest.from_models(FEATURES, lgbm, xgbm)
+    predictions = forest.predict(X)
+
+    scale = np.abs(y).max()
+    np.testing.assert_allclose(predictions[:, 0], lgbm.predict(X), atol=1e-5 * scale)
+    np.testing.assert_allclose(predictions[:, 1], xgbm.inplace_predict(X), atol=1e-5 * scale)
+
+def test_reordered_serving_features(data, boosters):
+    X, _ = data
+    lgbm, _ = boosters
+    serving = FEATURES[::-1] + ['unused']
+    forest = CompiledForest.from_models(serving, lgbm_model=lgbm)
+    X_serving = np.column_stack([X[:, ::-1], np.zeros(len(X), dtype=np.float32)])
+    expected = CompiledForest.from_models(FEATURES, lgbm_model=lgbm).predict(X)
+    np.testing.assert_array_equal(forest.predict(X_serving), expected)
+
+def test_saved_forest_predicts_the_same(tmp_path, data, boosters):
+    X, _ = data
+    forest = CompiledForest.from_models(FEATURES, *boosters)
+    path = str(tmp_path / "compiled_trees.npz")
+    forest.save(path)
+
+    loaded = CompiledForest.from_arrays(load_npz(path))
+    assert isinstance(loaded.value.base, np.memmap)
+    np.testing.assert_array_equal(loaded.predict(X), forest.predict(X))
+
+def test_unknown_model_feature_is_rejected(boosters):
+    with pytest.raises(ValueError, match="not in the serving feature list"):
+        CompiledForest.from_models(FEATURES[:-1], lgbm_model=boosters[0])
@@ -0,0 +1,35 @@
+import numpy as np
+
+from conftest import make_sales
+from src.training.dataset_cache import TrainingCache
+from src.utils.datasets import write_dataset
+
+FEATURES = ['Store', 'Dept', 'Days']
+
+def test_early_stopping_rows_precede_the_validation_rows(tmp_path):
+    df = make_sales(n_weeks=50, seed=5)
+    # Each row's date as a feature, to check the order of the parts
+    df['Days'] = (df['Date'] - df['Date'].min()).dt.days
+    data_path = str(tmp_path / "features.parquet")
+    write_dataset(df, data_path, partition_cols=['Store'])
+
+    cache = TrainingCache(data_path, FEATURES, str(tmp_path / "cache"))
+    split = cache.split()
+    sizes = {name: len(y) for name, (_, y) in split.items()}
+    assert sum(sizes.values()) == len(df)
+    assert sizes['validation'] == len(df) - int(len(df) * 0.8)
+    assert sizes['early_stopping'] == int(len(df) * 0.8) - int(int(len(df) * 0.8) * 0.9)
+
+    # The three parts follow each other in time
+    last = {name: X[:, 2].max() for name, (X, _) in split.items()}
+    first = {name: X[:, 2].min() for name, (X, _) in split.items()}
+    assert last['train'] <= first['early_stopping'] and last['early_stopping'] <= first['validation']
+
+    # Cached held-out rows are read back unchanged by a new cache object
+    cache.early_stopping()
+    cache.validation()
+    reloaded = TrainingCache(data_path, FEATURES, str(tmp_path / "cache"))
+    for name, held_out in [('early_stopping', reloaded.early_stopping()), ('validation', reloaded.validation())]:
+        np.testing.assert_array_equal(held_out[0], split[name][0])
+        np.testing.assert_array_equal(held_out[1], split[name][1])
+    assert reloaded._split is None
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_sales
+from src.inventory.demand_stats import (
+    DEFAULT_DEMAND_STD, DEFAULT_LEAD_TIME, DEFAULT_Z, STATS_WEEKS, DemandStats, build_demand_stats,
+    compute_demand_stats
+)
+from src.utils.datasets import write_dataset
+
+@pytest.fixture
+def index_dir(tmp_path):
+    sales = make_sales(n_stores=2, n_depts=3, n_weeks=60, seed=7)
+    cleaned = str(tmp_path / "cleaned")
+    write_dataset(sales, cleaned, partition_cols=['Store'])
+    params = tmp_path / "inventory_params.csv"
+    pd.DataFrame({'Store': [1, 9], 'Dept': [2, 9], 'Lead_Time': [3, 10], 'Service_Level': [0.99, 0.5]}).to_csv(
+        params, index=False
+    )
+    assert build_demand_stats(cleaned, str(tmp_path / "demand_stats"), str(params)) == {"series": 7}
+    return tmp_path / "demand_stats", sales
+
+def test_index_holds_the_last_weeks_statistics(index_dir):
+    directory, sales = index_dir
+    stats = DemandStats.load(directory)
+    assert isinstance(stats.columns['std'], np.memmap)
+
+    series = sales[(sales['Store'] == 2) & (sales['Dept'] == 3)].sort_values('Date')
+    window = series['Weekly_Sales'].to_numpy(dtype=np.float64)[-STATS_WEEKS:]
+    found = stats.lookup(2, 3)
+    assert found['mean'] == pytest.approx(window.mean())
+    assert found['std'] == pytest.approx(window.std(ddof=1))
+    assert found['weeks'] == STATS_WEEKS
+
+    # InventoryOptimizer takes a daily std with lead times in days
+    demand_std, lead_time, z = stats.inventory_inputs([2], [3])
+    assert demand_std[0] == pytest.approx(window.std(ddof=1) / np.sqrt(7))
+    assert (lead_time[0], z[0]) == (DEFAULT_LEAD_TIME, DEFAULT_Z)
+
+def test_unknown_series_get_the_defaults(index_dir):
+    stats = DemandStats.load(index_dir[0])
+    demand_std, lead_time, z = stats.inventory_inputs([1, 50, -1], [99, 1, 1])
+    np.testing.assert_array_equal(demand_std, [DEFAULT_DEMAND_STD] * 3)
+    np.testing.assert_array_equal(lead_time, [DEFAULT_LEAD_TIME] * 3)
+    np.testing.assert_array_equal(z, [DEFAULT_Z] * 3)
+    assert np.isnan(stats.lookup(50, 1)['mean'])
+
+def test_inventory_params_override_lead_time_and_service_level(index_dir):
+    stats = DemandStats.load(index_dir[0])
+    demand_std, lead_time, z = stats.inventory_inputs([1, 9, 1], [2, 9, 1])
+    np.testing.assert_allclose(lead_time, [3, 10, DEFAULT_LEAD_TIME])
+    np.testing.assert_allclose(z, [2.326348, 0.0, DEFAULT_Z], atol=1e-6)
+    # A listed series without sales keeps the default demand std
+    assert demand_std[1] == DEFAULT_DEMAND_STD
+
+    # Lead times sent with a request win over the index
+    _, lead_time, _ = stats.inventory_inputs([1, 1], [2, 1], [np.nan, 5])
+    np.testing.assert_allclose(lead_time, [3, 5])
+
+def test_invalid_service_level_is_rejected():
+    params = pd.DataFrame({'Store': [1], 'Dept': [1], 'Lead_Time': [7], 'Service_Level': [1.0]})
+    with pytest.raises(ValueError):
+        compute_demand_stats(make_sales(n_weeks=10), params)
@@ -0,0 +1,85 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_sales
+from src.feature_engineering.features import add_lag_rolling_features
+from src.feature_store.store import FEATURE_COLUMNS, FeatureStore
+
+def next_week_features(df):
+    """
+    create_features' lag/rolling values for the week after each series'
+    latest actual: one extra (unknown) row per series, featurized with the
+    rest.
+    """
+    last = df.sort_values('Date').groupby(['Store', 'Dept'], as_index=False).last()
+    extra = last.assign(Date=last['Date'] + pd.Timedelta(weeks=1), Weekly_Sales=np.nan)
+    full = pd.concat([df, extra], ignore_index=True).sort_values(['Store', 'Dept', 'Date'])
+    full = add_lag_rolling_features(full.reset_index(drop=True))
+    return full[full['Weekly_Sales'].isna()].reset_index(drop=True)
+
+@pytest.mark.parametrize("drop_fraction", [0.0, 0.2])
+def test_history_matches_create_features(drop_fraction):
+    df = make_sales(n_weeks=30, drop_fraction=drop_fraction, seed=1)
+    store = FeatureStore.from_sales(df)
+    expected = next_week_features(df)
+
+    keys = list(zip(expected['Store'], expected['Dept']))
+    columns, values, known = store.get_features_array(keys)
+    assert known.all()
+    np.testing.assert_allclose(values, expected[columns].to_numpy(dtype=np.float64), rtol=1e-9, equal_nan=True)
+
+def test_updates_match_a_rebuild():
+    df = make_sales(n_weeks=30, seed=2)
+    cutoff = df['Date'].unique()[-5]
+    store = FeatureStore.from_sales(df[df['Date'] < cutoff])
+    new = df[df['Date'] >= cutoff].sample(frac=1.0, random_state=0)
+    store.update_many(zip(new['Store'], new['Dept'], new['Date'].dt.strftime('%Y-%m-%d'), new['Weekly_Sales']))
+
+    rebuilt = FeatureStore.from_sales(df)
+    keys = list(rebuilt.index)
+    np.testing.assert_allclose(store.get_recent_array(keys)[0], rebuilt.get_recent_array(keys)[0], equal_nan=True)
+    np.testing.assert_array_equal(store.get_last_dates(keys), rebuilt.get_last_dates(keys))
+
+def test_update_many_is_all_or_nothing():
+    store = FeatureStore.from_sales(make_sales(n_weeks=10))
+    before, _ = store.get_recent_array([(1, 1), (2, 2)])
+    last = str(store.get_last_dates([(1, 1)])[0])
+
+    actuals = [(1, 1, '2030-01-04', 1.0), (2, 2, '2000-01-07', 2.0)]
+    with pytest.raises(ValueError):
+        store.update_many(actuals)
+    after, _ = store.get_recent_array([(1, 1), (2, 2)])
+    np.testing.assert_array_equal(before, after)
+    assert str(store.get_last_dates([(1, 1)])[0]) == last
+
+def test_update_many_orders_by_date_not_string():
+    store = FeatureStore()
+    # '2012-9-28' sorts after '2012-10-05' as a string
+    store.update_many([(1, 1, '2012-10-05', 2.0), (1, 1, '2012-9-28', 1.0)])
+    recent, _ = store.get_recent_array([(1, 1)])
+    assert recent[0, :2].tolist() == [2.0, 1.0]
+
+def test_save_and_load_round_trip(tmp_path):
+    store = FeatureStore.from_sales(make_sales(n_weeks=12))
+    path = str(tmp_path / "store" / "feature_store.npz")
+    store.save(path)
+    loaded = FeatureStore.load(path)
+
+    keys = list(store.index)
+    np.testing.assert_array_equal(store.get_features_array(keys)[1], loaded.get_features_array(keys)[1])
+    assert len(FEATURE_COLUMNS) == store.get_features_array(keys)[1].shape[1]
+
+def test_concurrent_saves_each_use_their_own_temp_file(tmp_path):
+    store = FeatureStore.from_sales(make_sales(n_weeks=12))
+    path = str(tmp_path / "feature_store.npz")
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        for future in [pool.submit(store.save, path) for _ in range(8)]:
+            future.result()
+
+    assert os.listdir(tmp_path) == ["feature_store.npz"]
+    keys = list(store.index)
+    np.testing.assert_array_equal(store.get_features_array(keys)[1], FeatureStore.load(path).get_features_array(keys)[1])
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_sales
+from src.feature_engineering import features
+from src.feature_engineering.features import (
+    LAGS, ROLLING_WINDOWS, add_lag_rolling_features, create_features, create_features_incremental
+)
+from src.utils.datasets import read_dataset, write_dataset
+
+def read_sorted(path):
+    df = read_dataset(path)
+    for col in ['Store', 'Dept']:
+        df[col] = df[col].astype(np.int64)
+    return df.sort_values(['Store', 'Dept', 'Date']).reset_index(drop=True)[sorted(df.columns)]
+
+def groupby_lag_rolling(df):
+    # The groupby/transform implementation add_lag_rolling_features replaced
+    df = df.copy()
+    series = df.groupby(['Store', 'Dept'])['Weekly_Sales']
+    for lag in LAGS:
+        df[f'Lag_{lag}'] = series.shift(lag)
+    for window in ROLLING_WINDOWS:
+        df[f'RollingMean_{window}'] = series.transform(lambda x: x.shift(1).rolling(window=window).mean())
+        df[f'RollingStd_{window}'] = series.transform(lambda x: x.shift(1).rolling(window=window).std())
+    return df
+
+def assert_matches_groupby(df):
+    # Series interleaved in date order: groupby keeps each series' own order,
+    # the vectorized pass needs the Store, Dept, Date sort create_features does
+    expected = groupby_lag_rolling(df.sort_values('Date', kind='stable'))
+    actual = add_lag_rolling_features(df.sort_values(['Store', 'Dept', 'Date']))
+    assert list(actual.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(actual.sort_index(), expected.sort_index(), check_exact=False, rtol=1e-9, atol=1e-6)
+
+@pytest.mark.parametrize("n_weeks, drop_fraction", [
+    (60, 0.0),
+    # Gaps: lags are by row within a series, as with groupby().shift()
+    (60, 0.3),
+    # Every series shorter than the largest lag and rolling window
+    (10, 0.0),
+])
+def test_lag_rolling_matches_groupby(n_weeks, drop_fraction):
+    df = make_sales(n_weeks=n_weeks, drop_fraction=drop_fraction, seed=7)
+    assert_matches_groupby(df.sample(frac=1.0, random_state=7))
+
+def test_lag_rolling_matches_groupby_on_mixed_series_lengths():
+    df = make_sales(n_weeks=40, seed=8)
+    # Series (1, 1) keeps 3 weeks, (2, 3) keeps 15: shorter than Lag_24 / the windows
+    short = ((df['Store'] == 1) & (df['Dept'] == 1) & (df['Date'] >= df['Date'].unique()[-3])) | \
+        ((df['Store'] == 2) & (df['Dept'] == 3) & (df['Date'] >= df['Date'].unique()[-15]))
+    long = ~(((df['Store'] == 1) & (df['Dept'] == 1)) | ((df['Store'] == 2) & (df['Dept'] == 3)))
+    df = df[short | long]
+    assert_matches_groupby(df.sample(frac=1.0, random_state=8))
+
+def test_incremental_matches_a_full_rebuild(tmp_path):
+    df = make_sales(n_weeks=60, drop_fraction=0.3, seed=3)
+    cutoff = df['Date'].unique()[-6]
+    # Series (3, 4) is new in the batch, with weeks before every other series' last week
+    first = df[(df['Date'] < cutoff) & ~((df['Store'] == 3) & (df['Dept'] == 4))]
+
+    cleaned = str(tmp_path / "cleaned")
+    incremental = str(tmp_path / "incremental")
+    full = str(tmp_path / "full")
+    write_dataset(first, cleaned, partition_cols=['Store'])
+    create_features(cleaned, incremental)
+
+    write_dataset(df, cleaned, partition_cols=['Store'])
+    create_features_incremental(cleaned, incremental)
+    create_features(cleaned, full)
+
+    expected = read_sorted(full)
+    actual = read_sorted(incremental)
+    assert len(actual) == len(expected)
+    pd.testing.assert_frame_equal(actual, expected, check_categorical=False)
+
+def test_incremental_without_new_weeks_appends_nothing(tmp_path):
+    cleaned = str(tmp_path / "cleaned")
+    features = str(tmp_path / "features")
+    write_dataset(make_sales(n_weeks=30), cleaned, partition_cols=['Store'])
+    create_features(cleaned, features)
+
+    assert create_features_incremental(cleaned, features).empty
+    assert len(read_dataset(features)) == len(read_dataset(cleaned))
+
+def test_incremental_after_an_interrupted_run_appends_no_duplicates(tmp_path, monkeypatch):
+    df = make_sales(n_weeks=40, seed=5)
+    cleaned = str(tmp_path / "cleaned")
+    incremental = str(tmp_path / "incremental")
+    full = str(tmp_path / "full")
+    write_dataset(df[df['Date'] < df['Date'].unique()[-4]], cleaned, partition_cols=['Store'])
+    create_features(cleaned, incremental)
+
+    # The new parts are appended, then the run dies before saving the series state
+    write_dataset(df, cleaned, partition_cols=['Store'])
+    def crash(*args):
+        raise RuntimeError("interrupted")
+    with monkeypatch.context() as patch:
+        patch.setattr(features, "_save_series_state", crash)
+        with pytest.raises(RuntimeError):
+            create_features_incremental(cleaned, incremental)
+
+    # The rerun appends nothing new but records the series state
+    assert create_features_incremental(cleaned, incremental).empty
+    assert create_features_incremental(cleaned, incremental).empty
+    create_features(cleaned, full)
+    pd.testing.assert_frame_equal(read_sorted(incremental), read_sorted(full), check_categorical=False)
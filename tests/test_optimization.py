@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from src.inventory.optimization import InventoryOptimizer, round_like_python
+
+KEYS = ["reorder_point", "safety_stock", "stock_status", "recommended_order_qty"]
+
+def scalar_metrics(optimizer, current_stock, predicted_sales, historical_std, lead_time, service_level):
+    rows = [
+        optimizer.calculate_metrics(*values)
+        for values in zip(current_stock, predicted_sales, historical_std, lead_time, service_level)
+    ]
+    return {key: [row[key] for row in rows] for key in KEYS}
+
+def assert_same(batch, expected):
+    for key in KEYS:
+        if key == "stock_status":
+            assert batch[key].tolist() == expected[key]
+        else:
+            np.testing.assert_array_equal(batch[key], np.array(expected[key], dtype=np.float64), err_msg=key)
+
+def test_batch_matches_scalar_metrics():
+    rng = np.random.default_rng(0)
+    n = 5000
+    current_stock = rng.choice([0.0, -5.0, 100.0, 2500.0, 1e5], n) * rng.random(n)
+    # Values that land on exact .5 ties after scaling by 100
+    current_stock[:50] = np.arange(50) + 0.125
+    predicted_sales = rng.gamma(2.0, 8000.0, n)
+    historical_std = rng.gamma(2.0, 1500.0, n)
+    historical_std[rng.random(n) < 0.02] = np.nan
+    lead_time = rng.integers(1, 15, n).astype(float)
+    service_level = rng.choice([1.28, 1.65, 2.33], n)
+
+    optimizer = InventoryOptimizer()
+    batch = optimizer.calculate_metrics_batch(current_stock, predicted_sales, historical_std, lead_time, service_level)
+    expected = scalar_metrics(optimizer, current_stock, predicted_sales, historical_std, lead_time, service_level)
+    assert_same(batch, expected)
+
+def test_scalars_broadcast_with_optimizer_defaults():
+    optimizer = InventoryOptimizer(service_level=1.65, lead_time=7)
+    current_stock = np.array([0.0, 10.0, 1000.0, 50000.0])
+    batch = optimizer.calculate_metrics_batch(current_stock, 14000.0, 900.0)
+    rows = [optimizer.calculate_metrics(stock, 14000.0, 900.0) for stock in current_stock]
+    assert_same(batch, {key: [row[key] for row in rows] for key in KEYS})
+
+@pytest.mark.parametrize("value", [0.125, 2.675, 1.005, -0.015, 1e17 + 0.5, 12345.675])
+def test_round_like_python(value):
+    assert round_like_python([value])[0] == round(value, 2)
@@ -0,0 +1,90 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+from prophet import Prophet
+
+from src.feature_store.store import HISTORY_WEEKS
+from src.inference.predictor import PROPHET_CACHE_HORIZON_DAYS, SalesPredictor, period_forecasts
+
+def test_period_forecasts_sum_the_weekly_forecast():
+    weekly = np.array([np.arange(1, 14), np.full(13, 2.5)])
+    assert period_forecasts(weekly) == [
+        {'next_week_sales': 1.0, 'next_month_sales': 10.0, 'next_3_month_sales': 91.0},
+        {'next_week_sales': 2.5, 'next_month_sales': 10.0, 'next_3_month_sales': 32.5}
+    ]
+
+def test_period_forecasts_leave_out_totals_beyond_the_horizon():
+    assert period_forecasts(np.ones((1, 6))) == [{'next_week_sales': 1.0, 'next_month_sales': 4.0}]
+
+class FlatPredictor(SalesPredictor):
+    # No models: every week is predicted at 100 plus the store number
+    def __init__(self):
+        self.features = ['Store', 'Dept', 'Year', 'Month', 'Day', 'Lag_1']
+        self.compiled_trees = None
+
+    def _ensemble(self, X, dates):
+        return 100.0 + np.asarray(X['Store'] if isinstance(X, pd.DataFrame) else X[:, 0], dtype=np.float64)
+
+ROWS = [{'Store': 1, 'Dept': 1, 'Year': 2012, 'Month': 10, 'Day': 26, 'Lag_1': 5.0},
+        {'Store': 2, 'Dept': 1, 'Year': 2012, 'Month': 10, 'Day': 26, 'Lag_1': 5.0}]
+
+def test_predict_batch_keeps_the_period_keys():
+    predictor = FlatPredictor()
+    with pytest.warns(DeprecationWarning):
+        scaled = predictor.predict_batch(ROWS)
+    assert scaled[0] == {'next_week_sales': 101.0, 'next_month_sales': 404.0, 'next_3_month_sales': 1212.0}
+
+    history = np.full((2, HISTORY_WEEKS), 50.0)
+    assert predictor.predict_batch(ROWS, history) == predictor.predict_periods(ROWS, history)
+    assert predictor.predict(ROWS[1], history[1])['next_3_month_sales'] == 13 * 102.0
+    assert predictor.predict_next_week(ROWS) == [{'next_week_sales': 101.0}, {'next_week_sales': 102.0}]
+
+class ProphetPredictor(SalesPredictor):
+    # Only the chain-wide Prophet model, as loaded from prophet_model.pkl
+    def __init__(self, prophet_model):
+        self.prophet_bundle = None
+        self.prophet_model = prophet_model
+        self._build_prophet_cache()
+
+@pytest.fixture(scope="module")
+def prophet_predictor():
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    ds = pd.date_range('2010-02-05', periods=60, freq='7D')
+    y = 15000 + 2000 * np.sin(np.arange(60) / 8) + np.random.default_rng(2).normal(0, 500, 60)
+    return ProphetPredictor(Prophet(yearly_seasonality=True, daily_seasonality=False).fit(pd.DataFrame({'ds': ds, 'y': y})))
+
+def direct_yhat(model, dates):
+    # Prophet.predict returns the dates sorted
+    unique, inverse = np.unique(dates, return_inverse=True)
+    model.uncertainty_samples = 0
+    return model.predict(pd.DataFrame({'ds': pd.to_datetime(unique)}))['yhat'].to_numpy()[inverse]
+
+def test_prophet_cache_matches_prophet_in_range(prophet_predictor):
+    start = prophet_predictor.prophet_cache_start
+    last = start + np.timedelta64(len(prophet_predictor.prophet_cache) - 1, 'D')
+    dates = np.array([start, start + np.timedelta64(100, 'D'), np.datetime64('2011-03-25'), last], dtype='datetime64[ns]')
+    dates = np.concatenate([dates, dates[::-1]])
+
+    np.testing.assert_allclose(
+        prophet_predictor.prophet_yhat(dates), direct_yhat(prophet_predictor.prophet_model, dates), rtol=1e-9
+    )
+    assert last >= np.datetime64('today', 'D') + np.timedelta64(PROPHET_CACHE_HORIZON_DAYS, 'D')
+    assert prophet_predictor.prophet_overflow == {}
+
+def test_prophet_cache_computes_out_of_range_dates_once(prophet_predictor, monkeypatch):
+    start = prophet_predictor.prophet_cache_start
+    after = start + np.timedelta64(len(prophet_predictor.prophet_cache) + 30, 'D')
+    # Before the history, after the cached horizon, and in range, with repeats
+    dates = np.array([start - np.timedelta64(7, 'D'), after, start + np.timedelta64(14, 'D'), after],
+                     dtype='datetime64[ns]')
+    expected = direct_yhat(prophet_predictor.prophet_model, dates)
+
+    np.testing.assert_allclose(prophet_predictor.prophet_yhat(dates), expected, rtol=1e-9)
+    assert len(prophet_predictor.prophet_overflow) == 2
+
+    def recompute(dates):
+        raise AssertionError("out-of-range dates computed again")
+    monkeypatch.setattr(prophet_predictor, "_compute_prophet_yhat", recompute)
+    np.testing.assert_allclose(prophet_predictor.prophet_yhat(dates), expected, rtol=1e-9)
@@ -0,0 +1,75 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+from prophet import Prophet
+
+from conftest import make_sales
+from src.inference.prophet_bundle import ALL, ProphetBundle, prophet_params
+from src.training.train_prophet import MIN_SERIES_WEEKS, PROPHET_ARGS, build_series, fit_series
+
+def fit(ds, y):
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    model = Prophet(**PROPHET_ARGS).fit(pd.DataFrame({"ds": ds, "y": y}))
+    model.uncertainty_samples = 0
+    return model
+
+@pytest.fixture(scope="module")
+def history():
+    # Store 1 has a full history; store 2 only its last weeks, too few to fit
+    df = make_sales(n_stores=2, n_depts=1, n_weeks=MIN_SERIES_WEEKS + 20, seed=11)
+    short = (df['Store'] == 2) & (df['Date'] < df['Date'].unique()[-(MIN_SERIES_WEEKS - 10)])
+    return df[~short].reset_index(drop=True)
+
+@pytest.fixture(scope="module")
+def chain_model(history):
+    chain = history.groupby("Date")["Weekly_Sales"].mean()
+    return fit(chain.index, chain.to_numpy())
+
+@pytest.fixture(scope="module")
+def series_model(history):
+    series = history[history['Store'] == 1]
+    return fit(series['Date'], series['Weekly_Sales'].to_numpy())
+
+def test_numpy_scoring_matches_prophet(chain_model, series_model):
+    bundle = ProphetBundle.from_params({(ALL, ALL): prophet_params(chain_model), (1, 1): prophet_params(series_model)})
+    # In-sample weeks and a year past the end of the history
+    dates = pd.date_range(series_model.history['ds'].min(), periods=MIN_SERIES_WEEKS + 72, freq='7D')
+    for model, stores in [(chain_model, None), (series_model, np.ones(len(dates)))]:
+        expected = model.predict(pd.DataFrame({"ds": dates}))["yhat"].to_numpy()
+        depts = None if stores is None else np.ones(len(dates))
+        np.testing.assert_allclose(bundle.predict(dates.to_numpy(), stores, depts), expected, rtol=1e-9, atol=1e-6)
+
+def test_short_series_fall_back_to_the_chain_wide_model(history, chain_model):
+    tasks, skipped = build_series(history, "store_dept")
+    assert sorted(key for key, _, _ in tasks) == [(1, ALL), (1, 1)]
+    assert skipped == 2
+
+    params, errors = fit_series(tasks, max_workers=1)
+    assert not errors
+    params[(ALL, ALL)] = prophet_params(chain_model)
+    bundle = ProphetBundle.from_params(params, level="store_dept")
+
+    dates = np.unique(history['Date'])[-4:]
+    chain = bundle.predict(dates)
+    np.testing.assert_allclose(bundle.predict(dates, np.full(4, 2), np.ones(4)), chain)
+    # An unknown dept of a fitted store uses the store's own series
+    store = bundle.predict(dates, np.ones(4), np.full(4, ALL))
+    np.testing.assert_allclose(bundle.predict(dates, np.ones(4), np.full(4, 99)), store)
+    assert not np.allclose(store, chain)
+
+@pytest.mark.parametrize("compressed", [True, False])
+def test_save_load_round_trip(tmp_path, chain_model, series_model, compressed):
+    bundle = ProphetBundle.from_params(
+        {(ALL, ALL): prophet_params(chain_model), (1, 1): prophet_params(series_model)}, level="store_dept"
+    )
+    path = tmp_path / "prophet_bundle.npz"
+    bundle.save(path, compressed=compressed)
+    loaded = ProphetBundle.load(path)
+
+    assert loaded.level == "store_dept"
+    assert loaded.index == bundle.index
+    dates = pd.date_range("2011-01-07", periods=20, freq="7D").to_numpy()
+    stores, depts = np.array([1, 2] * 10), np.ones(20)
+    np.testing.assert_array_equal(loaded.predict(dates, stores, depts), bundle.predict(dates, stores, depts))
@@ -0,0 +1,71 @@
+import json
+import os
+
+import pytest
+
+from src.inference.registry import VERSIONS_DIRNAME, ModelRegistry, list_versions, publish_version
+
+class FakePredictor:
+    # Predicts the 'sales' value of the model set's ensemble_config.json
+    def __init__(self, directory):
+        with open(os.path.join(directory, 'ensemble_config.json')) as f:
+            self.sales = json.load(f)['sales']
+
+    def predict_next_week(self, rows):
+        return [{'next_week_sales': self.sales} for _ in rows]
+
+def write_model_set(directory, sales):
+    with open(os.path.join(directory, 'ensemble_config.json'), 'w') as f:
+        json.dump({'sales': sales}, f)
+
+def add_version(artifacts_dir, version, sales):
+    directory = os.path.join(artifacts_dir, VERSIONS_DIRNAME, version)
+    os.makedirs(directory)
+    write_model_set(directory, sales)
+
+@pytest.fixture
+def registry(tmp_path):
+    add_version(tmp_path, '20240101T000000Z-aaa', 1.0)
+    registry = ModelRegistry(tmp_path, FakePredictor, smoke_rows=[{}, {}])
+    registry.activate()
+    registry.latest_seen = registry.version
+    return registry
+
+def test_rollback_is_not_undone_by_the_watcher(registry, tmp_path):
+    add_version(tmp_path, '20240102T000000Z-bbb', 2.0)
+    assert registry.check_for_update() == '20240102T000000Z-bbb'
+    assert registry.predictor.sales == 2.0
+
+    assert registry.rollback() == '20240101T000000Z-aaa'
+    assert registry.predictor.sales == 1.0
+    assert registry.status()['previous'] == '20240102T000000Z-bbb'
+    assert registry.history[-1]['rollback']
+    # The bad version is still the latest, but already seen
+    assert registry.check_for_update() is None
+    assert registry.version == '20240101T000000Z-aaa'
+
+    add_version(tmp_path, '20240103T000000Z-ccc', 3.0)
+    assert registry.check_for_update() == '20240103T000000Z-ccc'
+
+def test_failed_smoke_batch_keeps_the_active_version(registry, tmp_path):
+    add_version(tmp_path, '20240102T000000Z-bad', float('nan'))
+    with pytest.raises(ValueError, match="non-finite"):
+        registry.check_for_update()
+    assert registry.version == '20240101T000000Z-aaa'
+    assert registry.previous is None
+
+def test_rollback_needs_a_previous_version(registry):
+    with pytest.raises(ValueError):
+        registry.rollback()
+
+def test_publish_skips_unchanged_sets_and_prunes(tmp_path):
+    write_model_set(tmp_path, 1.0)
+    first = publish_version(tmp_path)
+    assert publish_version(tmp_path) == first
+
+    for sales in [2.0, 3.0]:
+        write_model_set(tmp_path, sales)
+        publish_version(tmp_path, keep=2)
+    versions = list_versions(tmp_path)
+    assert len(versions) == 2 and first not in versions
+    assert not [name for name in os.listdir(tmp_path / VERSIONS_DIRNAME) if name.startswith('.')]
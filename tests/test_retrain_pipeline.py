@@ -0,0 +1,59 @@
+import importlib.util
+
+import pytest
+
+from retraining import retrain_pipeline
+from retraining.retrain_pipeline import Stage, code_files, run_stages
+
+# The real src package is already imported, so the stage only imports the
+# helper lazily (never called; code_files reads imports at any level)
+STAGE_MODULE = '''
+def scale():
+    from src.helpers import SCALE
+    return SCALE
+
+def build(output):
+    with open(output, "w") as f:
+        f.write("built")
+'''
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    # A src/ tree with a stage module importing a helper module
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "helpers.py").write_text("SCALE = 1\n")
+    (tmp_path / "src" / "stage.py").write_text(STAGE_MODULE)
+    monkeypatch.setattr(retrain_pipeline, "ROOT_DIR", tmp_path)
+    monkeypatch.setattr(retrain_pipeline, "STATE_PATH", tmp_path / ".pipeline_state.json")
+
+    spec = importlib.util.spec_from_file_location("stage_under_test", tmp_path / "src" / "stage.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return tmp_path, module.build
+
+def run(stage):
+    timings = {}
+    run_stages([stage], max_workers=1, timings=timings)
+    return timings[stage.name][1]
+
+def test_code_files_follow_src_imports(project):
+    root, build = project
+    assert code_files(build) == sorted([(root / "src" / "helpers.py").resolve(), (root / "src" / "stage.py").resolve()])
+
+def test_editing_an_imported_helper_reruns_the_stage(project):
+    root, build = project
+    output = root / "output.txt"
+    stage = Stage("build", build, inputs=[], outputs=[output], args=(str(output),))
+
+    assert run(stage) == "ran"
+    assert run(stage) == "skipped"
+
+    (root / "src" / "helpers.py").write_text("SCALE = 20\n")
+    assert run(stage) == "ran"
+    assert run(stage) == "skipped"
+
+def test_force_rebuilds_features_from_scratch():
+    features = {stage.name: stage for stage in retrain_pipeline.build_stages()}["features"]
+    assert features.func is retrain_pipeline.create_features_incremental
+    features = {stage.name: stage for stage in retrain_pipeline.build_stages(force=True)}["features"]
+    assert features.func is retrain_pipeline.create_features